@@ -1,12 +1,16 @@
 # IMPORT PACKAGES
 
-from langgraph.graph import StateGraph
+from langgraph.graph import StateGraph, START, END
 from dotenv import load_dotenv
 
-from utils import AgentState, SUPERVISOR, GREETING, ENHANCER, CODER, RESEARCHER, MATHS_REASONER, SHOULD_USE_TOOLS, TOOLS, supervisor_node, greeting_node, enhancer_node, should_use_tools_node, use_tools_node, coder_node, maths_reasoner_node, researcher_node
+from utils import AgentState, SUPERVISOR, GREETING, ENHANCER, CODER, RESEARCHER, MATHS_REASONER, SHOULD_USE_TOOLS, TOOLS, COMPACTOR, compactor_node, supervisor_node, greeting_node, enhancer_node, should_use_tools_node, use_tools_node, coder_node, maths_reasoner_node, researcher_node
+from utils import ResearchState, RESEARCH_FAN_OUT, RESEARCH_SYNTHESIS, research_fan_out_node, research_synthesis_node, aresearch_fan_out_node, aresearch_synthesis_node
+from utils import acompactor_node, asupervisor_node, agreeting_node, aenhancer_node, ashould_use_tools_node, ause_tools_node, acoder_node, amaths_reasoner_node, aresearcher_node
 
 from langchain_core.messages import HumanMessage, SystemMessage
-from langgraph.checkpoint.memory import MemorySaver
+from backend.checkpointer import build_checkpointer
+from backend.research import RESEARCH_MODE
+from backend.metrics import instrument_node
 
 import asyncio
 
@@ -24,28 +28,92 @@ load_dotenv()
 
 # GRAPH CONSTANTS 
 
-graph= StateGraph(AgentState)
-
-memory= MemorySaver()
+# bounded -> idle threads are evicted (or spilled to sqlite), old checkpoints are pruned,
+# CHECKPOINT_BACKEND=sqlite -> shared by every worker process
+memory= build_checkpointer()
 
 LLM= "llm"
 TOOLS= "tools"
 
+# node set per flavour -> the async nodes await the llm and the tools on the event loop,
+# the sync ones are run by langgraph in a worker thread per call
+NODES= {
+    True: {
+        COMPACTOR: acompactor_node,
+        SUPERVISOR: asupervisor_node,
+        GREETING: agreeting_node,
+        ENHANCER: aenhancer_node,
+        CODER: acoder_node,
+        MATHS_REASONER: amaths_reasoner_node,
+        RESEARCHER: aresearcher_node,
+        SHOULD_USE_TOOLS: ashould_use_tools_node,
+        TOOLS: ause_tools_node,
+    },
+    False: {
+        COMPACTOR: compactor_node,
+        SUPERVISOR: supervisor_node,
+        GREETING: greeting_node,
+        ENHANCER: enhancer_node,
+        CODER: coder_node,
+        MATHS_REASONER: maths_reasoner_node,
+        RESEARCHER: researcher_node,
+        SHOULD_USE_TOOLS: should_use_tools_node,
+        TOOLS: use_tools_node,
+    },
+}
+
+
+RESEARCH_NODES= {
+    True: {
+        RESEARCH_FAN_OUT: aresearch_fan_out_node,
+        RESEARCH_SYNTHESIS: aresearch_synthesis_node,
+    },
+    False: {
+        RESEARCH_FAN_OUT: research_fan_out_node,
+        RESEARCH_SYNTHESIS: research_synthesis_node,
+    },
+}
+
+
+# FUNCTION THAT BUILDS THE RESEARCH SUBGRAPH -> every source at once, then one synthesis llm call
+def build_research_graph(asynchronous: bool= True) -> StateGraph:
+    
+    graph= StateGraph(ResearchState)
+    
+    for name, node in RESEARCH_NODES[asynchronous].items():
+        graph.add_node(name, instrument_node(name, node))
+    
+    graph.add_edge(START, RESEARCH_FAN_OUT)
+    
+    return graph
 
-# ADD NODES -> GRAPH
-graph.add_node(ENHANCER, enhancer_node)
-graph.add_node(GREETING, greeting_node)
-
-graph.add_node(CODER, coder_node)
-graph.add_node(MATHS_REASONER, maths_reasoner_node)
-graph.add_node(RESEARCHER, researcher_node)
 
-graph.add_node(SHOULD_USE_TOOLS, should_use_tools_node)
-graph.add_node(TOOLS, use_tools_node)
+# FUNCTION THAT BUILDS THE (UNCOMPILED) GRAPH
+def build_graph(asynchronous: bool= True, research_mode: str= RESEARCH_MODE) -> StateGraph:
+    
+    graph= StateGraph(AgentState)
+    
+    nodes= dict(NODES[asynchronous])
+    
+    # fan out research -> the researcher is the subgraph, it answers and ends the turn
+    # its evidence only lives for one turn -> no checkpoints of its own on the thread
+    if research_mode == "fanout":
+        nodes[RESEARCHER]= build_research_graph(asynchronous).compile(checkpointer= False)
+    
+    # ADD NODES -> GRAPH (each one timed for /metrics, the subgraph through its own nodes)
+    for name, node in nodes.items():
+        graph.add_node(name, instrument_node(name, node))
+    
+    if research_mode == "fanout":
+        graph.add_edge(RESEARCHER, END)
+    
+    # every turn enters through the compactor -> keeps the message history bounded
+    graph.set_entry_point(COMPACTOR)
+    
+    return graph
 
-graph.add_node(SUPERVISOR, supervisor_node)
 
-graph.set_entry_point(SUPERVISOR)
+graph= build_graph()
 
 # FUNCTION THAT COMPILES THE GRAPH AND RETURNS IT
 def graph_builder():
@@ -55,6 +123,7 @@ def graph_builder():
     return app
 
 
+
 if __name__ == "__main__":
     
     async def main():
@@ -81,16 +150,9 @@ if __name__ == "__main__":
                 break
             
             
-            # Get saved memory
-            snapshot = app.get_state(config= memory_config)
-            
-            if snapshot and "messages" in snapshot.values:
-                old_msgs = snapshot.values["messages"]
-            else:
-                old_msgs = []           
-                
-            # invoke the agent
-            events = app.astream_events(input=AgentState(messages= old_msgs + [HumanMessage(content= user_prompt)]), version="v2", config= memory_config)
+            # invoke the agent -> only the new msg is sent, the checkpointer already holds the history
+            # (the add_messages reducer appends it), a run that died mid tool call must not leak `used_tools`
+            events = app.astream_events(input= {"messages": [HumanMessage(content= user_prompt)], "used_tools": False}, version="v2", config= memory_config)
             
             # show the ai response
             print(f"\nAI: ", end= "", flush= True)
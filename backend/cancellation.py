@@ -0,0 +1,183 @@
+# IMPORT PACKAGES
+import os
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+
+# CANCELLATION CONSTANTS
+
+# how often (seconds) a streaming request checks whether its client is still connected
+DISCONNECT_POLL_INTERVAL= float(os.getenv("DISCONNECT_POLL_INTERVAL", "0.5"))
+
+
+
+# PER RUN TOKEN TRACKER
+class RunTracker:
+    """
+    Counts the output tokens of one graph run from its `astream_events` events: the provider's
+    usage once a model call ends, the streamed chunks (~ one token each) while it is running.
+    """
+
+    def __init__(self):
+
+        self.tokens= 0
+        self.completed= False
+
+        # model run id -> chunks streamed so far
+        self._streaming: Dict[str, int]= {}
+
+
+    def observe(self, event: Dict[str, Any]):
+
+        if event["event"] == "on_chat_model_stream":
+            self._streaming[event["run_id"]]= self._streaming.get(event["run_id"], 0) + 1
+
+        elif event["event"] == "on_chat_model_end":
+            streamed= self._streaming.pop(event["run_id"], 0)
+            usage= getattr(event["data"].get("output"), "usage_metadata", None) or {}
+
+            self.tokens+= usage.get("output_tokens") or streamed
+
+
+    def total(self) -> int:
+        return self.tokens + sum(self._streaming.values())
+
+
+
+# RUN STATS
+class RunStats:
+    """
+    Completed vs cancelled graph runs. A cancelled run is credited with the tokens an average
+    completed run generates minus the ones it had already generated (an estimate, the tokens
+    a run would have produced are never known).
+    """
+
+    def __init__(self):
+
+        self._lock= threading.Lock()
+
+        # counters
+        self.started= 0
+        self.completed= 0
+        self.cancelled= 0
+        self.completed_tokens= 0
+        self.tokens_saved= 0
+
+
+    def start(self) -> RunTracker:
+
+        with self._lock:
+            self.started+= 1
+
+        return RunTracker()
+
+
+    def finish(self, run: RunTracker):
+
+        tokens= run.total()
+
+        with self._lock:
+
+            if run.completed:
+                self.completed+= 1
+                self.completed_tokens+= tokens
+
+            else:
+                self.cancelled+= 1
+
+                if self.completed:
+                    self.tokens_saved+= max(0, round(self.completed_tokens / self.completed) - tokens)
+
+
+    def stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            return {
+                "started": self.started,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "in_flight": self.started - self.completed - self.cancelled,
+                "avg_completed_tokens": self.completed_tokens / self.completed if self.completed else 0.0,
+                "tokens_saved": self.tokens_saved,
+            }
+
+
+
+# shared stats
+run_stats= RunStats()
+
+
+
+# DISCONNECT DETECTION
+
+# cleanup tasks still running (a reference keeps them from being garbage collected)
+_closing: Set[asyncio.Task]= set()
+
+
+async def _wait_for_disconnect(request, poll_interval: float):
+
+    while not await request.is_disconnected():
+        await asyncio.sleep(poll_interval)
+
+
+async def _close(frames: AsyncIterator[str], pending: Optional[asyncio.Task]):
+
+    # cancelling the pending step throws CancelledError into the generator chain
+    # (-> astream_events -> the running nodes -> their llm / tool calls)
+    if pending is not None and not pending.done():
+        pending.cancel()
+
+        try:
+            await pending
+
+        except BaseException:
+            pass
+
+    await frames.aclose()
+
+
+async def cancel_on_disconnect(request, frames: AsyncIterator[str], poll_interval: float= DISCONNECT_POLL_INTERVAL) -> AsyncIterator[str]:
+    """
+    Relay `frames` (an async generator) to the response while polling `request` for a client
+    disconnect. Once the client is gone, or the response itself is cancelled, the step of
+    `frames` in flight is cancelled, so nothing keeps running for a reader that left, even
+    while no frame is being sent (e.g. during a long tool call).
+    """
+
+    watcher= asyncio.ensure_future(_wait_for_disconnect(request, poll_interval))
+    pending= None
+
+    try:
+        while True:
+            pending= asyncio.ensure_future(frames.__anext__())
+
+            await asyncio.wait({pending, watcher}, return_when= asyncio.FIRST_COMPLETED)
+
+            # client gone -> stop (the pending step is cancelled below)
+            if not pending.done():
+                return
+
+            try:
+                frame= pending.result()
+
+            except StopAsyncIteration:
+                return
+
+            pending= None
+
+            yield frame
+
+    finally:
+        watcher.cancel()
+
+        # closed in its own task -> the cleanup is not interrupted by the cancelled response
+        task= asyncio.ensure_future(_close(frames, pending))
+
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
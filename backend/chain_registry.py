@@ -0,0 +1,93 @@
+# IMPORT PACKAGES
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable
+from langchain_core.output_parsers import BaseOutputParser
+
+
+
+# CHAIN REGISTRY
+class ChainRegistry:
+    """
+    Holds every `prompt | model | parser` runnable of the graph.
+
+    Prompts (and parsers) are registered once, `build` composes each of them with the plain
+    llm and with the tool bound llm, and the nodes only look the ready chain up on every turn.
+    When a `model_loader` is given the registry builds itself on the first lookup, so the llm
+    client is not created at import time. `callbacks` are attached to the model of every
+    chain (they add to the callbacks of the run instead of replacing them).
+    """
+
+    def __init__(self, model_loader: Optional[Callable[[], Tuple[Runnable, Runnable]]]= None, callbacks: Optional[List[BaseCallbackHandler]]= None):
+
+        # returns (llm_model, binded_llm_model)
+        self.model_loader= model_loader
+        self.callbacks= callbacks
+
+        # name -> (prompt, parser)
+        self._specs: Dict[str, Tuple[BasePromptTemplate, Optional[BaseOutputParser]]]= {}
+
+        # (name, tool_bound) -> chain
+        self._chains: Dict[Tuple[str, bool], Runnable]= {}
+
+        self._lock= threading.Lock()
+
+
+    def register(self, name: str, prompt: BasePromptTemplate, parser: Optional[BaseOutputParser]= None):
+        self._specs[name]= (prompt, parser)
+
+
+    def build(self, llm_model: Runnable, binded_llm_model: Runnable):
+
+        if self.callbacks:
+            llm_model= llm_model.with_config(callbacks= self.callbacks)
+            binded_llm_model= binded_llm_model.with_config(callbacks= self.callbacks)
+
+        chains= {}
+
+        for name, (prompt, parser) in self._specs.items():
+
+            for tool_bound, model in ((False, llm_model), (True, binded_llm_model)):
+
+                chain= prompt | model
+
+                if parser is not None:
+                    chain= chain | parser
+
+                chains[(name, tool_bound)]= chain
+
+        # swap in one go -> readers never see a half built registry
+        self._chains= chains
+
+
+    def ensure_built(self):
+
+        if self._chains or self.model_loader is None:
+            return
+
+        with self._lock:
+
+            if not self._chains:
+                self.build(*self.model_loader())
+
+
+    def reset(self):
+        self._chains= {}
+
+
+    def get(self, name: str, tool_bound: bool= False) -> Runnable:
+
+        self.ensure_built()
+
+        try:
+            return self._chains[(name, tool_bound)]
+
+        except KeyError:
+            raise KeyError(f"No chain registered for '{name}' (tool_bound={tool_bound}), call build() first") from None
+
+
+    def names(self):
+        return list(self._specs)
@@ -0,0 +1,818 @@
+# IMPORT PACKAGES
+import os
+import time
+import uuid
+import pickle
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langchain_core.runnables import RunnableConfig
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger= logging.getLogger(__name__)
+
+
+
+# CHECKPOINTER CONSTANTS
+
+# max number of conversation threads kept in memory (least recently used are evicted first)
+CHECKPOINT_MAX_THREADS= int(os.getenv("CHECKPOINT_MAX_THREADS", "1000"))
+
+# a thread idle for longer than this (seconds) is evicted from memory
+CHECKPOINT_TTL_SECONDS= float(os.getenv("CHECKPOINT_TTL_SECONDS", "3600"))
+
+# checkpoints kept per thread (and namespace), older ones are dropped
+CHECKPOINT_MAX_PER_THREAD= int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "3"))
+
+# optional sqlite file evicted threads are spilled to (empty -> evicted threads are dropped)
+CHECKPOINT_SPILL_PATH= os.getenv("CHECKPOINT_SPILL_PATH", "")
+
+# "memory" -> conversations live in the process (one worker), "sqlite" -> every worker / container
+# opening CHECKPOINT_SHARED_PATH (wal mode, e.g. on a shared volume) sees every conversation
+CHECKPOINT_BACKEND= os.getenv("CHECKPOINT_BACKEND", "memory").lower()
+CHECKPOINT_SHARED_PATH= os.getenv("CHECKPOINT_SHARED_PATH", "checkpoints.sqlite3")
+
+# a request holds the lease of its thread while its run goes on -> a lease left by a crashed
+# worker expires after this many seconds (every checkpoint write renews it)
+CHECKPOINT_LEASE_TTL= float(os.getenv("CHECKPOINT_LEASE_TTL", "120"))
+
+# how long (seconds) a request waits for the other request running its thread
+CHECKPOINT_LEASE_WAIT= float(os.getenv("CHECKPOINT_LEASE_WAIT", "30"))
+
+# how often (seconds) a waiting request retries the lease
+CHECKPOINT_LEASE_POLL= 0.05
+
+
+
+class ThreadBusyError(TimeoutError):
+    """
+    Another request kept running the conversation thread for longer than the lease wait.
+    """
+
+
+
+# BOUNDED CHECKPOINTER
+class BoundedMemorySaver(MemorySaver):
+    """
+    MemorySaver with bounded memory.
+
+    - only the latest `max_checkpoints_per_thread` checkpoints of a thread are kept, together with
+      their pending writes and the channel blobs they still reference
+    - threads idle for more than `ttl_seconds`, or beyond `max_threads` (LRU), leave memory
+    - with a `spill_path`, leaving threads are written to a sqlite file and transparently loaded
+      back on their next access; `flush()` spills every thread (called at shutdown) so
+      conversations survive a restart
+    - `acquire_thread` / `release_thread` lease a thread to one request at a time, so two
+      requests of the same conversation never run on the same checkpoint
+    - the async methods run the sync ones inline, or on a worker thread once sqlite is
+      involved (`_offload`), so a busy file never stalls the event loop
+    """
+
+    def __init__(self, *, max_threads: int= CHECKPOINT_MAX_THREADS, ttl_seconds: float= CHECKPOINT_TTL_SECONDS, max_checkpoints_per_thread: int= CHECKPOINT_MAX_PER_THREAD, spill_path: Optional[str]= CHECKPOINT_SPILL_PATH, lease_ttl: float= CHECKPOINT_LEASE_TTL, **kwargs):
+
+        super().__init__(**kwargs)
+
+        self.max_threads= max_threads
+        self.ttl_seconds= ttl_seconds
+        self.max_checkpoints_per_thread= max(1, max_checkpoints_per_thread)
+        self.lease_ttl= lease_ttl
+
+        # thread_id -> (owner, expires_at) of the request running it
+        self._leases: Dict[str, Tuple[str, float]]= {}
+
+        # thread_id -> last access time, oldest first
+        self._access: "OrderedDict[Any, float]"= OrderedDict()
+
+        # (thread_id, checkpoint_ns, checkpoint_id) -> channel versions of that checkpoint
+        self._versions: Dict[Tuple[Any, str, str], ChannelVersions]= {}
+
+        self._lock= threading.RLock()
+
+        # counters
+        self.evicted_threads= 0
+        self.pruned_checkpoints= 0
+        self.spilled_threads= 0
+        self.loaded_threads= 0
+        self.lease_waits= 0
+        self.lease_timeouts= 0
+
+        self._db= None
+
+        # sqlite work -> off the event loop
+        self._offload= bool(spill_path)
+
+        if spill_path:
+            self._db= sqlite3.connect(spill_path, check_same_thread= False)
+
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoint_threads (
+                    thread_id TEXT PRIMARY KEY,
+                    bundle BLOB NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+            self._db.commit()
+
+
+    # READS
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+
+        thread_id= config["configurable"]["thread_id"]
+
+        with self._lock:
+            self._ensure_loaded(thread_id)
+            self._touch(thread_id)
+            self._evict()
+
+            return super().get_tuple(config)
+
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]]= None, before: Optional[RunnableConfig]= None, limit: Optional[int]= None) -> Iterator[CheckpointTuple]:
+
+        with self._lock:
+
+            if config:
+                self._ensure_loaded(config["configurable"]["thread_id"])
+
+            # materialize under the lock -> eviction can not run in the middle of the iteration
+            items= list(super().list(config, filter= filter, before= before, limit= limit))
+
+        yield from items
+
+
+    # WRITES
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+
+        thread_id= config["configurable"]["thread_id"]
+        checkpoint_ns= config["configurable"]["checkpoint_ns"]
+
+        with self._lock:
+            self._ensure_loaded(thread_id)
+
+            next_config= super().put(config, checkpoint, metadata, new_versions)
+
+            self._versions[(thread_id, checkpoint_ns, checkpoint["id"])]= dict(checkpoint["channel_versions"])
+
+            self._prune(thread_id, checkpoint_ns)
+            self._touch(thread_id)
+            self._renew_lease(str(thread_id))
+            self._evict()
+
+            return next_config
+
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str= "") -> None:
+
+        thread_id= config["configurable"]["thread_id"]
+
+        with self._lock:
+            self._ensure_loaded(thread_id)
+
+            super().put_writes(config, writes, task_id, task_path)
+
+            self._touch(thread_id)
+
+
+    def delete_thread(self, thread_id: str) -> None:
+
+        with self._lock:
+            self._drop_from_memory(thread_id)
+
+            if self._db is not None:
+                self._db.execute("DELETE FROM checkpoint_threads WHERE thread_id = ?", (str(thread_id),))
+                self._db.commit()
+
+
+    # ASYNC -> the sync methods, inline or on a worker thread
+
+    async def _run(self, fn: Callable, *args, **kwargs) -> Any:
+
+        if self._offload:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+        return fn(*args, **kwargs)
+
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._run(self.get_tuple, config)
+
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]]= None, before: Optional[RunnableConfig]= None, limit: Optional[int]= None) -> AsyncIterator[CheckpointTuple]:
+
+        items= await self._run(lambda: list(self.list(config, filter= filter, before= before, limit= limit)))
+
+        for item in items:
+            yield item
+
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return await self._run(self.put, config, checkpoint, metadata, new_versions)
+
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str= "") -> None:
+        await self._run(self.put_writes, config, writes, task_id, task_path)
+
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self._run(self.delete_thread, thread_id)
+
+
+    # THREAD LEASES
+
+    async def acquire_thread(self, thread_id, wait: float= CHECKPOINT_LEASE_WAIT) -> str:
+        """
+        Wait until no other request runs `thread_id` and lease it, returns the owner token
+        `release_thread` takes. Raises ThreadBusyError after `wait` seconds.
+        """
+
+        owner= uuid.uuid4().hex
+        deadline= time.monotonic() + wait
+        waited= False
+
+        while not await self._run(self._try_lease, str(thread_id), owner):
+
+            if time.monotonic() >= deadline:
+                self.lease_timeouts+= 1
+                raise ThreadBusyError(f"thread '{thread_id}' is still running another request")
+
+            if not waited:
+                self.lease_waits+= 1
+                waited= True
+
+            await asyncio.sleep(CHECKPOINT_LEASE_POLL)
+
+        return owner
+
+
+    def release_thread(self, thread_id, owner: str):
+        self._release_lease(str(thread_id), owner)
+
+
+    # shielded -> a request cancelled while releasing still frees its thread
+    async def arelease_thread(self, thread_id, owner: str):
+        await asyncio.shield(self._run(self.release_thread, thread_id, owner))
+
+
+    # free, expired or already ours -> (re)take it
+    def _try_lease(self, thread_id: str, owner: str) -> bool:
+
+        now= time.time()
+
+        with self._lock:
+            held= self._leases.get(thread_id)
+
+            if held is not None and held[0] != owner and held[1] > now:
+                return False
+
+            self._leases[thread_id]= (owner, now + self.lease_ttl)
+
+            return True
+
+
+    def _release_lease(self, thread_id: str, owner: str):
+
+        with self._lock:
+            if self._leases.get(thread_id, ("", 0.0))[0] == owner:
+                del self._leases[thread_id]
+
+
+    # a long run keeps its lease as long as it keeps writing checkpoints (caller holds the lock)
+    def _renew_lease(self, thread_id: str):
+
+        if thread_id in self._leases:
+            self._leases[thread_id]= (self._leases[thread_id][0], time.time() + self.lease_ttl)
+
+
+    # MAINTENANCE
+
+    def flush(self):
+        """
+        Spill every in memory thread to the sqlite file (no-op without one).
+        """
+
+        if self._db is None:
+            return
+
+        with self._lock:
+            for thread_id in list(self._access):
+                self._spill(thread_id)
+
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threads_in_memory": len(self._access),
+            "checkpoints_in_memory": sum(len(ids) for namespaces in self.storage.values() for ids in namespaces.values()),
+            "blobs_in_memory": len(self.blobs),
+            "evicted_threads": self.evicted_threads,
+            "pruned_checkpoints": self.pruned_checkpoints,
+            "spilled_threads": self.spilled_threads,
+            "loaded_threads": self.loaded_threads,
+            "lease_waits": self.lease_waits,
+            "lease_timeouts": self.lease_timeouts,
+        }
+
+
+    # keep only the newest checkpoints of a namespace and the blobs they reference, returns the
+    # dropped checkpoint ids and (channel, version) of the dropped blobs (caller holds the lock)
+    def _prune(self, thread_id, checkpoint_ns: str) -> Tuple[List[str], Set[Tuple[str, Any]]]:
+
+        checkpoints= self.storage[thread_id][checkpoint_ns]
+
+        if len(checkpoints) <= self.max_checkpoints_per_thread:
+            return [], set()
+
+        # checkpoint ids are time ordered
+        ordered_ids= sorted(checkpoints)
+        stale_ids= ordered_ids[:-self.max_checkpoints_per_thread]
+        kept_ids= ordered_ids[-self.max_checkpoints_per_thread:]
+
+        # channel versions only the stale checkpoints point to
+        stale_versions= set()
+
+        for checkpoint_id in stale_ids:
+            stale_versions.update(self._channel_versions(thread_id, checkpoint_ns, checkpoint_id).items())
+
+        for checkpoint_id in kept_ids:
+            stale_versions.difference_update(self._channel_versions(thread_id, checkpoint_ns, checkpoint_id).items())
+
+        for checkpoint_id in stale_ids:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            self._versions.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+        for channel, version in stale_versions:
+            self.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+
+        self.pruned_checkpoints+= len(stale_ids)
+
+        return stale_ids, stale_versions
+
+
+    def _channel_versions(self, thread_id, checkpoint_ns: str, checkpoint_id: str) -> ChannelVersions:
+
+        key= (thread_id, checkpoint_ns, checkpoint_id)
+
+        if key not in self._versions:
+            checkpoint= self.serde.loads_typed(self.storage[thread_id][checkpoint_ns][checkpoint_id][0])
+            self._versions[key]= dict(checkpoint["channel_versions"])
+
+        return self._versions[key]
+
+
+    def _touch(self, thread_id):
+        self._access[thread_id]= time.monotonic()
+        self._access.move_to_end(thread_id)
+
+
+    def _evict(self):
+
+        now= time.monotonic()
+
+        while self._access:
+            thread_id, last_access= next(iter(self._access.items()))
+
+            if len(self._access) <= self.max_threads and now - last_access <= self.ttl_seconds:
+                break
+
+            self._spill(thread_id)
+            self._drop_from_memory(thread_id)
+            self.evicted_threads+= 1
+
+
+    def _drop_from_memory(self, thread_id):
+
+        MemorySaver.delete_thread(self, thread_id)
+
+        self._access.pop(thread_id, None)
+
+        for key in [key for key in self._versions if key[0] == thread_id]:
+            del self._versions[key]
+
+
+    # THREAD BUNDLES -> everything memory holds for one thread, pickled as one value
+
+    def _bundle(self, thread_id) -> bytes:
+
+        bundle= {
+            "storage": {ns: dict(checkpoints) for ns, checkpoints in self.storage[thread_id].items() if checkpoints},
+            "writes": {key[1:]: dict(value) for key, value in self.writes.items() if key[0] == thread_id},
+            "blobs": {key[1:]: value for key, value in self.blobs.items() if key[0] == thread_id},
+        }
+
+        return pickle.dumps(bundle, protocol= pickle.HIGHEST_PROTOCOL)
+
+
+    def _load_bundle(self, thread_id, payload: bytes):
+
+        bundle= pickle.loads(payload)
+
+        for checkpoint_ns, checkpoints in bundle["storage"].items():
+            self.storage[thread_id][checkpoint_ns].update(checkpoints)
+
+        for (checkpoint_ns, checkpoint_id), value in bundle["writes"].items():
+            self.writes[(thread_id, checkpoint_ns, checkpoint_id)]= value
+
+        for (checkpoint_ns, channel, version), value in bundle["blobs"].items():
+            self.blobs[(thread_id, checkpoint_ns, channel, version)]= value
+
+        self.loaded_threads+= 1
+
+
+    # SQLITE SPILL
+
+    def _spill(self, thread_id):
+
+        if self._db is None or not self.storage.get(thread_id):
+            return
+
+        self._db.execute(
+            "INSERT OR REPLACE INTO checkpoint_threads (thread_id, bundle, updated_at) VALUES (?, ?, ?)",
+            (str(thread_id), self._bundle(thread_id), time.time()),
+        )
+        self._db.commit()
+
+        self.spilled_threads+= 1
+
+
+    def _ensure_loaded(self, thread_id):
+
+        if self._db is None or thread_id in self._access or self.storage.get(thread_id):
+            return
+
+        row= self._db.execute("SELECT bundle FROM checkpoint_threads WHERE thread_id = ?", (str(thread_id),)).fetchone()
+
+        if row is None:
+            return
+
+        self._load_bundle(thread_id, row[0])
+
+
+
+# SHARED CHECKPOINTER
+class SharedSqliteSaver(BoundedMemorySaver):
+    """
+    Checkpointer shared by every process (uvicorn worker, container) opening the same sqlite
+    file, in wal mode so readers never block the writer.
+
+    Memory is only a cache of the threads (bounded like BoundedMemorySaver):
+    - every put / put_writes writes only what it added to the file, one row per checkpoint,
+      channel blob and pending write (checkpoints pruned from memory leave the file too), and
+      bumps the thread's version
+    - every access first compares the cached version with the file's (one indexed read) and
+      reloads the thread's rows when another process wrote it since
+    - the thread leases live in a table of the same file -> one request at a time per thread
+      across all the processes; a write that finds a version it did not expect (a request
+      running without a lease, or past an expired one) keeps both writes, is counted as a
+      conflict and the next access reloads the thread
+    - the async methods do all of this on a worker thread
+    """
+
+    def __init__(self, path: str= CHECKPOINT_SHARED_PATH, **kwargs):
+
+        # write through -> nothing is left to spill
+        super().__init__(spill_path= None, **kwargs)
+
+        self.path= path
+        self._offload= True
+
+        # autocommit, transactions are opened explicitly
+        self._store= sqlite3.connect(path, check_same_thread= False, timeout= 30, isolation_level= None)
+        self._store.execute("PRAGMA journal_mode=WAL")
+        self._store.execute("PRAGMA synchronous=NORMAL")
+
+        # no declared type on the versions -> ints and strings come back as they went in
+        self._store.executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoint_thread_versions (
+                thread_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS checkpoint_rows (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+
+            CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                version NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+            );
+
+            CREATE TABLE IF NOT EXISTS checkpoint_writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+
+            CREATE TABLE IF NOT EXISTS checkpoint_leases (
+                thread_id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+
+        # thread_id -> version of the file the cached copy matches
+        self._thread_versions: Dict[str, int]= {}
+
+        # thread_id -> owner token of a lease held by this process
+        self._held: Dict[str, str]= {}
+
+        # (checkpoint_ns, checkpoint ids, blob (channel, version)) dropped by the running put's prune
+        self._pruned: List[Tuple[str, List[str], Set[Tuple[str, Any]]]]= []
+
+        # counters
+        self.writes_through= 0
+        self.rows_written= 0
+        self.reloads= 0
+        self.conflicts= 0
+
+
+    @contextmanager
+    def _transaction(self, mode: str= "IMMEDIATE"):
+
+        # immediate -> the version check and the write are one step for every process
+        self._store.execute(f"BEGIN {mode}")
+
+        try:
+            yield self._store
+
+        except BaseException:
+            self._store.execute("ROLLBACK")
+            raise
+
+        self._store.execute("COMMIT")
+
+
+    @staticmethod
+    def _dumps(value: Any) -> bytes:
+        return pickle.dumps(value, protocol= pickle.HIGHEST_PROTOCOL)
+
+
+    # WRITES -> only the rows the call added (caller of the helpers holds the lock)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+
+        thread_id= config["configurable"]["thread_id"]
+        checkpoint_ns= config["configurable"]["checkpoint_ns"]
+        key= str(thread_id)
+
+        with self._lock:
+            self._pruned= []
+
+            next_config= super().put(config, checkpoint, metadata, new_versions)
+
+            statements= [(
+                "INSERT OR REPLACE INTO checkpoint_rows (thread_id, checkpoint_ns, checkpoint_id, value) VALUES (?, ?, ?, ?)",
+                (key, checkpoint_ns, checkpoint["id"], self._dumps(self.storage[thread_id][checkpoint_ns][checkpoint["id"]])),
+            )]
+
+            for channel, version in new_versions.items():
+                blob= self.blobs.get((thread_id, checkpoint_ns, channel, version))
+
+                if blob is not None:
+                    statements.append((
+                        "INSERT OR REPLACE INTO checkpoint_blobs (thread_id, checkpoint_ns, channel, version, value) VALUES (?, ?, ?, ?, ?)",
+                        (key, checkpoint_ns, channel, version, self._dumps(blob)),
+                    ))
+
+            for pruned_ns, checkpoint_ids, blob_versions in self._pruned:
+
+                for checkpoint_id in checkpoint_ids:
+                    statements.append(("DELETE FROM checkpoint_rows WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", (key, pruned_ns, checkpoint_id)))
+                    statements.append(("DELETE FROM checkpoint_writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", (key, pruned_ns, checkpoint_id)))
+
+                for channel, version in blob_versions:
+                    statements.append(("DELETE FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?", (key, pruned_ns, channel, version)))
+
+            self._pruned= []
+
+            self._write_through(thread_id, statements)
+
+            return next_config
+
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str= "") -> None:
+
+        thread_id= config["configurable"]["thread_id"]
+        checkpoint_ns= config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id= config["configurable"]["checkpoint_id"]
+        key= str(thread_id)
+
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+
+            statements= [
+                (
+                    "INSERT OR REPLACE INTO checkpoint_writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, value) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, checkpoint_ns, checkpoint_id, write_task_id, idx, self._dumps(value)),
+                )
+                for (write_task_id, idx), value in self.writes.get((thread_id, checkpoint_ns, checkpoint_id), {}).items()
+                if write_task_id == task_id
+            ]
+
+            self._write_through(thread_id, statements)
+
+
+    def delete_thread(self, thread_id: str) -> None:
+
+        key= str(thread_id)
+
+        with self._lock:
+            super().delete_thread(thread_id)
+
+            with self._transaction() as store:
+                for table in ("checkpoint_rows", "checkpoint_blobs", "checkpoint_writes", "checkpoint_thread_versions"):
+                    store.execute(f"DELETE FROM {table} WHERE thread_id = ?", (key,))
+
+
+    # the pruned rows of the running put leave the file with its write
+    def _prune(self, thread_id, checkpoint_ns: str) -> Tuple[List[str], Set[Tuple[str, Any]]]:
+
+        stale_ids, stale_versions= super()._prune(thread_id, checkpoint_ns)
+
+        if stale_ids:
+            self._pruned.append((checkpoint_ns, stale_ids, stale_versions))
+
+        return stale_ids, stale_versions
+
+
+    def _write_through(self, thread_id, statements: List[Tuple[str, tuple]]):
+
+        key= str(thread_id)
+        expected= self._thread_versions.get(key)
+
+        with self._transaction() as store:
+            row= store.execute("SELECT version FROM checkpoint_thread_versions WHERE thread_id = ?", (key,)).fetchone()
+            current= row[0] if row else None
+
+            for sql, params in statements:
+                store.execute(sql, params)
+
+            version= (current or 0) + 1
+
+            store.execute(
+                """
+                INSERT INTO checkpoint_thread_versions (thread_id, version, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(thread_id) DO UPDATE SET version= excluded.version, updated_at= excluded.updated_at
+                """,
+                (key, version, time.time()),
+            )
+
+        self.writes_through+= 1
+        self.rows_written+= len(statements)
+
+        # another process wrote in between -> its rows are not cached here, reload on the next access
+        if current != expected:
+            self.conflicts+= 1
+            self._thread_versions.pop(key, None)
+
+            logger.warning("thread '%s' was written by another process (version %s, expected %s)", key, current, expected)
+            return
+
+        self._thread_versions[key]= version
+
+
+    # READS -> the cached copy is checked against the file first (caller holds the lock)
+
+    def _ensure_loaded(self, thread_id):
+
+        key= str(thread_id)
+
+        row= self._store.execute("SELECT version FROM checkpoint_thread_versions WHERE thread_id = ?", (key,)).fetchone()
+        version= row[0] if row else None
+
+        if version == self._thread_versions.get(key):
+            return
+
+        # stale (or deleted by another process) -> drop the cached copy, load the file's
+        self._drop_from_memory(thread_id)
+
+        if version is None:
+            return
+
+        # one read transaction -> the rows all belong to the version read with them
+        with self._transaction("DEFERRED") as store:
+            row= store.execute("SELECT version FROM checkpoint_thread_versions WHERE thread_id = ?", (key,)).fetchone()
+
+            if row is None:
+                return
+
+            checkpoints= store.execute("SELECT checkpoint_ns, checkpoint_id, value FROM checkpoint_rows WHERE thread_id = ?", (key,)).fetchall()
+            blobs= store.execute("SELECT checkpoint_ns, channel, version, value FROM checkpoint_blobs WHERE thread_id = ?", (key,)).fetchall()
+            writes= store.execute("SELECT checkpoint_ns, checkpoint_id, task_id, idx, value FROM checkpoint_writes WHERE thread_id = ?", (key,)).fetchall()
+
+        for checkpoint_ns, checkpoint_id, value in checkpoints:
+            self.storage[thread_id][checkpoint_ns][checkpoint_id]= pickle.loads(value)
+
+        for checkpoint_ns, channel, blob_version, value in blobs:
+            self.blobs[(thread_id, checkpoint_ns, channel, blob_version)]= pickle.loads(value)
+
+        for checkpoint_ns, checkpoint_id, task_id, idx, value in writes:
+            self.writes[(thread_id, checkpoint_ns, checkpoint_id)][(task_id, idx)]= pickle.loads(value)
+
+        self._thread_versions[key]= row[0]
+        self.loaded_threads+= 1
+        self.reloads+= 1
+
+
+    def _drop_from_memory(self, thread_id):
+
+        super()._drop_from_memory(thread_id)
+
+        self._thread_versions.pop(str(thread_id), None)
+
+
+    # THREAD LEASES -> one row per running thread
+
+    def _try_lease(self, thread_id: str, owner: str) -> bool:
+
+        now= time.time()
+
+        with self._lock:
+            cursor= self._store.execute(
+                """
+                INSERT INTO checkpoint_leases (thread_id, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(thread_id) DO UPDATE SET owner= excluded.owner, expires_at= excluded.expires_at
+                WHERE checkpoint_leases.expires_at < ? OR checkpoint_leases.owner = excluded.owner
+                """,
+                (thread_id, owner, now + self.lease_ttl, now),
+            )
+
+            if cursor.rowcount != 1:
+                return False
+
+            self._held[thread_id]= owner
+
+            return True
+
+
+    def _release_lease(self, thread_id: str, owner: str):
+
+        with self._lock:
+            self._store.execute("DELETE FROM checkpoint_leases WHERE thread_id = ? AND owner = ?", (thread_id, owner))
+
+            if self._held.get(thread_id) == owner:
+                del self._held[thread_id]
+
+
+    def _renew_lease(self, thread_id: str):
+
+        owner= self._held.get(thread_id)
+
+        if owner is not None:
+            self._store.execute("UPDATE checkpoint_leases SET expires_at = ? WHERE thread_id = ? AND owner = ?", (time.time() + self.lease_ttl, thread_id, owner))
+
+
+    # MAINTENANCE
+
+    def flush(self):
+        """
+        No-op, every write already reached the file.
+        """
+
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "path": self.path,
+            "writes_through": self.writes_through,
+            "rows_written": self.rows_written,
+            "reloads": self.reloads,
+            "conflicts": self.conflicts,
+        }
+
+
+
+# FUNCTION THAT PICKS THE CHECKPOINTER OF THE CONFIGURED BACKEND
+def build_checkpointer(backend: str= CHECKPOINT_BACKEND) -> BoundedMemorySaver:
+
+    if backend == "sqlite":
+        return SharedSqliteSaver()
+
+    if backend == "memory":
+        return BoundedMemorySaver()
+
+    raise ValueError(f"unknown CHECKPOINT_BACKEND '{backend}' (expected 'memory' or 'sqlite')")
@@ -0,0 +1,404 @@
+# IMPORT PACKAGES
+#
+# keep this module stdlib only -> it is also the entrypoint of the worker processes
+# (python -m backend.code_sandbox), which must start without the app's heavy imports
+import os
+import io
+import sys
+import json
+import time
+import queue
+import select
+import shutil
+import signal
+import tempfile
+import threading
+import traceback
+import subprocess
+import contextlib
+from typing import Dict, List, Optional
+
+
+
+# SANDBOX CONSTANTS
+
+# number of pre-forked worker processes
+SANDBOX_POOL_SIZE= int(os.getenv("SANDBOX_POOL_SIZE", "2"))
+
+# wall clock budget (seconds) of a single execution
+SANDBOX_TIMEOUT= float(os.getenv("SANDBOX_TIMEOUT", "30"))
+
+# address space limit of a worker (MB), 0 disables it
+SANDBOX_MEMORY_LIMIT_MB= int(os.getenv("SANDBOX_MEMORY_LIMIT_MB", "1024"))
+
+# max characters of output returned to the llm
+SANDBOX_MAX_OUTPUT_CHARS= int(os.getenv("SANDBOX_MAX_OUTPUT_CHARS", "10000"))
+
+# a worker is replaced by a fresh one after this many executions
+SANDBOX_MAX_RUNS= int(os.getenv("SANDBOX_MAX_RUNS", "50"))
+
+# modules imported once per worker and exposed to every snippet (missing ones are skipped)
+SANDBOX_PRELOAD= ("numpy", "sympy", "pandas", "math", "statistics")
+SANDBOX_ALIASES= {"numpy": "np", "pandas": "pd", "sympy": "sp"}
+
+# how long a fresh worker may take to import the preloaded modules
+SANDBOX_STARTUP_TIMEOUT= 60.0
+
+
+
+# WORKER SIDE
+
+def _worker_main():
+    """
+    Worker loop: one json line in (the code), one json line out (the output).
+
+    The protocol runs on a private copy of the original stdout, fd 1 itself is pointed to
+    /dev/null so nothing the snippet (or a C extension) prints can corrupt it.
+    """
+
+    proto_in= sys.stdin.buffer
+    proto_out= os.fdopen(os.dup(1), "wb")
+
+    devnull= os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+
+    # memory limit for the whole process
+    memory_limit_mb= int(os.environ.get("SANDBOX_MEMORY_LIMIT_MB", "0"))
+
+    if memory_limit_mb > 0:
+        try:
+            import resource
+
+            limit= memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+        except (ImportError, ValueError, OSError):
+            pass
+
+    # pre-import the heavy libraries once
+    base_namespace= {"__name__": "__main__", "__builtins__": __builtins__}
+
+    for module_name in SANDBOX_PRELOAD:
+        try:
+            module= __import__(module_name)
+
+        except Exception:
+            continue
+
+        base_namespace[module_name]= module
+
+        if module_name in SANDBOX_ALIASES:
+            base_namespace[SANDBOX_ALIASES[module_name]]= module
+
+    max_output_chars= int(os.environ.get("SANDBOX_MAX_OUTPUT_CHARS", "10000"))
+
+    def send(payload: Dict):
+        proto_out.write((json.dumps(payload) + "\n").encode())
+        proto_out.flush()
+
+    send({"type": "ready"})
+
+    for line in proto_in:
+
+        code= json.loads(line)["code"]
+
+        # fresh globals for every execution -> no state leaks between runs or users
+        namespace= dict(base_namespace)
+        buffer= io.StringIO()
+
+        try:
+            with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+                exec(compile(code, "<sandbox>", "exec"), namespace)
+
+        except MemoryError:
+            buffer.write("MemoryError: the snippet exceeded the sandbox memory limit\n")
+
+        except BaseException as e:
+            buffer.write("".join(traceback.format_exception_only(type(e), e)))
+
+        output= buffer.getvalue()
+
+        if len(output) > max_output_chars:
+            output= output[:max_output_chars] + f"\n... [output truncated, {len(output) - max_output_chars} more characters]"
+
+        send({"type": "result", "output": output})
+
+
+
+# POOL SIDE
+
+class SandboxWorker:
+    """
+    Handle on one worker process.
+    """
+
+    def __init__(self, memory_limit_mb: int, max_output_chars: int):
+
+        env= {
+            "PATH": os.environ.get("PATH", ""),
+            "LANG": os.environ.get("LANG", "C.UTF-8"),
+            "MPLBACKEND": "Agg",
+            "OPENBLAS_NUM_THREADS": "1",
+            "OMP_NUM_THREADS": "1",
+            "MKL_NUM_THREADS": "1",
+            "SANDBOX_MEMORY_LIMIT_MB": str(memory_limit_mb),
+            "SANDBOX_MAX_OUTPUT_CHARS": str(max_output_chars),
+        }
+
+        # snippets run in a throwaway directory, removed with the worker
+        self.workdir= tempfile.mkdtemp(prefix= "sandbox-")
+
+        # what this enforces: none of the server's environment variables (api keys) reach the
+        # worker, it starts in the empty directory above and in isolated mode (-I -> neither the
+        # repo nor PYTHON* variables on its import path). It is NOT a filesystem or network jail:
+        # a snippet can still open any file the server's user can read by its absolute path (a
+        # .env next to the app included) and reach the network.
+        self.process= subprocess.Popen(
+            [sys.executable, "-I", os.path.abspath(__file__)],
+            cwd= self.workdir,
+            env= env,
+            stdin= subprocess.PIPE,
+            stdout= subprocess.PIPE,
+            stderr= subprocess.DEVNULL,
+            start_new_session= True,
+        )
+
+        self.runs= 0
+        self.ready= False
+
+
+    def _read(self, timeout: float, cancel_event: Optional[threading.Event]= None) -> Optional[Dict]:
+
+        deadline= time.monotonic() + timeout
+
+        while True:
+
+            if cancel_event is not None and cancel_event.is_set():
+                raise SandboxCancelled()
+
+            remaining= deadline - time.monotonic()
+
+            if remaining <= 0:
+                return None
+
+            readable, _, _= select.select([self.process.stdout], [], [], min(remaining, 0.1))
+
+            if readable:
+                line= self.process.stdout.readline()
+
+                # EOF -> the worker died (killed by the memory limit, segfault, ...)
+                if not line:
+                    raise SandboxCrashed()
+
+                return json.loads(line)
+
+
+    def wait_ready(self, timeout: float= SANDBOX_STARTUP_TIMEOUT):
+
+        if self.ready:
+            return
+
+        message= self._read(timeout)
+
+        if message is None or message.get("type") != "ready":
+            raise SandboxCrashed()
+
+        self.ready= True
+
+
+    def execute(self, code: str, timeout: float, cancel_event: Optional[threading.Event]= None) -> Optional[str]:
+        """
+        Returns the output, or None when the wall clock budget ran out.
+        """
+
+        self.process.stdin.write((json.dumps({"code": code}) + "\n").encode())
+        self.process.stdin.flush()
+
+        self.runs+= 1
+
+        message= self._read(timeout, cancel_event)
+
+        return None if message is None else message["output"]
+
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+
+    def kill(self):
+
+        if self.alive:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+
+            except (ProcessLookupError, PermissionError, AttributeError):
+                self.process.kill()
+
+        self.process.wait()
+
+        for stream in (self.process.stdin, self.process.stdout):
+            with contextlib.suppress(Exception):
+                stream.close()
+
+        shutil.rmtree(self.workdir, ignore_errors= True)
+
+
+
+class SandboxCrashed(Exception):
+    pass
+
+
+class SandboxCancelled(Exception):
+    pass
+
+
+
+class SandboxPool:
+    """
+    Pool of pre-started python worker processes for llm generated code.
+
+    Each worker pre-imports numpy / sympy / pandas once, runs every snippet in fresh globals,
+    under an address space limit and a wall clock timeout, with its output capped. A worker
+    that times out, crashes or reaches `max_runs` executions is killed and replaced.
+    """
+
+    def __init__(self, size: int= SANDBOX_POOL_SIZE, timeout: float= SANDBOX_TIMEOUT, memory_limit_mb: int= SANDBOX_MEMORY_LIMIT_MB, max_output_chars: int= SANDBOX_MAX_OUTPUT_CHARS, max_runs: int= SANDBOX_MAX_RUNS):
+
+        self.size= size
+        self.timeout= timeout
+        self.memory_limit_mb= memory_limit_mb
+        self.max_output_chars= max_output_chars
+        self.max_runs= max_runs
+
+        self._idle: "queue.Queue[SandboxWorker]"= queue.Queue()
+        self._workers: List[SandboxWorker]= []
+        self._lock= threading.Lock()
+        self._closed= False
+
+        # counters
+        self.executions= 0
+        self.timeouts= 0
+        self.crashes= 0
+        self.cancellations= 0
+        self.recycled= 0
+
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+
+    def _spawn(self) -> SandboxWorker:
+
+        worker= SandboxWorker(self.memory_limit_mb, self.max_output_chars)
+
+        with self._lock:
+            self._workers.append(worker)
+
+        return worker
+
+
+    def _retire(self, worker: SandboxWorker):
+
+        worker.kill()
+
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+        # keep the pool at full size
+        if not self._closed:
+            self._idle.put(self._spawn())
+
+
+    def run(self, code: str, timeout: Optional[float]= None, cancel_event: Optional[threading.Event]= None) -> str:
+
+        timeout= self.timeout if timeout is None else timeout
+
+        worker= self._idle.get()
+        keep_worker= False
+
+        try:
+            worker.wait_ready()
+
+            output= worker.execute(code, timeout, cancel_event)
+
+            if output is None:
+                self.timeouts+= 1
+                return f"Error: execution timed out after {timeout}s"
+
+            self.executions+= 1
+            keep_worker= worker.runs < self.max_runs
+
+            if not keep_worker:
+                self.recycled+= 1
+
+            return output
+
+        except SandboxCrashed:
+            self.crashes+= 1
+            return "Error: the execution crashed (most likely it exceeded the sandbox memory limit)"
+
+        except SandboxCancelled:
+            self.cancellations+= 1
+            raise
+
+        finally:
+            if keep_worker:
+                self._idle.put(worker)
+
+            else:
+                self._retire(worker)
+
+
+    def warmup(self):
+        """
+        Block until every idle worker has finished its preload imports.
+        """
+
+        workers= []
+
+        while True:
+            try:
+                workers.append(self._idle.get_nowait())
+
+            except queue.Empty:
+                break
+
+        for worker in workers:
+            try:
+                worker.wait_ready()
+
+            except SandboxCrashed:
+                pass
+
+        for worker in workers:
+            self._idle.put(worker)
+
+
+    def stats(self) -> Dict:
+        return {
+            "size": self.size,
+            "executions": self.executions,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+            "cancellations": self.cancellations,
+            "recycled": self.recycled,
+        }
+
+
+    def close(self):
+
+        self._closed= True
+
+        with self._lock:
+            workers= list(self._workers)
+            self._workers.clear()
+
+        for worker in workers:
+            worker.kill()
+
+
+
+if __name__ == "__main__":
+    _worker_main()
@@ -0,0 +1,139 @@
+# IMPORT PACKAGES
+import os
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+
+# COMPACTION CONSTANTS
+
+# set to "false" to keep the full message history in the state
+COMPACTION_ENABLED= os.getenv("COMPACTION_ENABLED", "true").lower() == "true"
+
+# compaction runs once the state holds more messages than this
+COMPACTION_MAX_MESSAGES= int(os.getenv("COMPACTION_MAX_MESSAGES", "24"))
+
+# most recent messages kept verbatim after a compaction (never below the 4 the nodes read)
+COMPACTION_KEEP_MESSAGES= max(4, int(os.getenv("COMPACTION_KEEP_MESSAGES", "8")))
+
+# tool outputs older than the last N messages are elided (the nodes read the last 4 -> never below 4)
+COMPACTION_TOOL_WINDOW= max(4, int(os.getenv("COMPACTION_TOOL_WINDOW", "4")))
+
+# max characters of the running summary (oldest lines go first)
+COMPACTION_SUMMARY_MAX_CHARS= int(os.getenv("COMPACTION_SUMMARY_MAX_CHARS", "4000"))
+
+# max characters one folded message contributes to the summary
+COMPACTION_LINE_CHARS= int(os.getenv("COMPACTION_LINE_CHARS", "200"))
+
+# fixed id -> every compaction replaces the same summary message
+SUMMARY_MESSAGE_ID= "conversation-summary"
+SUMMARY_HEADER= "Summary of the earlier conversation:"
+
+ELIDED_TOOL_OUTPUT= "[tool output elided]"
+
+
+
+# one summary line per folded message (tool outputs are dropped, not summarized)
+def _summary_line(msg: BaseMessage, line_chars: int) -> Optional[str]:
+
+    if isinstance(msg, HumanMessage):
+        speaker= "User"
+
+    elif isinstance(msg, AIMessage):
+        speaker= "Assistant"
+
+    else:
+        return None
+
+    content= " ".join(str(msg.content).split())
+
+    if not content:
+        return None
+
+    if len(content) > line_chars:
+        content= content[:line_chars].rstrip() + "..."
+
+    return f"- {speaker}: {content}"
+
+
+def _merge_summary(previous: Optional[BaseMessage], folded: List[BaseMessage], max_chars: int, line_chars: int) -> SystemMessage:
+
+    lines= []
+
+    if previous is not None:
+        lines+= str(previous.content).splitlines()[1:]
+
+    lines+= [line for line in (_summary_line(msg, line_chars) for msg in folded) if line]
+
+    # drop the oldest lines until the summary fits
+    while lines and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+
+    return SystemMessage(content= "\n".join([SUMMARY_HEADER] + lines), id= SUMMARY_MESSAGE_ID)
+
+
+def _elide(msg: BaseMessage) -> BaseMessage:
+
+    if isinstance(msg, ToolMessage) and msg.content != ELIDED_TOOL_OUTPUT:
+        return msg.model_copy(update= {"content": ELIDED_TOOL_OUTPUT})
+
+    return msg
+
+
+
+# CONTEXT -> what the nodes hand to their llm chains
+def context_messages(messages: List[BaseMessage], window: int= 4) -> List[BaseMessage]:
+    """
+    The last `window` messages, preceded by the running summary when there is one and it is
+    not in the window already, so the folded turns still reach the llm.
+    """
+
+    recent= list(messages[-window:])
+
+    if len(messages) > window and messages[0].id == SUMMARY_MESSAGE_ID:
+        return [messages[0], *recent]
+
+    return recent
+
+
+
+# COMPACTION
+def compact_messages(messages: List[BaseMessage], max_messages: int= COMPACTION_MAX_MESSAGES, keep_messages: int= COMPACTION_KEEP_MESSAGES, tool_window: int= COMPACTION_TOOL_WINDOW, summary_max_chars: int= COMPACTION_SUMMARY_MAX_CHARS, line_chars: int= COMPACTION_LINE_CHARS) -> List[BaseMessage]:
+    """
+    Returns the `add_messages` update that compacts the history ([] when nothing to do).
+
+    - over `max_messages`: everything but the last `keep_messages` is folded into one running
+      summary message (kept first in the state) and the whole list is replaced
+    - otherwise: tool outputs older than the last `tool_window` messages are replaced in place
+      by a short placeholder (same message id, so the tool call / tool result pairs stay valid)
+    """
+
+    summary= messages[0] if messages and messages[0].id == SUMMARY_MESSAGE_ID else None
+    history= messages[1:] if summary is not None else list(messages)
+
+    if len(history) > max_messages:
+
+        cut= max(0, len(history) - keep_messages)
+
+        # never start the kept window with tool results cut off from their tool call
+        while cut < len(history) and isinstance(history[cut], ToolMessage):
+            cut+= 1
+
+        kept= history[cut:]
+        new_summary= _merge_summary(summary, history[:cut], summary_max_chars, line_chars)
+
+        kept= [_elide(msg) if i < len(kept) - tool_window else msg for i, msg in enumerate(kept)]
+
+        return [RemoveMessage(id= REMOVE_ALL_MESSAGES), new_summary, *kept]
+
+    # only elide stale tool outputs
+    return [
+        _elide(msg)
+        for msg in history[:max(0, len(history) - tool_window)]
+        if isinstance(msg, ToolMessage) and msg.content != ELIDED_TOOL_OUTPUT
+    ]
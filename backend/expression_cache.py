@@ -0,0 +1,196 @@
+# IMPORT PACKAGES
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy
+
+# private numexpr api (getContext, getExprNames, getType, NumExpr, evaluate_lock), the one
+# `numexpr.evaluate` is built on -> pinned to numexpr 2.11.0, check it again on an upgrade
+from numexpr import necompiler
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+
+# CACHE CONSTANTS
+
+# max number of compiled expressions kept (per expression + variable types)
+EXPRESSION_CACHE_MAX_ENTRIES= int(os.getenv("EXPRESSION_CACHE_MAX_ENTRIES", "512"))
+
+# constants every expression may use
+EXPRESSION_CONSTANTS= {"pi": numpy.pi, "e": numpy.e}
+
+
+
+# normalize the expression -> "  2 *  x+1 " and "2*x + 1" compile once
+def normalize_expression(expression: str) -> str:
+    expression= re.sub(r"\s*([-+*/%(),<>=!&|~^])\s*", r"\1", expression.strip())
+
+    return re.sub(r"\s+", " ", expression)
+
+
+
+# COMPILED EXPRESSION CACHE
+class ExpressionCache:
+    """
+    Process wide LRU cache of compiled numexpr programs.
+
+    `numexpr.evaluate` keeps a small thread local cache keyed on the raw string, so tool calls
+    landing on different worker threads (or written with different spacing) parse, sanitize and
+    compile again. Here the parsed variable names are cached per normalized expression and the
+    compiled program per (expression, variable types), shared by every thread.
+    """
+
+    def __init__(self, max_entries: int= EXPRESSION_CACHE_MAX_ENTRIES):
+
+        self.max_entries= max_entries
+
+        # raw or normalized expression -> (normalized expression, names, ex_uses_vml)
+        self._names: "OrderedDict[str, Tuple[str, List[str], bool]]"= OrderedDict()
+
+        # (normalized expression, signature) -> compiled program
+        self._programs: "OrderedDict[Tuple, Any]"= OrderedDict()
+
+        self._lock= threading.Lock()
+
+        # same context `numexpr.evaluate` would build
+        self._context= necompiler.getContext({})
+
+        # counters
+        self.hits= 0
+        self.misses= 0
+
+
+    def _lru_get(self, store: OrderedDict, key):
+
+        value= store.get(key)
+
+        if value is not None:
+            store.move_to_end(key)
+
+        return value
+
+
+    def _lru_put(self, store: OrderedDict, key, value):
+
+        store[key]= value
+        store.move_to_end(key)
+
+        while len(store) > self.max_entries:
+            store.popitem(last= False)
+
+
+    def compile(self, expression: str, variables: Dict[str, Any]):
+        """
+        Returns (program, arguments, ex_uses_vml) ready to run.
+        """
+
+        with self._lock:
+            names_entry= self._lru_get(self._names, expression)
+
+        # parse + sanitize outside the lock, the raw spelling is remembered too so repeats skip the normalization
+        if names_entry is None:
+            normalized= normalize_expression(expression)
+
+            with self._lock:
+                names_entry= self._lru_get(self._names, normalized)
+
+            if names_entry is None:
+                names_entry= (normalized, *necompiler.getExprNames(normalized, self._context, sanitize= True))
+
+            with self._lock:
+                self._lru_put(self._names, normalized, names_entry)
+                self._lru_put(self._names, expression, names_entry)
+
+        expression, names, ex_uses_vml= names_entry
+
+        scope= {**EXPRESSION_CONSTANTS, **variables}
+        missing= [name for name in names if name not in scope]
+
+        if missing:
+            raise ValueError(f"Unknown variable(s) in expression: {', '.join(missing)}")
+
+        arguments= [numpy.asarray(scope[name]) for name in names]
+        signature= tuple((name, necompiler.getType(arg)) for name, arg in zip(names, arguments))
+
+        key= (expression, signature)
+
+        with self._lock:
+            program= self._lru_get(self._programs, key)
+
+            if program is not None:
+                self.hits+= 1
+
+        if program is None:
+            program= necompiler.NumExpr(expression, signature, sanitize= True, **self._context)
+
+            with self._lock:
+                self.misses+= 1
+                self._lru_put(self._programs, key, program)
+
+        return program, arguments, ex_uses_vml
+
+
+    def evaluate(self, expression: str, variables: Optional[Dict[str, Any]]= None) -> numpy.ndarray:
+
+        program, arguments, ex_uses_vml= self.compile(expression, variables or {})
+
+        # the vm and its thread pool are not reentrant -> one run at a time, like `numexpr.evaluate`
+        with necompiler.evaluate_lock:
+            return program(*arguments, out= None, order= "K", casting= "safe", ex_uses_vml= ex_uses_vml)
+
+
+    def evaluate_batch(self, expressions: List[str], variables: Optional[Dict[str, Any]]= None) -> List[Any]:
+        """
+        Evaluate many expressions against the same (scalar or array valued) variables.
+
+        Array valued variables are converted once and every expression runs vectorized over
+        them. A failing expression yields its exception in its slot instead of aborting the batch.
+        """
+
+        variables= {name: numpy.asarray(value) for name, value in (variables or {}).items()}
+
+        results= []
+
+        for expression in expressions:
+            try:
+                results.append(self.evaluate(expression, variables))
+
+            except Exception as e:
+                results.append(e)
+
+        return results
+
+
+    def stats(self) -> Dict[str, Any]:
+
+        total= self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._programs),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+
+# shared cache
+expression_cache= ExpressionCache()
+
+
+
+# turn a numexpr result into plain json values
+def to_python(result: Any) -> Any:
+
+    if isinstance(result, Exception):
+        return f"Error: {str(result)}"
+
+    result= numpy.asarray(result)
+
+    return result.item() if result.ndim == 0 else result.tolist()
@@ -0,0 +1,212 @@
+# IMPORT PACKAGES
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Pattern
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+
+# ROUTER CONSTANTS
+
+# the pre router can be switched off completely
+FAST_ROUTER_ENABLED= os.getenv("FAST_ROUTER_ENABLED", "true").lower() == "true"
+
+# below this confidence the supervisor llm chain decides
+FAST_ROUTER_THRESHOLD= float(os.getenv("FAST_ROUTER_THRESHOLD", "0.8"))
+
+
+
+# ROUTE DECISION
+class RouteDecision(NamedTuple):
+    route: str
+    confidence: float
+    source: str
+
+
+
+# RULE BASED ROUTER -> exact patterns that need no guessing
+class RegexRule:
+
+    def __init__(self, route: str, pattern: str, confidence: float, flags: int= re.IGNORECASE):
+        self.route= route
+        self.confidence= confidence
+        self.pattern: Pattern= re.compile(pattern, flags)
+
+
+    def match(self, text: str) -> Optional[RouteDecision]:
+
+        if self.pattern.search(text):
+            return RouteDecision(self.route, self.confidence, "rule")
+
+        return None
+
+
+
+DEFAULT_RULES= [
+    # small talk -> "hi", "thanks!", "good morning", "bye"
+    RegexRule("greeting", r"^(?=.{0,80}$)\s*((hi+|hello+|hey+|hiya|yo|howdy|greetings|good\s+(morning|afternoon|evening|night)|thanks?|thank\s+you( so much| very much)?|thx|ty|cheers|bye|goodbye|see\s+you|how\s+are\s+you( doing)?)\b[\s!.,?:)]*)+$", 0.97),
+
+    # bare arithmetic -> "37593 * 67", "(2+3)**4 / 7"; digits joined by bare dashes only are
+    # dates, phone numbers, ids ("2024-10-18", "+1-800-555-1234") -> a "-" only counts with spaces
+    # around it or next to another operator ("10 - 3", "10-3*2"), "10-3" goes to the supervisor;
+    # same for slashed dates ("12/04/2024")
+    RegexRule("maths_reasoner", r"^(?=.{0,200}$)(?![\s(+]*[\d.]+(-[\d.]+)+[\s)]*=?\s*\??\s*$)(?!\s*\d{1,2}/\d{1,2}/\d{4}\s*\??\s*$)\s*[-+(]*\s*\d[\d\s.]*(\s*(\*\*|[-+*/%^])\s*[-+(]*\s*\d[\d\s.)]*)+\s*=?\s*\??\s*$", 0.95, 0),
+
+    # fenced code block -> somebody pasted code
+    RegexRule("coder", r"```", 0.9, 0),
+]
+
+
+
+# LEXICAL CLASSIFIER -> weighted keyword votes, no model download, no llm
+class LexicalClassifier:
+    """
+    Tiny bag-of-words classifier with hand weighted vocabularies per route.
+
+    The confidence is the share of the winning route in all the votes, damped by a prior so
+    that a single weak keyword never clears the threshold on its own.
+    """
+
+    VOCABULARY: Dict[str, Dict[str, float]]= {
+        "coder": {
+            "code": 2.0, "python": 2.0, "function": 1.5, "script": 2.0, "debug": 2.5, "bug": 2.0,
+            "error": 1.0, "traceback": 3.0, "exception": 1.5, "class": 1.0, "implement": 1.5,
+            "javascript": 2.5, "typescript": 2.5, "java": 2.0, "sql": 2.0, "regex": 2.0, "api": 1.0,
+            "compile": 1.5, "refactor": 2.5, "program": 1.5, "algorithm": 1.0, "def": 2.0, "import": 1.5,
+            "pandas": 2.0, "numpy": 1.5, "dataframe": 2.0, "plot": 1.0, "html": 2.0, "css": 2.0,
+        },
+        "maths_reasoner": {
+            "solve": 2.0, "equation": 2.5, "integral": 3.0, "integrate": 3.0, "derivative": 3.0,
+            "differentiate": 3.0, "calculate": 2.0, "compute": 1.5, "probability": 2.5, "prove": 2.0,
+            "matrix": 2.0, "sum": 1.0, "product": 0.5, "percent": 1.5, "percentage": 1.5, "sqrt": 2.5,
+            "root": 1.0, "factorial": 3.0, "prime": 1.5, "limit": 1.0, "logarithm": 2.5, "log": 1.0,
+            "algebra": 2.5, "geometry": 2.5, "triangle": 2.0, "area": 1.0, "puzzle": 1.5, "riddle": 2.0,
+        },
+        "researcher": {
+            "who": 1.5, "when": 1.0, "where": 1.0, "history": 2.0, "latest": 2.5, "news": 3.0,
+            "recent": 2.0, "research": 2.5, "study": 1.5, "studies": 2.0, "paper": 2.0, "papers": 2.0,
+            "pubmed": 3.0, "wikipedia": 3.0, "population": 2.0, "capital": 1.5, "president": 2.0,
+            "founded": 2.0, "invented": 2.0, "clinical": 2.5, "disease": 2.0, "treatment": 2.0,
+            "symptoms": 2.0, "statistics": 1.5, "today": 1.5, "current": 1.5, "explain": 0.5,
+        },
+        "greeting": {
+            "hi": 2.0, "hello": 2.5, "hey": 2.0, "thanks": 2.5, "thank": 2.0, "morning": 1.0,
+            "evening": 1.0, "bye": 2.5, "goodbye": 2.5, "nice": 0.5, "meet": 0.5,
+        },
+    }
+
+    # extra mass in the denominator -> few votes mean low confidence
+    PRIOR= 1.5
+
+    TOKEN_PATTERN= re.compile(r"[a-z]+")
+
+
+    def __init__(self, vocabulary: Optional[Dict[str, Dict[str, float]]]= None, prior: float= PRIOR):
+        self.vocabulary= vocabulary or self.VOCABULARY
+        self.prior= prior
+
+
+    def predict(self, text: str) -> Optional[RouteDecision]:
+
+        tokens= Counter(self.TOKEN_PATTERN.findall(text.lower()))
+
+        if not tokens:
+            return None
+
+        scores= {
+            route: sum(weight * tokens[word] for word, weight in words.items() if word in tokens)
+            for route, words in self.vocabulary.items()
+        }
+
+        total= sum(scores.values())
+
+        if total == 0:
+            return None
+
+        best_route= max(scores, key= scores.get)
+
+        return RouteDecision(best_route, scores[best_route] / (total + self.prior), "lexical")
+
+
+
+# FAST PATH ROUTER
+class FastRouter:
+    """
+    Zero-llm pre router for the supervisor.
+
+    Rules run first (in order), then the lexical classifier. A decision is returned only when
+    its confidence clears the threshold, otherwise None and the supervisor falls back to the llm.
+    """
+
+    def __init__(self, rules: Optional[List[RegexRule]]= None, classifier: Optional[LexicalClassifier]= None, threshold: float= FAST_ROUTER_THRESHOLD, enabled: bool= FAST_ROUTER_ENABLED):
+
+        self.rules= list(DEFAULT_RULES if rules is None else rules)
+        self.classifier= LexicalClassifier() if classifier is None else classifier
+        self.threshold= threshold
+        self.enabled= enabled
+
+        # counters
+        self._lock= threading.Lock()
+        self.total= 0
+        self.hits= 0
+        self.hits_by_route= Counter()
+
+
+    def add_rule(self, rule: RegexRule):
+        self.rules.append(rule)
+
+
+    def classify(self, text: str) -> Optional[RouteDecision]:
+
+        for rule in self.rules:
+            decision= rule.match(text)
+
+            if decision is not None:
+                return decision
+
+        if self.classifier is not None:
+            return self.classifier.predict(text)
+
+        return None
+
+
+    def route(self, text: str) -> Optional[RouteDecision]:
+
+        if not self.enabled:
+            return None
+
+        decision= self.classify(text)
+
+        if decision is not None and decision.confidence < self.threshold:
+            decision= None
+
+        with self._lock:
+            self.total+= 1
+
+            if decision is not None:
+                self.hits+= 1
+                self.hits_by_route[decision.route]+= 1
+
+        return decision
+
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "total": self.total,
+            "hits": self.hits,
+            "llm_fallbacks": self.total - self.hits,
+            "hit_rate": self.hits / self.total if self.total else 0.0,
+            "hits_by_route": dict(self.hits_by_route),
+        }
+
+
+
+# shared router
+fast_router= FastRouter()
@@ -1,20 +1,49 @@
 # IMPORT PACKAGES
-from fastapi import FastAPI, Query
-from .ai_agent import graph_builder
+from fastapi import FastAPI, Query, Request
+from .ai_agent import graph_builder, memory
+from backend.checkpointer import ThreadBusyError
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from utils import AgentState
+from utils import warmup, hedged_web_search
+from backend.fast_router import fast_router
+from backend.response_cache import supervisor_cache, enhancer_cache
+from backend.sse import coalesce, content_frame, trace_frame, END_FRAME
+from backend.cancellation import cancel_on_disconnect, run_stats, RunTracker
+from backend import metrics
 from langchain_core.messages import HumanMessage
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from typing import Optional
 import uuid
 from langchain_core.messages import AIMessageChunk
-import json
+import os
+import time
+import threading
+from contextlib import asynccontextmanager
 
 load_dotenv()
 
+# warm the tool clients and llm chains in the background once the server is up
+WARMUP_ON_STARTUP= os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+# answer of a request whose conversation stayed busy with another request for CHECKPOINT_LEASE_WAIT
+BUSY_MESSAGE= "This conversation is still answering a previous message, please send yours again in a moment."
+
+
+# APP LIFESPAN
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    
+    if WARMUP_ON_STARTUP:
+        threading.Thread(target= warmup, name= "warmup", daemon= True).start()
+        
+    yield
+    
+    # persist the conversations still in memory (no-op without CHECKPOINT_SPILL_PATH, or with the shared sqlite backend)
+    memory.flush()
+
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan= lifespan)
 
 agent_app= graph_builder()
 
@@ -26,7 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  
     allow_headers=["*"], 
-    expose_headers=["Content-Type"], 
+    expose_headers=["Content-Type", "X-Trace-Id", "X-Thread-Id"], 
 )
 
 
@@ -53,60 +82,194 @@ async def health_check():
         },
         status_code=200
     )
+
+
+
+# FAST ROUTER STATS ROUTE -> how many supervisor llm calls the pre router saved
+@app.get("/router_stats")
+async def router_stats():
+    return JSONResponse(
+        content= fast_router.stats(),
+        status_code=200
+    )
+    
+    
+# RESPONSE CACHE STATS ROUTE -> supervisor / enhancer llm calls answered from the cache
+@app.get("/response_cache_stats")
+async def response_cache_stats():
+    return JSONResponse(
+        content= {
+            "supervisor": supervisor_cache.stats(),
+            "enhancer": enhancer_cache.stats()
+        },
+        status_code=200
+    )
+
+
+# HEDGED SEARCH STATS ROUTE -> provider latencies, hedge delay and how often the second provider won
+@app.get("/search_stats")
+async def search_stats():
+    return JSONResponse(
+        content= hedged_web_search.stats(),
+        status_code=200
+    )
+
+
+# METRICS ROUTE -> prometheus text format: node, llm, tool and request latencies, tokens, payload sizes
+@app.get("/metrics")
+async def metrics_route():
+    return PlainTextResponse(
+        content= metrics.registry.render(),
+        media_type= "text/plain; version=0.0.4; charset=utf-8",
+        status_code=200
+    )
+
+
+# RUN STATS ROUTE -> runs cancelled because their client went away, and the tokens that saved
+@app.get("/run_stats")
+async def run_stats_route():
+    return JSONResponse(
+        content= run_stats.stats(),
+        status_code=200
+    )
     
     
+# FUNCTION FOR EXTRACTING THE STREAMED TOKENS OUT OF THE GRAPH EVENTS
+async def stream_content(events, run: Optional[RunTracker]= None):
+    
+    async for event in events: 
+        
+        if run is not None:
+            run.observe(event)
+                                
+        if event["event"] == "on_chat_model_stream" and isinstance(event["data"]["chunk"], AIMessageChunk):
+            yield event["data"]["chunk"].content
+
+
 # FUNCTION FOR GENERATING THE AGENT RESPONSE
-async def generate_agent_response(message: str, thread_id: str):
+async def generate_agent_response(message: str, thread_id: str, trace_id: Optional[str]= None):
     
+    trace_id= trace_id or metrics.new_trace_id()
     
-    # memory configuration
+    # memory configuration -> the trace id tags the run (node metrics, langsmith traces)
     memory_config= {
         "configurable": {
             "thread_id": thread_id
+        },
+        "metadata": {
+            "trace_id": trace_id
         }
     }
     
-    # Get saved memory
-    snapshot = agent_app.get_state(config= memory_config)
+    # one request at a time per conversation (across every worker with the shared checkpointer)
+    lease_started_at= time.monotonic()
     
-    if snapshot and "messages" in snapshot.values:
-        old_msgs = snapshot.values["messages"]
+    try:
+        lease= await memory.acquire_thread(thread_id)
         
-    else:
-        old_msgs = []           
+    except ThreadBusyError:
+        metrics.requests_total.inc(status= "busy")
         
-    # invoke the agent
-    events = agent_app.astream_events(input=AgentState(messages= old_msgs + [HumanMessage(content= message)]), version="v2", config= memory_config)
+        yield _sent(trace_frame(trace_id))
+        yield _sent(content_frame(BUSY_MESSAGE))
+        yield _sent(END_FRAME)
+        return
+    
+    # from here on the lease is released whatever fails -> nothing below may run before the try
+    run= events= contents= None
+    in_flight= False
+    
+    # a run that neither completes nor fails was cancelled (its client went away)
+    started_at= time.monotonic()
+    first_content= True
+    status= "cancelled"
+    
+    try:
+        metrics.lease_wait_seconds.observe(started_at - lease_started_at)
         
-
-    # SEND THE EVENTS BACK TO THE USER
-    async for event in events: 
-                                
-        if event["event"] == "on_chat_model_stream":
+        run= run_stats.start()
+        
+        metrics.start_trace(trace_id)
+        metrics.requests_in_flight.inc()
+        in_flight= True
+        
+        # invoke the agent -> only the new msg is sent, the checkpointer already holds the history
+        # (the add_messages reducer appends it), a run that died mid tool call must not leak `used_tools`
+        events = agent_app.astream_events(input= {"messages": [HumanMessage(content= message)], "used_tools": False}, version="v2", config= memory_config)
+        
+        # tokens are coalesced into fewer, larger frames
+        contents= coalesce(stream_content(events, run))
+        
+        # SEND THE TRACE ID FIRST
+        yield _sent(trace_frame(trace_id))
+        
+        # SEND THE EVENTS BACK TO THE USER
+        async for content in contents:
             
-            if isinstance(event["data"]["chunk"], AIMessageChunk):
-                event_content= event["data"]["chunk"].content
-                
-                safe_content = event_content.replace("'", "\\'").replace("\n", "\\n")
+            if first_content:
+                metrics.request_first_token_seconds.observe(time.monotonic() - started_at)
+                first_content= False
+            
+            yield _sent(content_frame(content))
                 
-                safe_content_json= {
-                    "type": "content",
-                    "content": safe_content
-                }
+        run.completed= True
+        status= "completed"
                 
-                yield f"data: {json.dumps(safe_content_json)}\n\n"
+        # SEND THE END OF STREAM SIGNAL
+        yield _sent(END_FRAME)
+    
+    except Exception:
+        status= "error"
+        raise
+    
+    finally:
+        try:
+            # closing the events stops the graph run (and its llm / tool calls) if it is still going,
+            # the coalescing reader still iterating them has to stop first
+            if contents is not None:
+                await contents.aclose()
+            
+            if events is not None:
+                await events.aclose()
+            
+            if run is not None:
+                run_stats.finish(run)
+            
+            metrics.requests_total.inc(status= status)
+            metrics.request_seconds.observe(time.monotonic() - started_at)
             
+            if in_flight:
+                metrics.requests_in_flight.dec()
             
-    # SEND THE END OF STREAM SIGNAL
-    yield "data: {\"type\": \"end\"}\n\n"
+            metrics.finish_trace(trace_id)
+        
+        finally:
+            # last -> the shared checkpointer releases on a worker thread
+            await memory.arelease_thread(thread_id, lease)
+
+
+# count an sse frame on its way out
+def _sent(frame: str) -> str:
+    
+    metrics.sse_frames.inc()
+    metrics.sse_bytes.inc(len(frame.encode("utf-8")))
+    
+    return frame
 
 
 
-# CHAT STREAM ROUTE
+# CHAT STREAM ROUTE -> the run is cancelled as soon as the client disconnects
 @app.get("/chat_stream/{message}")
-def chat_stream(message: str, thread_id: Optional[str] = Query(default= None, description="Optional thread ID for existing conversations")):
+def chat_stream(request: Request, message: str, thread_id: Optional[str] = Query(default= None, description="Optional thread ID for existing conversations, a new one is generated otherwise")):
+    
+    # a caller supplied trace id (X-Trace-Id) is reused, it comes back in the header and the first frame
+    trace_id= metrics.new_trace_id(request.headers.get("X-Trace-Id"))
+    
+    # no thread id -> a new conversation of its own (sent back in X-Thread-Id), never one shared lease
+    thread_id= thread_id or str(uuid.uuid4())
     
     return StreamingResponse(
-        generate_agent_response(message, thread_id),
-        media_type="text/event-stream"
-    )
\ No newline at end of file
+        cancel_on_disconnect(request, generate_agent_response(message, thread_id, trace_id)),
+        media_type="text/event-stream",
+        headers={"X-Trace-Id": trace_id, "X-Thread-Id": thread_id}
+    )
@@ -0,0 +1,338 @@
+# IMPORT PACKAGES
+import os
+import time
+import asyncio
+import bisect
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+
+# HEDGING CONSTANTS
+
+# race the web search against a second provider (off -> the primary provider only)
+HEDGED_SEARCH= os.getenv("HEDGED_SEARCH", "false").lower() == "true"
+
+# the secondary is launched once the primary took longer than this quantile of its latency
+HEDGE_QUANTILE= float(os.getenv("HEDGE_QUANTILE", "0.9"))
+
+# bounds (seconds) of that delay
+HEDGE_MIN_DELAY= float(os.getenv("HEDGE_MIN_DELAY", "0.3"))
+HEDGE_MAX_DELAY= float(os.getenv("HEDGE_MAX_DELAY", "5"))
+
+# delay used until the primary has `HEDGE_MIN_SAMPLES` recorded latencies
+HEDGE_DEFAULT_DELAY= float(os.getenv("HEDGE_DEFAULT_DELAY", "1.5"))
+HEDGE_MIN_SAMPLES= int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+# latency histogram buckets (upper bounds, seconds)
+LATENCY_BUCKETS= (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0)
+
+# every this many samples the counts are halved -> the histogram follows the recent latency
+LATENCY_HALF_LIFE= 500
+
+
+
+# LATENCY HISTOGRAM
+class LatencyHistogram:
+    """
+    Bucketed latency histogram with exponential forgetting.
+
+    `quantile` interpolates linearly inside the bucket holding the requested rank (like
+    prometheus' histogram_quantile). Every `half_life` samples all the counts are halved, so
+    an old slow (or fast) period stops steering the estimate.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]= LATENCY_BUCKETS, half_life: int= LATENCY_HALF_LIFE):
+
+        self.buckets= tuple(sorted(buckets))
+        self.half_life= half_life
+
+        # one count per bucket plus the +Inf one
+        self._counts: List[float]= [0.0] * (len(self.buckets) + 1)
+        self._since_decay= 0
+        self._lock= threading.Lock()
+
+        # lifetime counters
+        self.samples= 0
+        self.total_seconds= 0.0
+
+
+    def record(self, seconds: float):
+
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, seconds)]+= 1
+
+            self.samples+= 1
+            self.total_seconds+= seconds
+            self._since_decay+= 1
+
+            if self._since_decay >= self.half_life:
+                self._counts= [count / 2 for count in self._counts]
+                self._since_decay= 0
+
+
+    def count(self) -> float:
+
+        with self._lock:
+            return sum(self._counts)
+
+
+    def quantile(self, q: float) -> Optional[float]:
+
+        with self._lock:
+            total= sum(self._counts)
+
+            if not total:
+                return None
+
+            rank= q * total
+            cumulative= 0.0
+
+            for index, count in enumerate(self._counts):
+
+                if count and cumulative + count >= rank:
+
+                    # the +Inf bucket has no upper bound -> report the largest finite one
+                    if index == len(self.buckets):
+                        return self.buckets[-1]
+
+                    lower= self.buckets[index - 1] if index else 0.0
+
+                    return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+
+                cumulative+= count
+
+            return self.buckets[-1]
+
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "mean": self.total_seconds / self.samples if self.samples else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+
+# SEARCH PROVIDER -> one search backend, sync and async entry points
+class SearchProvider(NamedTuple):
+    name: str
+    run: Callable[[str], Any]
+    arun: Callable[[str], Awaitable[Any]]
+
+
+
+# HEDGED SEARCH
+class HedgedSearch:
+    """
+    Runs a query on the primary provider and, if it has not answered after the `quantile`
+    of its own recent latency, on the secondary too; the first answer wins and the other call
+    is cancelled. A failing provider hands over to the other one right away.
+
+    Only the slow tail of the primary pays for a second call (~1 - quantile of the queries),
+    and the delay adapts as the primary's latency histogram moves.
+    """
+
+    def __init__(self, primary: SearchProvider, secondary: SearchProvider, quantile: float= HEDGE_QUANTILE, min_delay: float= HEDGE_MIN_DELAY, max_delay: float= HEDGE_MAX_DELAY, default_delay: float= HEDGE_DEFAULT_DELAY, min_samples: int= HEDGE_MIN_SAMPLES):
+
+        self.primary= primary
+        self.secondary= secondary
+        self.quantile= quantile
+        self.min_delay= min_delay
+        self.max_delay= max_delay
+        self.default_delay= default_delay
+        self.min_samples= min_samples
+
+        # provider name -> latency of its successful calls
+        self.histograms: Dict[str, LatencyHistogram]= {primary.name: LatencyHistogram(), secondary.name: LatencyHistogram()}
+
+        # sync path -> each provider call runs in its own thread (the loser is left to finish)
+        self._pool= ThreadPoolExecutor(max_workers= 8, thread_name_prefix= "hedge")
+        self._lock= threading.Lock()
+
+        # counters
+        self.calls= 0
+        self.hedged= 0
+        self.wins= {primary.name: 0, secondary.name: 0}
+        self.failures= {primary.name: 0, secondary.name: 0}
+
+
+    def hedge_delay(self) -> float:
+
+        histogram= self.histograms[self.primary.name]
+
+        if histogram.count() < self.min_samples:
+            return self.default_delay
+
+        return min(self.max_delay, max(self.min_delay, histogram.quantile(self.quantile)))
+
+
+    def _record(self, provider: SearchProvider, started_at: float, ok: bool):
+
+        if ok:
+            self.histograms[provider.name].record(time.monotonic() - started_at)
+
+        else:
+            with self._lock:
+                self.failures[provider.name]+= 1
+
+
+    def _started(self):
+
+        with self._lock:
+            self.calls+= 1
+
+
+    def _hedging(self):
+
+        with self._lock:
+            self.hedged+= 1
+
+
+    def _won(self, provider: SearchProvider):
+
+        with self._lock:
+            self.wins[provider.name]+= 1
+
+
+    # ASYNC PATH
+
+    async def _acall(self, provider: SearchProvider, query: str) -> Any:
+
+        started_at= time.monotonic()
+
+        try:
+            result= await provider.arun(query)
+
+        except asyncio.CancelledError:
+            # lost the race -> its latency is at least this long, dropping the sample would
+            # leave only the fast calls in the histogram and pull the hedge delay down
+            self._record(provider, started_at, True)
+            raise
+
+        except Exception:
+            self._record(provider, started_at, False)
+            raise
+
+        self._record(provider, started_at, True)
+
+        return result
+
+
+    async def arun(self, query: str) -> Any:
+
+        self._started()
+
+        primary= asyncio.ensure_future(self._acall(self.primary, query))
+        tasks= {primary: self.primary}
+
+        try:
+            done, _= await asyncio.wait({primary}, timeout= self.hedge_delay())
+
+            # fast (or failed fast) primary -> no second call unless it failed
+            if done and not primary.exception():
+                self._won(self.primary)
+                return primary.result()
+
+            self._hedging()
+            secondary= asyncio.ensure_future(self._acall(self.secondary, query))
+            tasks[secondary]= self.secondary
+
+            pending= set(tasks)
+            error= None
+
+            while pending:
+                done, pending= await asyncio.wait(pending, return_when= asyncio.FIRST_COMPLETED)
+
+                for task in done:
+
+                    if task.exception() is None:
+                        self._won(tasks[task])
+                        return task.result()
+
+                    error= error or task.exception()
+
+            raise error
+
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+    # SYNC PATH
+
+    def _call(self, provider: SearchProvider, query: str) -> Any:
+
+        started_at= time.monotonic()
+
+        try:
+            result= provider.run(query)
+
+        except Exception:
+            self._record(provider, started_at, False)
+            raise
+
+        self._record(provider, started_at, True)
+
+        return result
+
+
+    def run(self, query: str) -> Any:
+
+        self._started()
+
+        primary= self._pool.submit(self._call, self.primary, query)
+        futures= {primary: self.primary}
+
+        done, _= wait([primary], timeout= self.hedge_delay())
+
+        if done and primary.exception() is None:
+            self._won(self.primary)
+            return primary.result()
+
+        self._hedging()
+        secondary= self._pool.submit(self._call, self.secondary, query)
+        futures[secondary]= self.secondary
+
+        pending= set(futures)
+        error= None
+
+        while pending:
+            done, pending= wait(pending, return_when= FIRST_COMPLETED)
+
+            for future in done:
+
+                if future.exception() is None:
+
+                    # a running thread can not be stopped, a queued call is dropped
+                    for other in pending:
+                        other.cancel()
+
+                    self._won(futures[future])
+                    return future.result()
+
+                error= error or future.exception()
+
+        raise error
+
+
+    def stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+                "hedge_delay": self.hedge_delay(),
+                "wins": dict(self.wins),
+                "failures": dict(self.failures),
+                "latency": {name: histogram.snapshot() for name, histogram in self.histograms.items()},
+            }
@@ -0,0 +1,128 @@
+# IMPORT PACKAGES
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+logger= logging.getLogger(__name__)
+
+
+
+# LAZY RESOURCE
+class LazyResource:
+    """
+    A heavy object (tool client, llm, ...) that is imported and built on first use.
+
+    The factory runs at most once, even when several threads ask for it at the same time.
+    `set` replaces the value outright (benchmarks swap in fakes this way).
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name= name
+        self.factory= factory
+
+        self._value= None
+        self._loaded= False
+        self._lock= threading.Lock()
+
+        # how long the factory took (seconds), None until loaded
+        self.load_time: Optional[float]= None
+
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+
+    def get(self) -> Any:
+
+        # fast path -> no lock once built
+        if self._loaded:
+            return self._value
+
+        with self._lock:
+
+            if not self._loaded:
+                started_at= time.perf_counter()
+
+                self._value= self.factory()
+                self._loaded= True
+
+                self.load_time= time.perf_counter() - started_at
+                logger.debug("lazy resource '%s' loaded in %.3fs", self.name, self.load_time)
+
+        return self._value
+
+
+    def set(self, value: Any):
+
+        with self._lock:
+            self._value= value
+            self._loaded= True
+
+
+    def reset(self):
+
+        with self._lock:
+            self._value= None
+            self._loaded= False
+            self.load_time= None
+
+
+
+# LAZY REGISTRY
+class LazyRegistry:
+    """
+    Named collection of lazy resources with an optional warmup.
+    """
+
+    def __init__(self):
+        self._resources: Dict[str, LazyResource]= {}
+
+
+    def register(self, name: str, factory: Callable[[], Any]) -> LazyResource:
+
+        resource= LazyResource(name, factory)
+        self._resources[name]= resource
+
+        return resource
+
+
+    def get(self, name: str) -> Any:
+        return self._resources[name].get()
+
+
+    def warmup(self, names: Optional[Iterable[str]]= None):
+        """
+        Load the given resources (all of them by default). A failing factory is logged and
+        skipped, it will simply be retried on first real use.
+        """
+
+        for name in (self._resources if names is None else names):
+
+            try:
+                self._resources[name].get()
+
+            except Exception:
+                logger.warning("warmup of '%s' failed", name, exc_info= True)
+
+
+    def warmup_in_background(self, names: Optional[Iterable[str]]= None) -> threading.Thread:
+
+        thread= threading.Thread(target= self.warmup, args= (names,), name= "lazy-warmup", daemon= True)
+        thread.start()
+
+        return thread
+
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {"loaded": resource.loaded, "load_time": resource.load_time}
+            for name, resource in self._resources.items()
+        }
+
+
+
+# shared registry for the tools and the llm
+lazy_registry= LazyRegistry()
@@ -0,0 +1,333 @@
+# IMPORT PACKAGES
+import os
+import re
+import uuid
+import hashlib
+import secrets
+import sqlite3
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Union
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+
+# LOCAL DATABASE CONSTANTS
+
+# sqlite file of the offline stand-in (":memory:" for a throwaway database)
+LOCAL_DATABASE_PATH= os.getenv("LOCAL_DATABASE_PATH", "local_database.sqlite3")
+
+# same tables as the supabase project (see backend/migrations)
+LOCAL_SCHEMA= """
+CREATE TABLE IF NOT EXISTS session (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    message_id TEXT
+);
+
+CREATE INDEX IF NOT EXISTS session_user_session_idx ON session (user_id, session_id, id);
+
+CREATE TABLE IF NOT EXISTS session_summary (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL UNIQUE,
+    user_id TEXT NOT NULL,
+    first_query TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS session_summary_user_created_idx ON session_summary (user_id, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS local_users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    salt TEXT NOT NULL
+);
+"""
+
+IDENTIFIER= re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+OPERATORS= {"eq": "=", "neq": "!=", "lt": "<", "lte": "<=", "gt": ">", "gte": ">="}
+
+
+
+# column and table names are interpolated into the sql -> only plain identifiers are accepted
+def _identifier(name: str) -> str:
+
+    name= name.strip()
+
+    if not IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+
+    return name
+
+
+
+# QUERY BUILDER
+class LocalQuery:
+    """
+    The subset of the supabase (postgrest) query builder the app uses, run against sqlite:
+    insert / upsert / select / delete, eq / neq / lt / lte / gt / gte / in_ filters, order,
+    limit, offset, range, and execute() returning an object with `.data`.
+    """
+
+    def __init__(self, client: "LocalClient", table: str):
+
+        self.client= client
+        self.table= _identifier(table)
+
+        self._operation= "select"
+        self._columns= "*"
+        self._rows: List[Dict[str, Any]]= []
+        self._on_conflict= ""
+        self._ignore_duplicates= False
+
+        self._filters: List[str]= []
+        self._params: List[Any]= []
+        self._order: List[str]= []
+        self._limit: Optional[int]= None
+        self._offset: Optional[int]= None
+
+
+    # OPERATIONS
+
+    def select(self, columns: str= "*"):
+
+        self._operation= "select"
+        self._columns= "*" if columns.strip() == "*" else ", ".join(_identifier(column) for column in columns.split(","))
+
+        return self
+
+
+    def insert(self, json: Union[Dict, List[Dict]]):
+
+        self._operation= "insert"
+        self._rows= [json] if isinstance(json, dict) else list(json)
+
+        return self
+
+
+    def upsert(self, json: Union[Dict, List[Dict]], *, ignore_duplicates: bool= False, on_conflict: str= ""):
+
+        self._operation= "upsert"
+        self._rows= [json] if isinstance(json, dict) else list(json)
+        self._ignore_duplicates= ignore_duplicates
+        self._on_conflict= on_conflict
+
+        return self
+
+
+    def delete(self):
+
+        self._operation= "delete"
+
+        return self
+
+
+    # FILTERS
+
+    def _filter(self, column: str, operator: str, value: Any):
+
+        self._filters.append(f"{_identifier(column)} {operator} ?")
+        self._params.append(value)
+
+        return self
+
+
+    def eq(self, column: str, value: Any):
+        return self._filter(column, OPERATORS["eq"], value)
+
+
+    def neq(self, column: str, value: Any):
+        return self._filter(column, OPERATORS["neq"], value)
+
+
+    def lt(self, column: str, value: Any):
+        return self._filter(column, OPERATORS["lt"], value)
+
+
+    def lte(self, column: str, value: Any):
+        return self._filter(column, OPERATORS["lte"], value)
+
+
+    def gt(self, column: str, value: Any):
+        return self._filter(column, OPERATORS["gt"], value)
+
+
+    def gte(self, column: str, value: Any):
+        return self._filter(column, OPERATORS["gte"], value)
+
+
+    def in_(self, column: str, values: List[Any]):
+
+        values= list(values)
+
+        self._filters.append(f"{_identifier(column)} IN ({', '.join('?' for _ in values)})" if values else "0")
+        self._params.extend(values)
+
+        return self
+
+
+    # MODIFIERS
+
+    def order(self, column: str, *, desc: bool= False):
+
+        self._order.append(f"{_identifier(column)} {'DESC' if desc else 'ASC'}")
+
+        return self
+
+
+    def limit(self, size: int):
+
+        self._limit= int(size)
+
+        return self
+
+
+    def offset(self, size: int):
+
+        self._offset= int(size)
+
+        return self
+
+
+    # inclusive on both ends, like postgrest
+    def range(self, start: int, end: int):
+
+        self._offset= int(start)
+        self._limit= int(end) - int(start) + 1
+
+        return self
+
+
+    # EXECUTE
+
+    def _where(self) -> str:
+        return f" WHERE {' AND '.join(self._filters)}" if self._filters else ""
+
+
+    def execute(self):
+
+        with self.client.lock:
+            cursor= self.client.connection.cursor()
+
+            if self._operation == "select":
+                sql= f"SELECT {self._columns} FROM {self.table}{self._where()}"
+
+                if self._order:
+                    sql+= f" ORDER BY {', '.join(self._order)}"
+
+                if self._limit is not None or self._offset is not None:
+                    sql+= f" LIMIT {self._limit if self._limit is not None else -1} OFFSET {self._offset or 0}"
+
+                data= [dict(row) for row in cursor.execute(sql, self._params).fetchall()]
+
+            elif self._operation == "delete":
+                data= [dict(row) for row in cursor.execute(f"DELETE FROM {self.table}{self._where()} RETURNING *", self._params).fetchall()]
+
+            else:
+                data= []
+
+                for row in self._rows:
+                    columns= [_identifier(column) for column in row]
+                    sql= f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+
+                    if self._operation == "upsert":
+                        conflict= ", ".join(_identifier(column) for column in self._on_conflict.split(",")) if self._on_conflict else "id"
+
+                        if self._ignore_duplicates:
+                            sql+= f" ON CONFLICT ({conflict}) DO NOTHING"
+
+                        else:
+                            sql+= f" ON CONFLICT ({conflict}) DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in columns)}"
+
+                    data+= [dict(inserted) for inserted in cursor.execute(sql + " RETURNING *", list(row.values())).fetchall()]
+
+            self.client.connection.commit()
+
+        return SimpleNamespace(data= data, count= None)
+
+
+
+# AUTH
+class LocalAuth:
+    """
+    Email + password accounts kept in the local database (no email confirmation).
+    """
+
+    def __init__(self, client: "LocalClient"):
+        self.client= client
+
+
+    @staticmethod
+    def _hash(password: str, salt: str) -> str:
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(salt), 200_000).hex()
+
+
+    def sign_up(self, credentials: Dict[str, Any]):
+
+        salt= secrets.token_hex(16)
+        user_id= str(uuid.uuid4())
+
+        with self.client.lock:
+            try:
+                self.client.connection.execute(
+                    "INSERT INTO local_users (id, email, password_hash, salt) VALUES (?, ?, ?, ?)",
+                    (user_id, credentials["email"], self._hash(credentials["password"], salt), salt),
+                )
+                self.client.connection.commit()
+
+            except sqlite3.IntegrityError:
+                raise Exception("User already registered") from None
+
+        return SimpleNamespace(user= SimpleNamespace(id= user_id, email= credentials["email"]), session= None)
+
+
+    def sign_in_with_password(self, credentials: Dict[str, Any]):
+
+        with self.client.lock:
+            row= self.client.connection.execute(
+                "SELECT id, password_hash, salt FROM local_users WHERE email = ?",
+                (credentials["email"],),
+            ).fetchone()
+
+        if row is None or not secrets.compare_digest(row["password_hash"], self._hash(credentials["password"], row["salt"])):
+            raise Exception("Invalid login credentials")
+
+        return SimpleNamespace(user= SimpleNamespace(id= row["id"], email= credentials["email"]), session= None)
+
+
+
+# CLIENT
+class LocalClient:
+    """
+    Offline stand-in for the supabase `Client`: `table(name)` and `auth` backed by one sqlite
+    file, so the app (and its database code) runs without a supabase project.
+    """
+
+    def __init__(self, path: str= LOCAL_DATABASE_PATH):
+
+        self.connection= sqlite3.connect(path, check_same_thread= False)
+        self.connection.row_factory= sqlite3.Row
+        self.connection.executescript(LOCAL_SCHEMA)
+
+        # files created before the message_id column (backend/migrations/003_session_message_id.sql)
+        if "message_id" not in {row["name"] for row in self.connection.execute("PRAGMA table_info(session)")}:
+            self.connection.execute("ALTER TABLE session ADD COLUMN message_id TEXT")
+
+        self.connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS session_message_id_idx ON session (message_id)")
+        self.connection.commit()
+
+        self.lock= threading.Lock()
+        self.auth= LocalAuth(self)
+
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self, name)
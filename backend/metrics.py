@@ -0,0 +1,488 @@
+# IMPORT PACKAGES
+import os
+import re
+import time
+import uuid
+import bisect
+import asyncio
+import functools
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langgraph.config import get_config
+from langgraph.types import Command
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+
+# METRICS CONSTANTS
+
+# instrument the graph nodes, llm calls and tool calls for GET /metrics (the /chat_stream
+# request metrics are always recorded)
+METRICS_ENABLED= os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# histogram buckets (upper bounds) of the durations (seconds) and the payload sizes (bytes)
+SECONDS_BUCKETS= (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS= (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# a client supplied trace id (X-Trace-Id) is kept only if it looks like one
+TRACE_ID= re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) or abs(value) >= 1e15 else str(int(value))
+
+
+
+# METRICS -> prometheus text exposition, no client library needed
+class Metric:
+    """
+    One metric family: a value (or a set of bucket counts) per combination of label values.
+    """
+
+    kind= "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...]= ()):
+
+        self.name= name
+        self.documentation= documentation
+        self.labels= tuple(labels)
+
+        self._values: Dict[Tuple[str, ...], Any]= {}
+        self._lock= threading.Lock()
+
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+
+    def _label_text(self, key: Tuple[str, ...], extra: str= "") -> str:
+
+        pairs= [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, key)]
+
+        if extra:
+            pairs.append(extra)
+
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+    def _samples(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_format(value)}"]
+
+
+    def render(self) -> str:
+
+        lines= [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._samples(key, value))
+
+        return "\n".join(lines)
+
+
+    def clear(self):
+
+        with self._lock:
+            self._values.clear()
+
+
+
+class Counter(Metric):
+
+    kind= "counter"
+
+    def inc(self, amount: float= 1.0, **labels):
+
+        key= self._key(labels)
+
+        with self._lock:
+            self._values[key]= self._values.get(key, 0.0) + amount
+
+
+    def value(self, **labels) -> float:
+
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+
+class Gauge(Metric):
+
+    kind= "gauge"
+
+    def set(self, value: float, **labels):
+
+        with self._lock:
+            self._values[self._key(labels)]= value
+
+
+    def inc(self, amount: float= 1.0, **labels):
+
+        key= self._key(labels)
+
+        with self._lock:
+            self._values[key]= self._values.get(key, 0.0) + amount
+
+
+    def dec(self, amount: float= 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+
+class Histogram(Metric):
+    """
+    Cumulative histogram (no forgetting, unlike the hedging one): per label set, one count
+    per bucket plus +Inf, the sum and the count of the observations.
+    """
+
+    kind= "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...]= (), buckets: Tuple[float, ...]= SECONDS_BUCKETS):
+
+        super().__init__(name, documentation, labels)
+
+        self.buckets= tuple(sorted(buckets))
+
+
+    def observe(self, value: float, **labels):
+
+        key= self._key(labels)
+
+        with self._lock:
+            counts, total= self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+
+            counts[bisect.bisect_left(self.buckets, value)]+= 1
+
+            self._values[key]= (counts, total + value)
+
+
+    def count(self, **labels) -> int:
+
+        with self._lock:
+            entry= self._values.get(self._key(labels))
+
+            return sum(entry[0]) if entry else 0
+
+
+    def _samples(self, key: Tuple[str, ...], value: Any) -> List[str]:
+
+        counts, total= value
+        lines, cumulative= [], 0
+
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative+= count
+            le= "+Inf" if bound == float("inf") else _format(bound)
+            extra= f'le="{le}"'
+
+            lines.append(f"{self.name}_bucket{self._label_text(key, extra)} {cumulative}")
+
+        lines.append(f"{self.name}_sum{self._label_text(key)} {_format(total)}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+
+        return lines
+
+
+
+class MetricsRegistry:
+
+    def __init__(self, enabled: bool= METRICS_ENABLED):
+
+        self.enabled= enabled
+        self._metrics: Dict[str, Metric]= {}
+
+
+    def _register(self, metric: Metric) -> Metric:
+
+        if metric.name in self._metrics:
+            raise ValueError(f"metric '{metric.name}' is already registered")
+
+        self._metrics[metric.name]= metric
+
+        return metric
+
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...]= ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+
+    def gauge(self, name: str, documentation: str, labels: Tuple[str, ...]= ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+
+    def histogram(self, name: str, documentation: str, labels: Tuple[str, ...]= (), buckets: Tuple[float, ...]= SECONDS_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+    def clear(self):
+
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+
+# shared registry and the metrics of the app
+registry= MetricsRegistry()
+
+# graph nodes
+node_seconds= registry.histogram("agent_node_duration_seconds", "Wall time of one graph node run.", ("node",))
+node_queue_seconds= registry.histogram("agent_node_queue_wait_seconds", "Time between the previous step of the request (or its arrival) and the start of the node.", ("node",))
+node_errors= registry.counter("agent_node_errors_total", "Graph node runs that raised.", ("node",))
+transitions= registry.counter("agent_transitions_total", "Node hand-offs: the supervisor's route choices, enhancer -> supervisor hops, ...", ("node", "goto"))
+
+# llm calls
+llm_seconds= registry.histogram("agent_llm_duration_seconds", "Wall time of one llm call.", ("node",))
+llm_first_token_seconds= registry.histogram("agent_llm_first_token_seconds", "Time to the first streamed token of an llm call.", ("node",))
+llm_tokens= registry.counter("agent_llm_tokens_total", "LLM tokens (provider usage, ~4 characters per token when it reports none).", ("node", "kind"))
+llm_errors= registry.counter("agent_llm_errors_total", "LLM calls that failed.", ("node",))
+
+# tool calls
+tool_seconds= registry.histogram("agent_tool_duration_seconds", "Wall time of one tool call.", ("tool",))
+tool_queue_seconds= registry.histogram("agent_tool_queue_wait_seconds", "Time a tool call waited for a free executor slot.", ("tool",))
+tool_calls= registry.counter("agent_tool_calls_total", "Tool calls by outcome.", ("tool", "status"))
+tool_input_bytes= registry.histogram("agent_tool_input_bytes", "Size of the tool call arguments (json).", ("tool",), BYTES_BUCKETS)
+tool_output_bytes= registry.histogram("agent_tool_output_bytes", "Size of the tool output handed back to the llm.", ("tool",), BYTES_BUCKETS)
+
+# streamed requests
+requests_total= registry.counter("agent_requests_total", "/chat_stream requests by outcome.", ("status",))
+requests_in_flight= registry.gauge("agent_requests_in_flight", "/chat_stream requests still streaming.")
+request_seconds= registry.histogram("agent_request_duration_seconds", "Wall time of a /chat_stream request.")
+lease_wait_seconds= registry.histogram("agent_thread_lease_wait_seconds", "Time a /chat_stream request waited for another request of its conversation to finish.")
+request_first_token_seconds= registry.histogram("agent_request_first_token_seconds", "Time to the first content frame of a /chat_stream request.")
+sse_frames= registry.counter("agent_sse_frames_total", "SSE frames sent.")
+sse_bytes= registry.counter("agent_sse_bytes_total", "SSE bytes sent.")
+
+
+
+# TRACES -> one per streamed request, its id rides along in the run config metadata
+
+# trace id -> end of its latest node (or its arrival), the next node's queue wait starts there
+_trace_marks: Dict[str, float]= {}
+_trace_lock= threading.Lock()
+
+
+def new_trace_id(candidate: Optional[str]= None) -> str:
+    return candidate if candidate and TRACE_ID.fullmatch(candidate) else uuid.uuid4().hex
+
+
+def start_trace(trace_id: str):
+
+    with _trace_lock:
+        _trace_marks[trace_id]= time.monotonic()
+
+
+def finish_trace(trace_id: str):
+
+    with _trace_lock:
+        _trace_marks.pop(trace_id, None)
+
+
+def _current_trace_id() -> Optional[str]:
+
+    try:
+        return get_config().get("metadata", {}).get("trace_id")
+
+    # outside of a graph run
+    except RuntimeError:
+        return None
+
+
+
+# NODE INSTRUMENTATION
+class _NodeRun:
+
+    def __init__(self, name: str):
+
+        self.name= name
+        self.trace_id= _current_trace_id()
+        self.started_at= time.monotonic()
+
+        if self.trace_id is not None:
+            with _trace_lock:
+                mark= _trace_marks.get(self.trace_id)
+
+            if mark is not None:
+                node_queue_seconds.observe(max(0.0, self.started_at - mark), node= name)
+
+
+    def finish(self, result: Any= None, error: bool= False):
+
+        ended_at= time.monotonic()
+
+        node_seconds.observe(ended_at - self.started_at, node= self.name)
+
+        if error:
+            node_errors.inc(node= self.name)
+
+        elif isinstance(result, Command) and isinstance(result.goto, str):
+            transitions.inc(node= self.name, goto= result.goto)
+
+        if self.trace_id is not None:
+            with _trace_lock:
+                if self.trace_id in _trace_marks:
+                    _trace_marks[self.trace_id]= ended_at
+
+        return result
+
+
+def instrument_node(name: str, node: Callable) -> Callable:
+    """
+    Wrap a graph node (sync or async) so every run records its wall time, its queue wait,
+    the Command it hands over with and whether it raised. Anything that is not a plain
+    function (a compiled subgraph) is returned as is, its own nodes are instrumented.
+    """
+
+    if not registry.enabled or not callable(node) or not hasattr(node, "__code__"):
+        return node
+
+    if asyncio.iscoroutinefunction(node):
+
+        @functools.wraps(node)
+        async def instrumented(state):
+
+            run= _NodeRun(name)
+
+            try:
+                result= await node(state)
+
+            except Exception:
+                run.finish(error= True)
+                raise
+
+            return run.finish(result)
+
+    else:
+
+        @functools.wraps(node)
+        def instrumented(state):
+
+            run= _NodeRun(name)
+
+            try:
+                result= node(state)
+
+            except Exception:
+                run.finish(error= True)
+                raise
+
+            return run.finish(result)
+
+    return instrumented
+
+
+
+# TOOL INSTRUMENTATION
+def payload_bytes(value: Any) -> int:
+    return len(str(value).encode("utf-8", errors= "replace"))
+
+
+# `status` None -> timings only, the outcome is counted by another call
+def record_tool_call(name: str, status: Optional[str], seconds: Optional[float]= None, queue_wait: Optional[float]= None, input_bytes: Optional[int]= None, output_bytes: Optional[int]= None):
+
+    if not registry.enabled:
+        return
+
+    if status is not None:
+        tool_calls.inc(tool= name, status= status)
+
+    if seconds is not None:
+        tool_seconds.observe(seconds, tool= name)
+
+    if queue_wait is not None:
+        tool_queue_seconds.observe(queue_wait, tool= name)
+
+    if input_bytes is not None:
+        tool_input_bytes.observe(input_bytes, tool= name)
+
+    if output_bytes is not None:
+        tool_output_bytes.observe(output_bytes, tool= name)
+
+
+
+# LLM INSTRUMENTATION
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    Callback handler attached to the model of every chain: wall time, time to first token and
+    tokens of every llm call, labelled with the graph node that made it.
+    """
+
+    # cheap and thread safe -> no need to be moved off the event loop
+    run_inline= True
+
+    def __init__(self):
+
+        # llm run id -> (node, started at, prompt characters, first token seen)
+        self._runs: Dict[UUID, List[Any]]= {}
+        self._lock= threading.Lock()
+
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, metadata: Optional[Dict[str, Any]]= None, **kwargs: Any):
+
+        node= (metadata or {}).get("langgraph_node", "")
+        prompt_chars= sum(len(str(message.content)) for batch in messages for message in batch)
+
+        with self._lock:
+            self._runs[run_id]= [node, time.monotonic(), prompt_chars, False]
+
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any):
+
+        with self._lock:
+            run= self._runs.get(run_id)
+
+            if run is None or run[3]:
+                return
+
+            run[3]= True
+
+        llm_first_token_seconds.observe(time.monotonic() - run[1], node= run[0])
+
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+
+        with self._lock:
+            run= self._runs.pop(run_id, None)
+
+        if run is None:
+            return
+
+        node, started_at, prompt_chars, _= run
+
+        llm_seconds.observe(time.monotonic() - started_at, node= node)
+
+        generation= response.generations[0][0] if response.generations and response.generations[0] else None
+        message= getattr(generation, "message", None)
+        usage= getattr(message, "usage_metadata", None) or {}
+
+        completion_chars= len(str(message.content)) + len(str(message.tool_calls or "")) if message is not None else 0
+
+        llm_tokens.inc(usage.get("input_tokens") or round(prompt_chars / 4), node= node, kind= "prompt")
+        llm_tokens.inc(usage.get("output_tokens") or round(completion_chars / 4), node= node, kind= "completion")
+
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+
+        with self._lock:
+            run= self._runs.pop(run_id, None)
+
+        if run is not None:
+            llm_errors.inc(node= run[0])
+
+
+
+# shared handler
+llm_metrics= LLMMetricsHandler()
@@ -0,0 +1,29 @@
+-- SESSION SUMMARY TABLE
+--
+-- One row per chat session (its first query), written by the app on the first insert_chat
+-- of a session. The sidebar reads a page of this table instead of scanning every message.
+-- Run once in the supabase sql editor (or with `supabase db push`).
+
+create table if not exists public.session_summary (
+    id bigint generated by default as identity primary key,
+    session_id text not null unique,
+    user_id text not null,
+    first_query text not null,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists session_summary_user_created_idx
+    on public.session_summary (user_id, created_at desc);
+
+
+-- BACKFILL -> sessions written before this table existed (first message of each session)
+insert into public.session_summary (session_id, user_id, first_query, created_at)
+select distinct on (session_id) session_id::text, user_id::text, content, created_at
+from public.session
+order by session_id, created_at asc
+on conflict (session_id) do nothing;
+
+
+-- chat history lookups (user_id, session_id)
+create index if not exists session_user_session_idx
+    on public.session (user_id, session_id, created_at);
@@ -0,0 +1,8 @@
+-- CHAT HISTORY PAGES
+--
+-- get_chat_history_page walks a session newest first by id (keyset pagination):
+--   where user_id = ? and session_id = ? and id < ? order by id desc limit ?
+-- this index serves every page with a short range scan, whatever the session length.
+
+create index if not exists session_user_session_id_idx
+    on public.session (user_id, session_id, id desc);
@@ -0,0 +1,11 @@
+-- IDEMPOTENT CHAT WRITES
+--
+-- insert_chat gives every message a client generated message_id and the write behind queue
+-- upserts its batches on it (ignore duplicates): a batch retried after its insert committed
+-- but its response was lost (timeout, connection reset) does not insert its rows twice.
+-- Rows written before this column existed keep a null message_id.
+
+alter table public.session add column if not exists message_id text;
+
+create unique index if not exists session_message_id_idx
+    on public.session (message_id);
@@ -0,0 +1,220 @@
+# IMPORT PACKAGES
+import os
+import copy
+import time
+import inspect
+import contextvars
+import threading
+import functools
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+
+# CACHE CONSTANTS
+
+# safety net for writes the cache can not see (another process, the supabase dashboard)
+READ_CACHE_TTL= float(os.getenv("READ_CACHE_TTL", "300"))
+
+# users whose reads are kept (least recently used are evicted first)
+READ_CACHE_MAX_USERS= int(os.getenv("READ_CACHE_MAX_USERS", "1000"))
+
+# cached reads kept per user
+READ_CACHE_MAX_ENTRIES_PER_USER= int(os.getenv("READ_CACHE_MAX_ENTRIES_PER_USER", "64"))
+
+
+
+# PER USER READ CACHE
+class ReadCache:
+    """
+    Per user cache of database reads, invalidated explicitly by the writes.
+
+    Every entry belongs to one user and optionally one session, so a write drops exactly the
+    reads it could have changed: a new message drops the user's session list and that
+    session's history, a new session drops the session list. Entries also expire after
+    `ttl` seconds. Values are deep copied in and out, callers may mutate what they get.
+    """
+
+    def __init__(self, ttl: float= READ_CACHE_TTL, max_users: int= READ_CACHE_MAX_USERS, max_entries_per_user: int= READ_CACHE_MAX_ENTRIES_PER_USER):
+
+        self.ttl= ttl
+        self.max_users= max_users
+        self.max_entries_per_user= max_entries_per_user
+
+        # user_id -> (name, session_id, arguments) -> (expires_at, value)
+        self._users: "OrderedDict[Any, OrderedDict[Tuple, Tuple[float, Any]]]"= OrderedDict()
+        self._lock= threading.Lock()
+
+        # user_id -> bumped by every invalidation, a read that raced one is not stored
+        self._generations: Dict[Any, int]= {}
+
+        # counters (misses are the reads that went to the database)
+        self.hits= 0
+        self.misses= 0
+        self.invalidations= 0
+
+        # per run counters of the current context, see `track`
+        self._tracker: "contextvars.ContextVar[Optional[Dict[str, int]]]"= contextvars.ContextVar("read_cache_tracker", default= None)
+
+
+    def track(self) -> Dict[str, int]:
+        """
+        Start counting the reads of the current context (e.g. one streamlit rerun) in a fresh
+        {"cached": n, "remote": n} dict, which is returned and updated in place.
+        """
+
+        counter= {"cached": 0, "remote": 0}
+        self._tracker.set(counter)
+
+        return counter
+
+
+    def _count(self, outcome: str):
+
+        counter= self._tracker.get()
+
+        if counter is not None:
+            counter[outcome]+= 1
+
+
+    def get(self, user_id, key: Tuple) -> Tuple[bool, Any]:
+
+        with self._lock:
+            entries= self._users.get(user_id)
+            entry= entries.get(key) if entries is not None else None
+
+            if entry is None or entry[0] < time.monotonic():
+                self.misses+= 1
+                self._count("remote")
+
+                return False, None
+
+            self._users.move_to_end(user_id)
+            entries.move_to_end(key)
+            self.hits+= 1
+            self._count("cached")
+
+            return True, copy.deepcopy(entry[1])
+
+
+    def generation(self, user_id) -> int:
+
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+
+    def set(self, user_id, key: Tuple, value: Any, generation: Optional[int]= None):
+
+        value= copy.deepcopy(value)
+
+        with self._lock:
+
+            # invalidated while the value was being read -> it may already be stale
+            if generation is not None and generation != self._generations.get(user_id, 0):
+                return
+
+            entries= self._users.setdefault(user_id, OrderedDict())
+            entries[key]= (time.monotonic() + self.ttl, value)
+            entries.move_to_end(key)
+            self._users.move_to_end(user_id)
+
+            while len(entries) > self.max_entries_per_user:
+                entries.popitem(last= False)
+
+            while len(self._users) > self.max_users:
+                self._users.popitem(last= False)
+
+
+    def invalidate(self, user_id, session_id: Optional[str]= None, names: Optional[Tuple[str, ...]]= None):
+        """
+        Drop the user's entries of the given session plus the ones not tied to any session
+        (or all of them without a session_id), optionally only the reads named in `names`.
+        """
+
+        with self._lock:
+            self._generations[user_id]= self._generations.get(user_id, 0) + 1
+
+            entries= self._users.get(user_id)
+
+            if not entries:
+                return
+
+            for key in list(entries):
+                name, entry_session_id, _= key
+
+                if names is not None and name not in names:
+                    continue
+
+                if session_id is None or entry_session_id in (None, session_id):
+                    del entries[key]
+                    self.invalidations+= 1
+
+
+    def clear(self):
+
+        with self._lock:
+            self._users.clear()
+            self._generations.clear()
+
+
+    def stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            total= self.hits + self.misses
+
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "users": len(self._users),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+
+# shared cache
+read_cache= ReadCache()
+
+
+
+# DECORATOR
+def cached_read(cache: ReadCache= read_cache) -> Callable:
+    """
+    Serve the wrapped `fn(user_id, ...)` from the cache when possible. The entry is keyed on
+    the function name plus its bound arguments and tagged with their `session_id` (if any).
+    """
+
+    def decorator(fn: Callable) -> Callable:
+
+        signature= inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+
+            bound= signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+
+            arguments= dict(bound.arguments)
+            user_id= arguments.pop("user_id")
+
+            key= (fn.__name__, arguments.get("session_id"), tuple(sorted(arguments.items())))
+
+            found, value= cache.get(user_id, key)
+
+            if found:
+                return value
+
+            generation= cache.generation(user_id)
+
+            value= fn(*args, **kwargs)
+            cache.set(user_id, key, value, generation= generation)
+
+            return value
+
+        return wrapper
+
+    return decorator
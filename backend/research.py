@@ -0,0 +1,261 @@
+# IMPORT PACKAGES
+import os
+import re
+import json
+import math
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+
+# RESEARCH CONSTANTS
+
+# "fanout" -> the researcher is the fan out subgraph (every source at once, one synthesis call)
+# "tools"  -> the researcher llm picks the search tools itself, one round at a time
+RESEARCH_MODE= os.getenv("RESEARCH_MODE", "fanout").lower()
+
+# tools queried by the fan out (all of them at once)
+RESEARCH_SOURCES= tuple(source.strip() for source in os.getenv("RESEARCH_SOURCES", "web_search_tool,duck_duck_search_tool,wikipedia_search_tool,pubmed_search_tool").split(",") if source.strip())
+
+# snippets kept in the evidence bundle, and its size budget (characters)
+RESEARCH_MAX_SNIPPETS= int(os.getenv("RESEARCH_MAX_SNIPPETS", "10"))
+RESEARCH_MAX_CHARS= int(os.getenv("RESEARCH_MAX_CHARS", "6000"))
+
+# longer source texts are cut into snippets of about this size (at sentence boundaries)
+RESEARCH_SNIPPET_CHARS= int(os.getenv("RESEARCH_SNIPPET_CHARS", "600"))
+
+# word trigram jaccard similarity above which two snippets are the same evidence
+RESEARCH_DUPLICATE_SIMILARITY= float(os.getenv("RESEARCH_DUPLICATE_SIMILARITY", "0.6"))
+
+# short names shown in the bundle
+SOURCE_LABELS= {
+    "web_search_tool": "tavily",
+    "duck_duck_search_tool": "duckduckgo",
+    "wikipedia_search_tool": "wikipedia",
+    "pubmed_search_tool": "pubmed",
+}
+
+WORD= re.compile(r"[a-z0-9]+")
+
+SENTENCE_END= re.compile(r"(?<=[.!?])\s+")
+
+# frequent words carry no relevance signal
+STOPWORDS= frozenset("a an and are as at be by for from has have how in is it its of on or that the this to was were what when where which who why will with about does do can".split())
+
+
+
+# SNIPPET
+class Snippet(NamedTuple):
+    source: str
+    text: str
+    title: str= ""
+    url: str= ""
+
+    # source's own relevance score (tavily), 0 when it has none
+    score: float= 0.0
+
+
+
+def _words(text: str) -> List[str]:
+    return WORD.findall(text.lower())
+
+
+def _terms(text: str) -> List[str]:
+    return [word for word in _words(text) if word not in STOPWORDS]
+
+
+# cut a long text into snippets of about `max_chars`, on sentence boundaries
+def _chunks(text: str, max_chars: int) -> List[str]:
+
+    chunks, current= [], ""
+
+    for sentence in SENTENCE_END.split(text):
+
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            chunks.append(current)
+            current= ""
+
+        current= f"{current} {sentence}".strip()
+
+    if current:
+        chunks.append(current)
+
+    return [chunk[:max_chars * 2] for chunk in chunks]
+
+
+
+# EXTRACTION
+def extract_snippets(source: str, content: Any, max_chars: int= RESEARCH_SNIPPET_CHARS) -> List[Snippet]:
+    """
+    Turn one tool output into snippets: tavily's json results one per result, the plain text
+    outputs (duckduckgo, wikipedia pages, pubmed articles) split on blank lines and then
+    into sentence aligned chunks.
+    """
+
+    if isinstance(content, str):
+        try:
+            content= json.loads(content)
+
+        except ValueError:
+            pass
+
+    if isinstance(content, dict) and isinstance(content.get("results"), list):
+
+        snippets= []
+
+        for result in content["results"]:
+            text= " ".join(str(result.get("content") or "").split())
+
+            if text:
+                snippets.append(Snippet(source, text[:max_chars * 2], str(result.get("title") or ""), str(result.get("url") or ""), float(result.get("score") or 0.0)))
+
+        return snippets
+
+    text= content if isinstance(content, str) else json.dumps(content, default= str)
+    snippets= []
+
+    for block in re.split(r"\n\s*\n", text):
+        title= ""
+
+        # wikipedia "Page: ..." / pubmed "Title: ..." headers name the snippet
+        header= re.match(r"\s*(?:Page|Title):\s*(.+)", block)
+
+        if header:
+            title= header.group(1).strip()
+
+        for chunk in _chunks(" ".join(block.split()), max_chars):
+            snippets.append(Snippet(source, chunk, title))
+
+    return snippets
+
+
+
+# DEDUPE
+def _shingles(text: str) -> set:
+
+    words= _words(text)
+
+    return {tuple(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+
+def dedupe(snippets: Sequence[Snippet], similarity: float= RESEARCH_DUPLICATE_SIMILARITY) -> List[Snippet]:
+    """
+    Drop snippets that repeat an earlier one: same url, or word trigram jaccard similarity
+    above `similarity` (the same wire story on two search engines). Pass them best first.
+    """
+
+    kept, kept_shingles, seen_urls= [], [], set()
+
+    for snippet in snippets:
+
+        if snippet.url and snippet.url in seen_urls:
+            continue
+
+        shingles= _shingles(snippet.text)
+
+        if any(len(shingles & other) / len(shingles | other) > similarity for other in kept_shingles):
+            continue
+
+        kept.append(snippet)
+        kept_shingles.append(shingles)
+
+        if snippet.url:
+            seen_urls.add(snippet.url)
+
+    return kept
+
+
+
+# RANK
+def rank(query: str, snippets: Sequence[Snippet]) -> List[Snippet]:
+    """
+    Order the snippets by bm25 relevance to the query (idf over the candidate snippets
+    themselves), plus the source's own score when it gives one. Snippets scoring zero (no
+    query term, no source score, e.g. "no result found") are dropped, unless nothing scored.
+    """
+
+    if not snippets:
+        return []
+
+    query_terms= set(_terms(query))
+    documents= [Counter(_terms(snippet.title + " " + snippet.text)) for snippet in snippets]
+
+    average_length= sum(sum(document.values()) for document in documents) / len(documents) or 1.0
+    document_frequency= Counter(term for document in documents for term in query_terms if term in document)
+
+    def score(index: int) -> float:
+
+        document= documents[index]
+        length= sum(document.values())
+        total= 0.0
+
+        for term in query_terms:
+            frequency= document.get(term, 0)
+
+            if not frequency:
+                continue
+
+            idf= math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            total+= idf * frequency * 2.2 / (frequency + 1.2 * (0.25 + 0.75 * length / average_length))
+
+        return total + snippets[index].score
+
+    scores= [score(index) for index in range(len(snippets))]
+    order= sorted(range(len(snippets)), key= lambda index: -scores[index])
+
+    if scores[order[0]] > 0:
+        order= [index for index in order if scores[index] > 0]
+
+    return [snippets[index] for index in order]
+
+
+
+# EVIDENCE BUNDLE
+def build_evidence(query: str, outputs: Dict[str, Any], max_snippets: int= RESEARCH_MAX_SNIPPETS, max_chars: int= RESEARCH_MAX_CHARS) -> str:
+    """
+    Merge every source's output into one numbered evidence bundle: extract, rank, dedupe
+    (best first, so the better copy of a duplicate survives), then keep the top snippets
+    that fit `max_chars`.
+    """
+
+    snippets= [snippet for source, content in outputs.items() for snippet in extract_snippets(source, content)]
+
+    lines, used= [], 0
+
+    for snippet in dedupe(rank(query, snippets)):
+
+        header= f"[{len(lines) + 1}] ({SOURCE_LABELS.get(snippet.source, snippet.source)})"
+
+        if snippet.title:
+            header+= f" {snippet.title}"
+
+        if snippet.url:
+            header+= f" - {snippet.url}"
+
+        entry= f"{header}\n{snippet.text}"
+
+        if used + len(entry) > max_chars:
+
+            if lines:
+                break
+
+            entry= entry[:max_chars]
+
+        lines.append(entry)
+        used+= len(entry)
+
+        if len(lines) >= max_snippets:
+            break
+
+    return "\n\n".join(lines) if lines else "No source returned any result."
+
+
+def research_tool_calls(query: str, sources: Optional[Sequence[str]]= None) -> List[Dict[str, Any]]:
+    return [
+        {"name": source, "args": {"query": query}, "id": f"research-{source}", "type": "tool_call"}
+        for source in (RESEARCH_SOURCES if sources is None else sources)
+    ]
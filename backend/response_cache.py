@@ -0,0 +1,291 @@
+# IMPORT PACKAGES
+import os
+import re
+import time
+import zlib
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+
+# RESPONSE CACHE CONSTANTS
+
+# cache the supervisor routing and the enhancer output
+RESPONSE_CACHE_ENABLED= os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+
+# entries per cache (least recently used are evicted first) and their time to live (seconds)
+RESPONSE_CACHE_MAX_ENTRIES= int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_TTL= float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+
+# similarity tier -> a miss of the exact tier may reuse the answer of a near identical request
+RESPONSE_CACHE_SEMANTIC= os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() == "true"
+
+# cosine similarity a cached request needs to be reused
+RESPONSE_CACHE_SIMILARITY= float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.9"))
+
+# size of the hashed n-gram embedding
+RESPONSE_CACHE_EMBEDDING_DIM= int(os.getenv("RESPONSE_CACHE_EMBEDDING_DIM", "512"))
+
+# numbers and operators of a request -> two requests differing in them never share an answer
+GUARD_TOKEN= re.compile(r"\d+(?:[.,]\d+)*|[-+*/^%=<>]")
+
+WORD= re.compile(r"\w+")
+
+
+
+# exact tier key text -> casing, runs of whitespace and trailing punctuation do not matter
+def normalize_text(text: str) -> str:
+    return " ".join(str(text).lower().split()).rstrip(" ?!.")
+
+
+
+# LOCAL EMBEDDING
+def embed(text: str, dim: int= RESPONSE_CACHE_EMBEDDING_DIM) -> numpy.ndarray:
+    """
+    CPU only text embedding: character 3-grams and words, feature hashed (crc32, signed)
+    into `dim` buckets and l2 normalized. No model -> robust to typos, casing, punctuation
+    and word order, blind to synonyms.
+    """
+
+    text= " ".join(WORD.findall(text.lower()))
+    padded= f" {text} "
+
+    features= [padded[i:i + 3] for i in range(len(padded) - 2)] + WORD.findall(text)
+
+    vector= numpy.zeros(dim, dtype= numpy.float32)
+
+    for feature in features:
+        hashed= zlib.crc32(feature.encode())
+        vector[hashed % dim]+= 1.0 if hashed & 0x80000000 else -1.0
+
+    norm= numpy.linalg.norm(vector)
+
+    return vector / norm if norm else vector
+
+
+
+# RESPONSE CACHE
+class ResponseCache:
+    """
+    Cache of llm chain outputs keyed on the messages they were computed from.
+
+    The exact tier is keyed on the (role, normalized content) of the messages, a hit costs
+    one dict lookup. The optional similarity tier keeps an in process matrix of the requests'
+    embeddings and reuses the output of the most similar one above `similarity`, but only
+    between requests with the same roles, numbers and operators ("2+3" never reuses "2*3").
+    Both tiers share one LRU order, a size bound and a ttl.
+    """
+
+    def __init__(self, name: str, max_entries: int= RESPONSE_CACHE_MAX_ENTRIES, ttl: float= RESPONSE_CACHE_TTL, semantic: bool= RESPONSE_CACHE_SEMANTIC, similarity: float= RESPONSE_CACHE_SIMILARITY, dim: int= RESPONSE_CACHE_EMBEDDING_DIM, enabled: bool= RESPONSE_CACHE_ENABLED):
+
+        self.name= name
+        self.max_entries= max(1, max_entries)
+        self.ttl= ttl
+        self.semantic= semantic
+        self.similarity= similarity
+        self.dim= dim
+        self.enabled= enabled
+
+        # exact key -> (expires_at, value, slot of its embedding or -1)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, int]]"= OrderedDict()
+        self._lock= threading.Lock()
+
+        # similarity tier -> one embedding row per slot, slots grouped by guard (roles + numbers)
+        self._vectors= numpy.zeros((self.max_entries, dim), dtype= numpy.float32) if semantic else None
+        self._guard_slots: Dict[Hashable, List[int]]= {}
+        self._slot_keys: List[Optional[Tuple[Hashable, Hashable]]]= [None] * self.max_entries
+        self._free_slots= list(range(self.max_entries - 1, -1, -1))
+
+        # counters
+        self.exact_hits= 0
+        self.semantic_hits= 0
+        self.misses= 0
+        self.evictions= 0
+
+
+    @staticmethod
+    def _guard(messages: Sequence) -> Hashable:
+        return tuple((msg.type, tuple(GUARD_TOKEN.findall(str(msg.content)))) for msg in messages)
+
+
+    @staticmethod
+    def _key(messages: Sequence) -> Hashable:
+        return tuple((msg.type, normalize_text(msg.content)) for msg in messages)
+
+
+    # the roles are part of the guard already
+    @staticmethod
+    def _text(messages: Sequence) -> str:
+        return "\n".join(str(msg.content) for msg in messages)
+
+
+    def _drop(self, key: Hashable):
+
+        _, _, slot= self._entries.pop(key)
+
+        if slot >= 0:
+            _, guard= self._slot_keys[slot]
+
+            self._guard_slots[guard].remove(slot)
+
+            if not self._guard_slots[guard]:
+                del self._guard_slots[guard]
+
+            self._slot_keys[slot]= None
+            self._free_slots.append(slot)
+
+
+    def get(self, messages: Sequence) -> Tuple[bool, Any]:
+
+        if not self.enabled:
+            return False, None
+
+        key= self._key(messages)
+        now= time.monotonic()
+
+        with self._lock:
+            entry= self._entries.get(key)
+
+            if entry is not None:
+
+                if entry[0] >= now:
+                    self._entries.move_to_end(key)
+                    self.exact_hits+= 1
+
+                    return True, entry[1]
+
+                self._drop(key)
+
+        if self.semantic:
+            found, value= self._similar(messages, now)
+
+            if found:
+                return True, value
+
+        with self._lock:
+            self.misses+= 1
+
+        return False, None
+
+
+    def _similar(self, messages: Sequence, now: float) -> Tuple[bool, Any]:
+
+        guard= self._guard(messages)
+        vector= embed(self._text(messages), self.dim)
+
+        with self._lock:
+            slots= self._guard_slots.get(guard)
+
+            if not slots:
+                return False, None
+
+            scores= self._vectors[slots] @ vector
+            best= int(numpy.argmax(scores))
+
+            if scores[best] < self.similarity:
+                return False, None
+
+            key, _= self._slot_keys[slots[best]]
+            expires_at, value, _= self._entries[key]
+
+            if expires_at < now:
+                self._drop(key)
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.semantic_hits+= 1
+
+            return True, value
+
+
+    def put(self, messages: Sequence, value: Any):
+
+        if not self.enabled:
+            return
+
+        key= self._key(messages)
+        vector= embed(self._text(messages), self.dim) if self.semantic else None
+
+        with self._lock:
+
+            if key in self._entries:
+                self._drop(key)
+
+            while len(self._entries) >= self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions+= 1
+
+            slot= -1
+
+            if vector is not None:
+                slot= self._free_slots.pop()
+
+                guard= self._guard(messages)
+
+                self._vectors[slot]= vector
+                self._guard_slots.setdefault(guard, []).append(slot)
+                self._slot_keys[slot]= (key, guard)
+
+            self._entries[key]= (time.monotonic() + self.ttl, value, slot)
+
+
+    def get_or_call(self, messages: Sequence, fn: Callable[[], Any]) -> Any:
+
+        found, value= self.get(messages)
+
+        if found:
+            return value
+
+        value= fn()
+        self.put(messages, value)
+
+        return value
+
+
+    async def aget_or_call(self, messages: Sequence, fn: Callable[[], Awaitable[Any]]) -> Any:
+
+        found, value= self.get(messages)
+
+        if found:
+            return value
+
+        value= await fn()
+        self.put(messages, value)
+
+        return value
+
+
+    def clear(self):
+
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+
+    def stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            lookups= self.exact_hits + self.semantic_hits + self.misses
+
+            return {
+                "enabled": self.enabled,
+                "semantic": self.semantic,
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
+
+
+
+# shared caches -> one per cached chain
+supervisor_cache= ResponseCache("supervisor")
+enhancer_cache= ResponseCache("enhancer")
@@ -0,0 +1,167 @@
+# IMPORT PACKAGES
+import json
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable
+
+
+
+# SINGLE FLIGHT GROUP
+class SingleFlight:
+    """
+    Collapses concurrent identical calls into one.
+
+    The first caller for a key (the leader) runs the function, every caller that arrives
+    while it is still in flight waits on the same future and gets the same result (or the
+    same exception). Nothing is cached -> once the call finishes the key is free again.
+    """
+
+    def __init__(self):
+
+        self._in_flight: Dict[Hashable, Future]= {}
+        self._lock= threading.Lock()
+
+        # counters
+        self.calls= 0
+        self.shared= 0
+
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+
+        with self._lock:
+
+            self.calls+= 1
+            future= self._in_flight.get(key)
+
+            if future is not None:
+                self.shared+= 1
+                is_leader= False
+
+            else:
+                future= Future()
+                self._in_flight[key]= future
+                is_leader= True
+
+        # follower -> wait for the leader
+        if not is_leader:
+            return future.result()
+
+        # leader -> run the call and publish the outcome
+        try:
+            result= fn()
+            future.set_result(result)
+
+            return result
+
+        except BaseException as e:
+            future.set_exception(e)
+
+            raise
+
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "shared": self.shared,
+            "in_flight": len(self._in_flight),
+        }
+
+
+
+# ASYNC SINGLE FLIGHT GROUP
+class AsyncSingleFlight:
+    """
+    `SingleFlight` for coroutines: callers on the event loop await the leader's task instead
+    of blocking a thread. The leader's call runs in its own task, so a follower (or the
+    leader) being cancelled does not cancel the call for the others; it is only cancelled
+    once every caller waiting on it was.
+    """
+
+    def __init__(self):
+
+        self._in_flight: Dict[Hashable, asyncio.Task]= {}
+        self._waiters: Dict[Hashable, int]= {}
+
+        # counters
+        self.calls= 0
+        self.shared= 0
+
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+
+        self.calls+= 1
+        task= self._in_flight.get(key)
+
+        if task is not None:
+            self.shared+= 1
+
+        else:
+            task= asyncio.ensure_future(fn())
+            self._in_flight[key]= task
+
+            task.add_done_callback(lambda done, key= key: self._finished(key, done))
+
+        self._waiters[key]= self._waiters.get(key, 0) + 1
+
+        try:
+            # shield -> cancelling one caller leaves the shared call running for the rest
+            return await asyncio.shield(task)
+
+        except asyncio.CancelledError:
+
+            # the last caller gave up -> nobody needs the result, stop the call itself
+            if self._waiters[key] == 1 and not task.done():
+                task.cancel()
+
+            raise
+
+        finally:
+            self._waiters[key]-= 1
+
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+        # mark the exception as retrieved -> no warning when every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "shared": self.shared,
+            "in_flight": len(self._in_flight),
+        }
+
+
+
+# KEY HELPERS
+
+# tool call key -> same tool with the same args
+def tool_call_key(tc: dict) -> Hashable:
+    return (tc["name"], json.dumps(tc.get("args", {}), sort_keys= True, default= str))
+
+
+# messages key -> only the role and the content matter, ids differ for every user
+def messages_key(messages: Iterable) -> Hashable:
+    return tuple((msg.type, " ".join(str(msg.content).split())) for msg in messages)
+
+
+
+# shared groups -> one for the tools, one for the supervisor routing chain (sync and async nodes)
+tools_flight= SingleFlight()
+supervisor_flight= SingleFlight()
+
+atools_flight= AsyncSingleFlight()
+asupervisor_flight= AsyncSingleFlight()
@@ -0,0 +1,130 @@
+# IMPORT PACKAGES
+import os
+import json
+import asyncio
+from typing import AsyncIterator
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+
+# SSE CONSTANTS
+
+# time budget (ms) tokens are buffered for before they are sent as one frame, 0 -> one frame per token
+SSE_COALESCE_MS= float(os.getenv("SSE_COALESCE_MS", "30"))
+
+# a buffer reaching this many characters is flushed right away
+SSE_COALESCE_MAX_CHARS= int(os.getenv("SSE_COALESCE_MAX_CHARS", "512"))
+
+END_FRAME= "data: {\"type\": \"end\"}\n\n"
+
+
+
+# first sse frame of a stream -> the request's trace id (the frontend only renders "content" frames)
+def trace_frame(trace_id: str) -> str:
+    return f"data: {json.dumps({'type': 'trace', 'trace_id': trace_id})}\n\n"
+
+
+# one sse frame of content (same escaping the streamlit frontend undoes)
+def content_frame(content: str) -> str:
+
+    safe_content= content.replace("'", "\\'").replace("\n", "\\n")
+
+    return f"data: {json.dumps({'type': 'content', 'content': safe_content})}\n\n"
+
+
+
+# TOKEN COALESCING
+async def coalesce(tokens: AsyncIterator[str], max_delay_ms: float= SSE_COALESCE_MS, max_chars: int= SSE_COALESCE_MAX_CHARS) -> AsyncIterator[str]:
+    """
+    Merge a token stream into fewer, larger chunks.
+
+    The first token goes out immediately (time to first token is unchanged), after that tokens
+    are buffered until `max_delay_ms` passed since the first buffered one or `max_chars` are
+    buffered. A reader task drains the upstream and a timer enforces the budget even when the
+    upstream stalls (e.g. during a tool call), so the consumer only wakes up once per chunk.
+    """
+
+    # coalescing disabled -> pass through
+    if max_delay_ms <= 0:
+        async for token in tokens:
+            if token:
+                yield token
+
+        return
+
+    loop= asyncio.get_running_loop()
+
+    buffer= []
+    state= {"chars": 0, "first": True, "done": False, "error": None, "timer": None}
+    flush= asyncio.Event()
+
+    def request_flush():
+
+        if state["timer"] is not None:
+            state["timer"].cancel()
+            state["timer"]= None
+
+        flush.set()
+
+    async def reader():
+
+        try:
+            async for token in tokens:
+
+                if not token:
+                    continue
+
+                buffer.append(token)
+                state["chars"]+= len(token)
+
+                if state["first"] or state["chars"] >= max_chars:
+                    state["first"]= False
+                    request_flush()
+
+                elif state["timer"] is None and not flush.is_set():
+                    state["timer"]= loop.call_later(max_delay_ms / 1000, request_flush)
+
+        except Exception as e:
+            state["error"]= e
+
+        finally:
+            state["done"]= True
+            request_flush()
+
+    reader_task= asyncio.ensure_future(reader())
+
+    try:
+        while True:
+            await flush.wait()
+            flush.clear()
+
+            if buffer:
+                chunk= "".join(buffer)
+
+                buffer.clear()
+                state["chars"]= 0
+
+                yield chunk
+
+            if state["done"] and not buffer:
+                break
+
+        if state["error"] is not None:
+            raise state["error"]
+
+    finally:
+        # the consumer went away (client disconnected) -> stop pulling from upstream
+        if not reader_task.done():
+            reader_task.cancel()
+
+            try:
+                await reader_task
+
+            except asyncio.CancelledError:
+                pass
+
+        if state["timer"] is not None:
+            state["timer"].cancel()
@@ -1,6 +1,8 @@
 # IMPORT PACKAGES
 import os
-from supabase import create_client, Client
+import uuid
+import threading
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 from pydantic import EmailStr
 
@@ -10,61 +12,161 @@ load_dotenv()
 url: str = os.getenv("SUPABASE_URL")
 
 key: str = os.getenv("SUPABASE_KEY")
-sb: Client = create_client(url, key)
 
+# "supabase" or "local" (sqlite stand-in for development and the benchmarks, only when asked for)
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "supabase").lower()
 
-# INSERT THE CHAT TO THE DB
-def insert_chat(user_id: str, session_id: str, role: str, content: str):
+# sessions shown per page of the sidebar
+SESSION_PAGE_SIZE = int(os.getenv("SESSION_PAGE_SIZE", "20"))
+
+# messages loaded per page when a chat is opened (older pages are loaded on demand)
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "30"))
+
+if DATABASE_BACKEND == "local":
+    from backend.local_database import LocalClient
+
+    sb = LocalClient()
+
+elif DATABASE_BACKEND == "supabase":
     
-    # insert to DB
-    response = (
+    # a misconfigured deploy must fail here, not keep users and chats in a file of its container
+    if not url or not key:
+        raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set (or DATABASE_BACKEND=local for the local SQLite stand-in)")
+    
+    from supabase import create_client
+
+    sb = create_client(url, key)
+
+else:
+    raise ValueError(f"unknown DATABASE_BACKEND '{DATABASE_BACKEND}' (expected 'supabase' or 'local')")
+
+
+from backend.write_behind import WriteBehindQueue
+from backend.read_cache import read_cache, cached_read
+
+
+# sessions that already have their summary row -> only the first insert of a session writes it
+_summarized_sessions = set()
+_summarized_sessions_lock = threading.Lock()
+
+
+# BULK WRITE OF QUEUED CHAT ROWS (runs on the write behind thread)
+def _write_chat_rows(rows):
+    
+    # first message of every session not summarized yet -> one upsert for the batch
+    summaries = {}
+    
+    for row in rows:
+        if row["session_id"] not in _summarized_sessions and row["session_id"] not in summaries:
+            summaries[row["session_id"]] = {
+                "session_id": row["session_id"],
+                "user_id": row["user_id"],
+                "first_query": row["content"],
+                "created_at": row["created_at"]
+            }
+    
+    # both writes are idempotent -> a batch retried after a write committed but its response was
+    # lost (timeout, connection reset) writes nothing twice
+    if summaries:
+        
+        # ignore_duplicates -> the first query wins, also across processes (a racing second upsert is harmless)
+        (
+            sb.table("session_summary")
+            .upsert(list(summaries.values()), on_conflict= "session_id", ignore_duplicates= True)
+            .execute()
+        )
+    
+    # one write for the whole batch, rows already written (same message_id) are skipped
+    (
         sb.table("session")
-        .insert({
-            "session_id": session_id,
-            "user_id": user_id,
-            "role": role,
-            "content": content
-        })
+        .upsert(rows, on_conflict= "message_id", ignore_duplicates= True)
         .execute()
     )
     
-    return response
-    
+    with _summarized_sessions_lock:
+        _summarized_sessions.update(summaries)
     
+    # the rows are in the table now and leave pending() right after -> a read racing the batch
+    # (select before the insert, pending() after it) saw them twice or not at all, the bumped
+    # generation keeps it out of the cache
+    for user_id, session_id in {(row["user_id"], row["session_id"]) for row in rows}:
+        read_cache.invalidate(user_id, session_id= session_id)
+
 
+# chat rows are written in bulk in the background -> a turn never waits on the database
+chat_writer = WriteBehindQueue(_write_chat_rows, name= "chat-writer")
+
+
+# INSERT THE CHAT TO THE DB
+def insert_chat(user_id: str, session_id: str, role: str, content: str):
+    
+    # queue the row, created_at is set now -> rows of one bulk insert keep their order
+    chat_writer.put({
+        "message_id": str(uuid.uuid4()),
+        "session_id": session_id,
+        "user_id": user_id,
+        "role": role,
+        "content": content,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    })
+    
+    # the user's session list and this session's history changed
+    read_cache.invalidate(user_id, session_id= session_id)
+    
+    
+# DROP THE CACHED READS OF A USER -> on session creation / logout (optionally only one session's)
+def invalidate_reads(user_id: str, session_id: str = None):
+    read_cache.invalidate(user_id, session_id= session_id)
+    
     
-# fetch all sessions
-def get_session_summaries(user_id: str):
+# fetch one page of sessions (newest first) -> reads the summary table, O(sessions on the page)
+@cached_read()
+def get_session_summaries(user_id: str, limit: int = SESSION_PAGE_SIZE, offset: int = 0):
     response = (
-        sb.table("session")
-        .select("id, session_id, role, content")
+        sb.table("session_summary")
+        .select("id, session_id, first_query")
         .eq("user_id", user_id)
-        .order("created_at", desc=False)
+        .order("created_at", desc=True)
+        .range(offset, offset + limit - 1)
         .execute()
     )
 
-    if not response.data:
-        return []
-
-    # Dict to store first user_query per session
-    first_queries = {}
+    summaries = response.data or []
     
-    for row in response.data:
+    # sessions whose first row is still queued -> newest, so they go on the first page
+    if offset == 0:
         
-        sid = row["session_id"]
+        known = {summary["session_id"] for summary in summaries}
+        queued = {}
         
-        if sid not in first_queries:
-            first_queries[sid] = {
-                "id": row["id"],
-                "session_id": sid,
-                "first_query": row["content"]
-            }
+        for row in chat_writer.pending():
+            if row["user_id"] == user_id and row["session_id"] not in known and row["session_id"] not in _summarized_sessions and row["session_id"] not in queued:
+                queued[row["session_id"]] = {
+                    "id": f"pending-{row['session_id']}",
+                    "session_id": row["session_id"],
+                    "first_query": row["content"]
+                }
+        
+        # an older session continued after a restart already has its row (just not on this page)
+        if queued:
+            existing = (
+                sb.table("session_summary")
+                .select("session_id")
+                .in_("session_id", list(queued))
+                .execute()
+            )
+            
+            for row in existing.data or []:
+                queued.pop(row["session_id"], None)
+        
+        summaries = (list(queued.values())[::-1] + summaries)[:limit]
 
-    return list(first_queries.values())
+    return summaries
 
 
 
-# get application log -> from a session id
+# get application log -> from a session id (every message, oldest first)
+@cached_read()
 def get_chat_history(user_id, session_id):
     
     response = (
@@ -72,16 +174,56 @@ def get_chat_history(user_id, session_id):
         .select("role, content")
         .eq("user_id", user_id)
         .eq("session_id", session_id)
+        .order("id", desc=False)
         .execute()
     )
     
     
-    # get the messages
-    if not response.data:
-        return []
+    # get the messages + the ones still queued for the db
+    return (response.data or []) + _queued_messages(user_id, session_id)
+
+
+
+# get one page of the application log -> the newest `limit` messages older than `before_id`
+@cached_read()
+def get_chat_history_page(user_id, session_id, limit: int = HISTORY_PAGE_SIZE, before_id = None):
+    """
+    Returns (messages oldest first, cursor). Pass the cursor back as `before_id` to load the
+    page before it, it is None once the first message of the session is reached. Ids grow
+    with insertion order (rows are bulk inserted in order), so they are a stable cursor.
+    """
+    
+    query = (
+        sb.table("session")
+        .select("id, role, content")
+        .eq("user_id", user_id)
+        .eq("session_id", session_id)
+    )
+    
+    if before_id is not None:
+        query = query.lt("id", before_id)
+    
+    # one extra row -> tells whether an older page exists
+    rows = query.order("id", desc=True).limit(limit + 1).execute().data or []
+    
+    cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+    
+    messages = [{"role": row["role"], "content": row["content"]} for row in reversed(rows[:limit])]
+    
+    # the newest page also shows the messages still queued for the db
+    if before_id is None:
+        messages += _queued_messages(user_id, session_id)
     
-    else:
-        return response.data
+    return messages, cursor
+
+
+
+def _queued_messages(user_id, session_id):
+    return [
+        {"role": row["role"], "content": row["content"]}
+        for row in chat_writer.pending()
+        if row["user_id"] == user_id and row["session_id"] == session_id
+    ]
     
     
     
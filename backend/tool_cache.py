@@ -0,0 +1,251 @@
+# IMPORT PACKAGES
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import inspect
+import functools
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+
+# CACHE CONSTANTS
+
+# max number of results kept in memory before the least recently used one is evicted
+TOOL_CACHE_MAX_ENTRIES= int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024"))
+
+# optional sqlite file -> cached results survive restarts (disabled when empty)
+TOOL_CACHE_PATH= os.getenv("TOOL_CACHE_PATH", "")
+
+# default time to live (seconds) of a cached result
+TOOL_CACHE_DEFAULT_TTL= float(os.getenv("TOOL_CACHE_DEFAULT_TTL", "600"))
+
+# per tool ttl -> news moves fast, encyclopedic and scholarly results do not
+TOOL_CACHE_TTLS= {
+    "web_search_tool": 600.0,
+    "duck_duck_search_tool": 600.0,
+    "wikipedia_search_tool": 86400.0,
+    "pubmed_search_tool": 86400.0,
+}
+
+
+
+# normalize the query -> "  What IS   LangGraph? " and "what is langgraph?" share one entry
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", str(query)).strip().lower()
+
+
+
+# TTL + LRU CACHE
+class ToolResultCache:
+    """
+    Size bounded LRU cache with a per tool TTL, shared by all the search tools.
+
+    Entries are keyed on the tool name plus the normalized query. When a sqlite path is given
+    every write is also persisted there, and misses fall back to the file before giving up,
+    so a restarted process starts warm.
+    """
+
+    def __init__(self, max_entries: int= TOOL_CACHE_MAX_ENTRIES, default_ttl: float= TOOL_CACHE_DEFAULT_TTL, ttls: Optional[Dict[str, float]]= None, path: Optional[str]= TOOL_CACHE_PATH):
+
+        self.max_entries= max_entries
+        self.default_ttl= default_ttl
+        self.ttls= dict(TOOL_CACHE_TTLS if ttls is None else ttls)
+
+        # key -> (expires_at, value)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]"= OrderedDict()
+        self._lock= threading.Lock()
+
+        # counters
+        self.hits= 0
+        self.misses= 0
+        self.evictions= 0
+
+        # optional on disk persistence
+        self._db= None
+
+        if path:
+            self._db= sqlite3.connect(path, check_same_thread= False)
+
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS tool_cache (
+                    tool_name TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (tool_name, query)
+                )
+            """)
+
+            self._db.commit()
+
+
+    def ttl_for(self, tool_name: str) -> float:
+        return self.ttls.get(tool_name, self.default_ttl)
+
+
+    def get(self, tool_name: str, query: str) -> Tuple[bool, Any]:
+        """
+        Returns (found, value). A found value is never expired.
+        """
+
+        key= (tool_name, normalize_query(query))
+        now= time.time()
+
+        with self._lock:
+
+            entry= self._entries.get(key)
+
+            if entry is None:
+                entry= self._load(key)
+
+                if entry is not None:
+                    self._store(key, entry)
+
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits+= 1
+
+                return True, entry[1]
+
+            # expired -> drop it
+            if entry is not None:
+                self._entries.pop(key, None)
+
+            self.misses+= 1
+
+            return False, None
+
+
+    def set(self, tool_name: str, query: str, value: Any):
+
+        key= (tool_name, normalize_query(query))
+        entry= (time.time() + self.ttl_for(tool_name), value)
+
+        with self._lock:
+            self._store(key, entry)
+            self._persist(key, entry)
+
+
+    def clear(self):
+
+        with self._lock:
+            self._entries.clear()
+
+            if self._db is not None:
+                self._db.execute("DELETE FROM tool_cache")
+                self._db.commit()
+
+
+    def stats(self) -> Dict[str, Any]:
+
+        total= self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+    # keep the lru order and the size bound (caller holds the lock)
+    def _store(self, key, entry):
+
+        self._entries[key]= entry
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last= False)
+            self.evictions+= 1
+
+
+    def _persist(self, key, entry):
+
+        if self._db is None:
+            return
+
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tool_cache (tool_name, query, expires_at, value) VALUES (?, ?, ?, ?)",
+                (key[0], key[1], entry[0], json.dumps(entry[1])),
+            )
+            self._db.commit()
+
+        # results that are not json serializable stay memory only
+        except (TypeError, ValueError):
+            pass
+
+
+    def _load(self, key):
+
+        if self._db is None:
+            return None
+
+        row= self._db.execute(
+            "SELECT expires_at, value FROM tool_cache WHERE tool_name = ? AND query = ?",
+            key,
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return row[0], json.loads(row[1])
+
+
+
+# shared cache for every search tool in the process
+tool_cache= ToolResultCache()
+
+
+
+# DECORATOR -> wraps the body of a single query tool
+def cached_tool(tool_name: str, cache: ToolResultCache= tool_cache) -> Callable:
+    """
+    Serve the wrapped `fn(query)` (plain or async) from the cache when possible, otherwise call
+    it and store the result. Errors are never cached.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(query: str):
+
+                found, value= cache.get(tool_name, query)
+
+                if found:
+                    return value
+
+                value= await fn(query)
+                cache.set(tool_name, query, value)
+
+                return value
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(query: str):
+
+            found, value= cache.get(tool_name, query)
+
+            if found:
+                return value
+
+            value= fn(query)
+            cache.set(tool_name, query, value)
+
+            return value
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,232 @@
+# IMPORT PACKAGES
+import os
+import json
+import time
+import asyncio
+import weakref
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+from langchain_core.messages import ToolMessage
+from dotenv import load_dotenv
+
+from backend.single_flight import tools_flight, atools_flight, tool_call_key
+from backend.metrics import record_tool_call, payload_bytes
+
+load_dotenv()
+
+
+
+# EXECUTOR CONSTANTS
+
+# max number of tool calls running at the same time (shared by every request in the process)
+TOOL_MAX_CONCURRENCY= int(os.getenv("TOOL_MAX_CONCURRENCY", "8"))
+
+# default wall clock budget (seconds) for a single tool call
+TOOL_DEFAULT_TIMEOUT= float(os.getenv("TOOL_DEFAULT_TIMEOUT", "30"))
+
+# per tool overrides -> the search tools are network bound, the calculator is not
+TOOL_TIMEOUTS= {
+    "web_search_tool": 20.0,
+    "wikipedia_search_tool": 15.0,
+    "duck_duck_search_tool": 15.0,
+    "pubmed_search_tool": 20.0,
+    "python_code_executor_tool": 60.0,
+    "calculator": 5.0,
+    "batch_calculator": 10.0,
+}
+
+
+
+# set by the pool thread once it picks a call up -> the call's timeout runs from there
+class _CallStart:
+
+    def __init__(self):
+        self.event= threading.Event()
+        self.at: Optional[float]= None
+
+
+    def mark(self) -> float:
+
+        self.at= time.monotonic()
+        self.event.set()
+
+        return self.at
+
+
+
+# CONCURRENT TOOL EXECUTOR
+class ToolExecutor:
+    """
+    Runs all the tool calls of a single AI message concurrently on a bounded thread pool
+    (`run`), or as tasks on the event loop (`arun`, for the async nodes).
+
+    The returned ToolMessages keep the order of the original tool calls, so the graph sees
+    exactly what the sequential loop used to produce. A call that fails or exceeds its
+    timeout is turned into an error ToolMessage instead of failing the whole step.
+
+    The timeout of a call runs from its own start, the time it waits for a free slot does not
+    count (a call still waiting once its timeout is over is cancelled before it runs). A
+    running thread can not be stopped though: a sync call past its timeout keeps its slot
+    until the tool returns, only the tool clients' own network timeouts bound that.
+    """
+
+    def __init__(self, max_concurrency: int= TOOL_MAX_CONCURRENCY, default_timeout: float= TOOL_DEFAULT_TIMEOUT, timeouts: Optional[Dict[str, float]]= None):
+
+        self.max_concurrency= max_concurrency
+        self.default_timeout= default_timeout
+        self.timeouts= dict(TOOL_TIMEOUTS if timeouts is None else timeouts)
+
+        self._pool= ThreadPoolExecutor(max_workers= max_concurrency, thread_name_prefix= "tool")
+
+        # async cap -> one semaphore per event loop (asyncio primitives are bound to their loop)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]"= weakref.WeakKeyDictionary()
+
+
+    def timeout_for(self, tool_name: str) -> float:
+        return self.timeouts.get(tool_name, self.default_timeout)
+
+
+    def run(self, tool_calls: List[dict], tools_lookup: Dict[str, object]) -> List[ToolMessage]:
+
+        # submit every call -> each one gets its own copy of the context so tracing callbacks still attach to the parent run
+        submitted_at= time.monotonic()
+        starts= [_CallStart() for _ in tool_calls]
+
+        futures= [
+            self._pool.submit(contextvars.copy_context().run, self._invoke_one, tc, tools_lookup, submitted_at, start)
+            for tc, start in zip(tool_calls, starts)
+        ]
+
+        # collect in the original order, every call gets its own deadline
+        all_tool_msgs= []
+
+        for tc, future, start in zip(tool_calls, futures, starts):
+
+            timeout= self.timeout_for(tc["name"])
+
+            # every slot still busy once its timeout is over -> the call never runs (cancel only
+            # fails when a thread picked it up in the meantime)
+            if not start.event.wait(max(submitted_at + timeout - time.monotonic(), 0)) and future.cancel():
+                tool_msg= self._error_message(tc, f"Tool '{tc['name']}' timed out after {timeout}s waiting for a free slot")
+                status= "timeout"
+
+            else:
+                start.event.wait()
+
+                try:
+                    tool_msg= future.result(timeout= max(start.at + timeout - time.monotonic(), 0))
+
+                    # the thread recorded the timings, the outcome is decided here (a late result does not count)
+                    status= tool_msg.status
+
+                except FutureTimeoutError:
+                    # the thread goes on (and keeps its slot) until the tool returns, its result is ignored
+                    tool_msg= self._error_message(tc, f"Tool '{tc['name']}' timed out after {timeout}s")
+                    status= "timeout"
+
+            record_tool_call(tc["name"], status)
+            all_tool_msgs.append(tool_msg)
+
+        return all_tool_msgs
+
+
+    def _invoke_one(self, tc: dict, tools_lookup: Dict[str, object], submitted_at: float, start: Optional[_CallStart]= None) -> ToolMessage:
+
+        started_at= (start or _CallStart()).mark()
+
+        if tc["name"] not in tools_lookup:
+            return self._error_message(tc, f"Tool '{tc['name']}' does not exist")
+
+        try:
+            # identical calls already in flight (from any request) share one upstream call
+            tool_msg= tools_flight.do(tool_call_key(tc), lambda: tools_lookup[tc["name"]].invoke(tc))
+
+            # a shared result still has to answer this request's own tool call id
+            if tool_msg.tool_call_id != tc["id"]:
+                tool_msg= tool_msg.model_copy(update= {"tool_call_id": tc["id"]})
+
+        except Exception as e:
+            tool_msg= self._error_message(tc, f"Tool '{tc['name']}' failed: {str(e)}")
+
+        # timings only -> `run` counts the outcome (a result arriving after its deadline is a timeout)
+        self._record(tc, tool_msg, None, submitted_at, started_at)
+
+        return tool_msg
+
+
+    async def arun(self, tool_calls: List[dict], tools_lookup: Dict[str, object]) -> List[ToolMessage]:
+
+        # gather keeps the original order
+        return list(await asyncio.gather(*[self._ainvoke_one(tc, tools_lookup) for tc in tool_calls]))
+
+
+    async def _ainvoke_one(self, tc: dict, tools_lookup: Dict[str, object]) -> ToolMessage:
+
+        if tc["name"] not in tools_lookup:
+            return self._error_message(tc, f"Tool '{tc['name']}' does not exist")
+
+        timeout= self.timeout_for(tc["name"])
+        semaphore= self._semaphores.setdefault(asyncio.get_running_loop(), asyncio.Semaphore(self.max_concurrency))
+
+        queued_at= started_at= time.monotonic()
+        status= None
+
+        try:
+            async with semaphore:
+                started_at= time.monotonic()
+
+                # identical calls already in flight (from any request) share one upstream call
+                tool_msg= await asyncio.wait_for(
+                    atools_flight.do(tool_call_key(tc), lambda: tools_lookup[tc["name"]].ainvoke(tc)),
+                    timeout= timeout
+                )
+
+            # a shared result still has to answer this request's own tool call id
+            if tool_msg.tool_call_id != tc["id"]:
+                tool_msg= tool_msg.model_copy(update= {"tool_call_id": tc["id"]})
+
+        except asyncio.TimeoutError:
+            tool_msg= self._error_message(tc, f"Tool '{tc['name']}' timed out after {timeout}s")
+            status= "timeout"
+
+        except Exception as e:
+            tool_msg= self._error_message(tc, f"Tool '{tc['name']}' failed: {str(e)}")
+
+        self._record(tc, tool_msg, status or tool_msg.status, queued_at, started_at)
+
+        return tool_msg
+
+
+    @staticmethod
+    def _record(tc: dict, tool_msg: ToolMessage, status: Optional[str], queued_at: float, started_at: float):
+
+        record_tool_call(
+            tc["name"],
+            status,
+            seconds= time.monotonic() - started_at,
+            queue_wait= started_at - queued_at,
+            input_bytes= payload_bytes(json.dumps(tc["args"], default= str)),
+            output_bytes= payload_bytes(tool_msg.content)
+        )
+
+
+    @staticmethod
+    def _error_message(tc: dict, content: str) -> ToolMessage:
+        return ToolMessage(
+            content= content,
+            tool_call_id= tc["id"],
+            name= tc["name"],
+            status= "error"
+        )
+
+
+    def shutdown(self):
+        self._pool.shutdown(wait= False, cancel_futures= True)
+
+
+
+# shared executor -> the concurrency cap applies to the whole process
+tool_executor= ToolExecutor()
@@ -0,0 +1,250 @@
+# IMPORT PACKAGES
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger= logging.getLogger(__name__)
+
+
+
+# WRITE BEHIND CONSTANTS
+
+# a batch is flushed as soon as it holds this many rows
+WRITE_BEHIND_MAX_BATCH= int(os.getenv("WRITE_BEHIND_MAX_BATCH", "50"))
+
+# ... or once its oldest row waited this long (seconds)
+WRITE_BEHIND_FLUSH_INTERVAL= float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))
+
+# attempts per batch before it is dropped (with exponential backoff in between)
+WRITE_BEHIND_MAX_RETRIES= int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "5"))
+
+# first retry delay (seconds), doubled on every attempt
+WRITE_BEHIND_RETRY_BACKOFF= float(os.getenv("WRITE_BEHIND_RETRY_BACKOFF", "0.5"))
+
+# how long the shutdown drain may take (seconds)
+WRITE_BEHIND_DRAIN_TIMEOUT= float(os.getenv("WRITE_BEHIND_DRAIN_TIMEOUT", "10"))
+
+
+
+# WRITE BEHIND QUEUE
+class WriteBehindQueue:
+    """
+    Buffers rows in memory and writes them in bulk from a background thread.
+
+    `put` never blocks on the database. A batch is handed to `flush_fn` once it holds
+    `max_batch` rows or its oldest row waited `flush_interval` seconds. A failing batch is
+    retried with exponential backoff (rows keep their order) and dropped after `max_retries`
+    attempts. `pending()` exposes the rows not yet written so reads can merge them, and the
+    queue drains itself at interpreter exit.
+    """
+
+    def __init__(self, flush_fn: Callable[[List[Dict[str, Any]]], Any], name: str= "write-behind", max_batch: int= WRITE_BEHIND_MAX_BATCH, flush_interval: float= WRITE_BEHIND_FLUSH_INTERVAL, max_retries: int= WRITE_BEHIND_MAX_RETRIES, retry_backoff: float= WRITE_BEHIND_RETRY_BACKOFF):
+
+        self.flush_fn= flush_fn
+        self.name= name
+        self.max_batch= max(1, max_batch)
+        self.flush_interval= flush_interval
+        self.max_retries= max(1, max_retries)
+        self.retry_backoff= retry_backoff
+
+        self._rows: "deque[Dict[str, Any]]"= deque()
+        self._in_flight: List[Dict[str, Any]]= []
+        self._oldest_at= None
+
+        self._condition= threading.Condition()
+        self._closed= False
+        self._flush_waiters= 0
+        self._thread= None
+
+        # counters
+        self.enqueued= 0
+        self.written= 0
+        self.batches= 0
+        self.retries= 0
+        self.dropped= 0
+
+        atexit.register(self.close)
+
+
+    def _ensure_thread(self):
+
+        if self._thread is None:
+            self._thread= threading.Thread(target= self._run, name= self.name, daemon= True)
+            self._thread.start()
+
+
+    def put(self, row: Dict[str, Any]):
+
+        with self._condition:
+
+            if self._closed:
+                raise RuntimeError(f"{self.name} queue is closed")
+
+            if not self._rows:
+                self._oldest_at= time.monotonic()
+
+            self._rows.append(row)
+            self.enqueued+= 1
+
+            self._ensure_thread()
+
+            if len(self._rows) >= self.max_batch:
+                self._condition.notify_all()
+
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """
+        Rows accepted but not written yet (being written first), in insertion order.
+        """
+
+        with self._condition:
+            return list(self._in_flight) + list(self._rows)
+
+
+    # WORKER
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+
+        with self._condition:
+
+            while True:
+
+                if self._rows:
+                    waited= time.monotonic() - self._oldest_at
+
+                    if self._closed or self._flush_waiters or len(self._rows) >= self.max_batch or waited >= self.flush_interval:
+                        break
+
+                    self._condition.wait(self.flush_interval - waited)
+
+                elif self._closed:
+                    return []
+
+                else:
+                    self._condition.wait()
+
+            batch= [self._rows.popleft() for _ in range(min(self.max_batch, len(self._rows)))]
+
+            self._in_flight= batch
+            self._oldest_at= time.monotonic() if self._rows else None
+
+            return batch
+
+
+    def _write(self, batch: List[Dict[str, Any]]):
+
+        for attempt in range(self.max_retries):
+            try:
+                self.flush_fn(batch)
+
+                with self._condition:
+                    self.written+= len(batch)
+                    self.batches+= 1
+
+                return
+
+            except Exception as e:
+
+                if attempt + 1 == self.max_retries:
+                    with self._condition:
+                        self.dropped+= len(batch)
+
+                    logger.error("%s: dropping %d rows after %d attempts: %s", self.name, len(batch), self.max_retries, e)
+                    return
+
+                with self._condition:
+                    self.retries+= 1
+
+                # no backoff while shutting down -> the drain has a deadline
+                if not self._closed:
+                    time.sleep(self.retry_backoff * (2 ** attempt))
+
+
+    def _run(self):
+
+        while True:
+            batch= self._next_batch()
+
+            if not batch:
+                return
+
+            try:
+                self._write(batch)
+
+            finally:
+                with self._condition:
+                    self._in_flight= []
+                    self._condition.notify_all()
+
+
+    # FLUSH / SHUTDOWN
+
+    def flush(self, timeout: float= WRITE_BEHIND_DRAIN_TIMEOUT) -> bool:
+        """
+        Write everything queued now and wait for it. Returns False if `timeout` ran out.
+        """
+
+        deadline= time.monotonic() + timeout
+
+        with self._condition:
+
+            # while someone waits in flush the worker does not wait for the interval
+            self._flush_waiters+= 1
+            self._condition.notify_all()
+
+            try:
+                while self._rows or self._in_flight:
+                    remaining= deadline - time.monotonic()
+
+                    if remaining <= 0:
+                        return False
+
+                    self._condition.wait(remaining)
+
+            finally:
+                self._flush_waiters-= 1
+
+        return True
+
+
+    def close(self, timeout: float= WRITE_BEHIND_DRAIN_TIMEOUT) -> bool:
+
+        with self._condition:
+
+            if self._closed:
+                return True
+
+            self._closed= True
+            self._condition.notify_all()
+
+        if self._thread is None:
+            return True
+
+        self._thread.join(timeout)
+
+        if self._thread.is_alive() or self._rows:
+            logger.error("%s: shutdown drain timed out, %d rows not written", self.name, len(self._rows) + len(self._in_flight))
+            return False
+
+        return True
+
+
+    def stats(self) -> Dict[str, Any]:
+
+        with self._condition:
+            return {
+                "pending": len(self._rows) + len(self._in_flight),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "retries": self.retries,
+                "dropped": self.dropped,
+            }
@@ -0,0 +1,95 @@
+# APPEND ONLY INPUT BENCHMARK: full history vs new message as graph input
+#
+# run from the repo root:
+#   python -m benchmarks.bench_append_only_input
+#   python -m benchmarks.bench_append_only_input --turns 500 --reply-chars 2000
+#
+# A one node graph over the real AgentState and checkpointer replies with a fixed size
+# message, so the numbers are the graph's own per turn overhead (input validation, reducer,
+# checkpoint serialization) without any llm latency. "full history" reads the state and
+# sends every old message back (the old behaviour), "append only" sends just the new one.
+
+# IMPORT PACKAGES
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import StateGraph, START, END
+
+from utils import AgentState
+from backend.checkpointer import BoundedMemorySaver
+
+
+def build_app(reply_chars: int):
+
+    reply= "x" * reply_chars
+
+    def reply_node(state: AgentState):
+        return {"messages": [AIMessage(content= reply)]}
+
+    graph= StateGraph(AgentState)
+    graph.add_node("reply", reply_node)
+    graph.add_edge(START, "reply")
+    graph.add_edge("reply", END)
+
+    return graph.compile(checkpointer= BoundedMemorySaver(spill_path= ""))
+
+
+def run(mode: str, turns: int, reply_chars: int):
+
+    app= build_app(reply_chars)
+    config= {"configurable": {"thread_id": mode}}
+
+    timings= []
+
+    for turn in range(turns):
+        started_at= time.perf_counter()
+
+        new_msg= HumanMessage(content= f"question number {turn}")
+
+        if mode == "full":
+            snapshot= app.get_state(config= config)
+            old_msgs= snapshot.values.get("messages", []) if snapshot else []
+
+            app.invoke({"messages": old_msgs + [new_msg]}, config= config)
+
+        else:
+            app.invoke({"messages": [new_msg]}, config= config)
+
+        timings.append(time.perf_counter() - started_at)
+
+    # both modes must end with the same conversation
+    assert len(app.get_state(config= config).values["messages"]) == 2 * turns
+
+    return timings
+
+
+def report(mode: str, timings):
+
+    tail= timings[-max(1, len(timings) // 10):]
+
+    print(
+        f"{mode:<12} total {sum(timings):7.2f}s  "
+        f"first turn {timings[0] * 1000:7.2f} ms  "
+        f"median {statistics.median(timings) * 1000:7.2f} ms  "
+        f"last 10% {statistics.mean(tail) * 1000:7.2f} ms"
+    )
+
+
+
+if __name__ == "__main__":
+
+    parser= argparse.ArgumentParser(description= "Compare full history and append only graph inputs")
+    parser.add_argument("--turns", type= int, default= 300, help= "turns per conversation")
+    parser.add_argument("--reply-chars", type= int, default= 1000, help= "size of every reply")
+    args= parser.parse_args()
+
+    print(f"{args.turns} turns, {args.reply_chars} char replies\n")
+
+    for mode in ("full", "append"):
+        report("full history" if mode == "full" else "append only", run(mode, args.turns, args.reply_chars))
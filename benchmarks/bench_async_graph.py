@@ -0,0 +1,85 @@
+# ASYNC GRAPH BENCHMARK: sync nodes (one worker thread per running node) vs async nodes
+#
+# run from the repo root:
+#   python -m benchmarks.bench_async_graph
+#   python -m benchmarks.bench_async_graph --concurrency 8 64 256 --latency 0.5
+#
+# Both flavours of the real graph (build_graph(asynchronous= False / True)) run on the fake
+# llm of benchmarks/fakes.py, which sleeps `latency` seconds per call like a remote model
+# would. N conversations are started at once on one event loop, each one is a maths question
+# (supervisor -> maths_reasoner -> should_use_tools, two llm calls). The sync graph is capped
+# by the default thread pool, the async one only by the event loop.
+
+# IMPORT PACKAGES
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from backend.ai_agent import build_graph
+from benchmarks.fakes import install_fake_llm
+
+
+async def run(asynchronous: bool, concurrency: int):
+
+    app= build_graph(asynchronous= asynchronous).compile(checkpointer= MemorySaver())
+    flavour= "async" if asynchronous else "sync"
+
+    async def one(index: int) -> float:
+
+        config= {"configurable": {"thread_id": f"{flavour}-{concurrency}-{index}"}}
+
+        # distinct questions -> the supervisor single flight can not merge them
+        message= HumanMessage(content= f"what is the integral of x^{index} between 0 and {concurrency}?")
+
+        started_at= time.perf_counter()
+        await app.ainvoke({"messages": [message], "used_tools": False}, config= config)
+
+        return time.perf_counter() - started_at
+
+    started_at= time.perf_counter()
+    latencies= await asyncio.gather(*(one(index) for index in range(concurrency)))
+    elapsed= time.perf_counter() - started_at
+
+    latencies= sorted(latencies)
+
+    return {
+        "throughput": concurrency / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+
+if __name__ == "__main__":
+
+    parser= argparse.ArgumentParser(description= "Throughput and latency of the sync vs async node graph under concurrent load")
+    parser.add_argument("--concurrency", type= int, nargs= "+", default= [8, 32, 128, 256], help= "conversations started at once")
+    parser.add_argument("--latency", type= float, default= 0.2, help= "fake llm latency per call (seconds)")
+    args= parser.parse_args()
+
+    install_fake_llm(latency= args.latency)
+
+    # lower bound of one conversation -> two llm calls
+    ideal= 2 * args.latency
+
+    print(f"ideal latency per conversation: {ideal * 1000:.0f} ms\n")
+    print(f"{'concurrency':>11} | {'sync req/s':>10} {'p50 ms':>8} {'p99 ms':>8} | {'async req/s':>11} {'p50 ms':>8} {'p99 ms':>8}")
+
+    for concurrency in args.concurrency:
+
+        sync_result= asyncio.run(run(False, concurrency))
+        async_result= asyncio.run(run(True, concurrency))
+
+        print(
+            f"{concurrency:>11} | "
+            f"{sync_result['throughput']:>10.1f} {sync_result['p50'] * 1000:>8.0f} {sync_result['p99'] * 1000:>8.0f} | "
+            f"{async_result['throughput']:>11.1f} {async_result['p50'] * 1000:>8.0f} {async_result['p99'] * 1000:>8.0f}"
+        )
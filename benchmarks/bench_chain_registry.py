@@ -0,0 +1,83 @@
+# MICROBENCHMARK: per-turn chain construction vs prebuilt chain registry
+#
+# run from the repo root:
+#   python -m benchmarks.bench_chain_registry
+#
+# Nothing is sent to the llm, only the prompt / parser / chain construction that every
+# node used to pay on each invocation is timed against the registry lookup that replaced it.
+
+# IMPORT PACKAGES
+import os
+import timeit
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import PydanticOutputParser
+
+from utils import (
+    SupervisorOutput, chain_registry, llm_model, binded_llm_model,
+    supervisor_prompt, greeting_prompt, query_refiner_prompt, coder_prompt, maths_reasoner_prompt, researcher_prompt,
+    SUPERVISOR, GREETING, ENHANCER, CODER, MATHS_REASONER, RESEARCHER,
+)
+
+
+# BENCHMARK CONSTANTS
+ROUNDS= 2000
+
+NODE_PROMPTS= {
+    SUPERVISOR: supervisor_prompt,
+    GREETING: greeting_prompt,
+    ENHANCER: query_refiner_prompt,
+    CODER: coder_prompt,
+    MATHS_REASONER: maths_reasoner_prompt,
+    RESEARCHER: researcher_prompt,
+}
+
+
+# OLD PATH -> what each node did before invoking
+def build_per_call(name: str):
+
+    template= NODE_PROMPTS[name].template
+
+    if name == SUPERVISOR:
+        pyd_parser= PydanticOutputParser(pydantic_object= SupervisorOutput)
+
+        prompt_temp= PromptTemplate(
+            template= template,
+            input_variables= ["messages"],
+            partial_variables= {"format_instructions": pyd_parser.get_format_instructions()}
+        )
+
+        return prompt_temp | llm_model | pyd_parser
+
+    prompt_temp= PromptTemplate(template= template, input_variables= ["messages"])
+
+    return prompt_temp | (llm_model if name in (GREETING, ENHANCER) else binded_llm_model)
+
+
+# NEW PATH -> registry lookup
+def lookup(name: str):
+    return chain_registry.get(name, tool_bound= name in (CODER, MATHS_REASONER, RESEARCHER))
+
+
+
+if __name__ == "__main__":
+
+    print(f"{'node':<16}{'per call (us)':>16}{'registry (us)':>16}{'saved (us)':>14}")
+
+    for name in NODE_PROMPTS:
+
+        per_call= timeit.timeit(lambda: build_per_call(name), number= ROUNDS) / ROUNDS * 1e6
+        registry= timeit.timeit(lambda: lookup(name), number= ROUNDS) / ROUNDS * 1e6
+
+        print(f"{name:<16}{per_call:>16.1f}{registry:>16.2f}{per_call - registry:>14.1f}")
+
+    # a typical tool using turn: supervisor -> specialist -> specialist again after the tools
+    turn_names= [SUPERVISOR, RESEARCHER, RESEARCHER]
+
+    per_turn_old= sum(timeit.timeit(lambda: build_per_call(n), number= ROUNDS) for n in turn_names) / ROUNDS * 1e6
+    per_turn_new= sum(timeit.timeit(lambda: lookup(n), number= ROUNDS) for n in turn_names) / ROUNDS * 1e6
+
+    print(f"\nper turn (supervisor + 2x researcher): {per_turn_old:.1f} us -> {per_turn_new:.2f} us")
@@ -0,0 +1,125 @@
+# COLD START BENCHMARK: import time of the API entrypoint
+#
+# run from the repo root:
+#   python -m benchmarks.bench_cold_start
+#   python -m benchmarks.bench_cold_start --runs 10 --top 15
+#   python -m benchmarks.bench_cold_start --record benchmarks/cold_start_history.jsonl
+#
+# Every run is a fresh interpreter (no warm module cache), so the numbers are what uvicorn
+# pays before it can serve the first request. `--record` appends one json line per
+# invocation (with the git revision) so the startup time can be tracked across releases.
+
+# IMPORT PACKAGES
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+
+# BENCHMARK CONSTANTS
+REPO_ROOT= os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_TARGET= "backend.fastapi_backend"
+
+IMPORT_SNIPPET= """
+import time
+started_at= time.perf_counter()
+import {target}
+print(time.perf_counter() - started_at)
+"""
+
+
+# time one fresh import of the target module
+def time_import(target: str) -> float:
+
+    output= subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(target= target)],
+        cwd= REPO_ROOT,
+        capture_output= True,
+        text= True,
+        check= True,
+    )
+
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+# heaviest modules by cumulative import time (python -X importtime)
+def heaviest_imports(target: str, top: int):
+
+    output= subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd= REPO_ROOT,
+        capture_output= True,
+        text= True,
+        check= True,
+    )
+
+    rows= []
+
+    for line in output.stderr.splitlines():
+        match= re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(.*)$", line)
+
+        if match:
+            rows.append((int(match.group(2)), match.group(3).strip()))
+
+    return sorted(rows, reverse= True)[:top]
+
+
+def git_revision() -> str:
+
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd= REPO_ROOT,
+            capture_output= True,
+            text= True,
+            check= True,
+        ).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+
+if __name__ == "__main__":
+
+    parser= argparse.ArgumentParser(description= "Measure the cold start (import) time of the API")
+    parser.add_argument("--target", default= DEFAULT_TARGET, help= "module to import")
+    parser.add_argument("--runs", type= int, default= 5, help= "number of fresh interpreters")
+    parser.add_argument("--top", type= int, default= 10, help= "show the N heaviest imports (0 to skip)")
+    parser.add_argument("--record", default= None, help= "append the result as a json line to this file")
+    args= parser.parse_args()
+
+    # one untimed run -> warms the OS file cache and the .pyc files
+    time_import(args.target)
+
+    timings= [time_import(args.target) for _ in range(args.runs)]
+
+    result= {
+        "target": args.target,
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "min_s": round(min(timings), 4),
+        "median_s": round(statistics.median(timings), 4),
+        "max_s": round(max(timings), 4),
+    }
+
+    print(f"import {args.target}: min {result['min_s']:.3f}s  median {result['median_s']:.3f}s  max {result['max_s']:.3f}s  ({args.runs} runs)")
+
+    if args.top:
+        print(f"\nheaviest imports (cumulative):")
+
+        for cumulative_us, module in heaviest_imports(args.target, args.top):
+            print(f"  {cumulative_us / 1000:>9.1f} ms  {module}")
+
+    if args.record:
+        with open(args.record, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+        print(f"\nrecorded to {args.record}")
@@ -0,0 +1,92 @@
+# COMPACTION BENCHMARK: state size and serialization time over a long session
+#
+# run from the repo root:
+#   python -m benchmarks.bench_compaction
+#   python -m benchmarks.bench_compaction --turns 400 --tool-chars 8000
+#
+# Every turn of the fake session is a human question, an ai tool call, a bulky tool output
+# and an ai answer (what a researcher turn looks like). The same session runs with and
+# without the compactor in front, and every `--every` turns the message channel is
+# serialized with the checkpointer's serializer (what each checkpoint write pays).
+
+# IMPORT PACKAGES
+import argparse
+import os
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.graph import StateGraph, START, END
+from langgraph.checkpoint.memory import MemorySaver
+
+from utils import AgentState
+from backend.compaction import compact_messages
+
+
+def build_app(compaction: bool, tool_chars: int):
+
+    tool_output= "search result " * (tool_chars // 14)
+
+    def compactor(state: AgentState):
+        return {"messages": compact_messages(state.messages) if compaction else []}
+
+    def turn(state: AgentState):
+
+        call_id= f"call_{len(state.messages)}"
+
+        return {"messages": [
+            AIMessage(content= "", tool_calls= [{"name": "web_search_tool", "args": {"query": "q"}, "id": call_id}]),
+            ToolMessage(content= tool_output, tool_call_id= call_id),
+            AIMessage(content= "Here is what I found about your question. " * 5),
+        ]}
+
+    graph= StateGraph(AgentState)
+    graph.add_node("compactor", compactor)
+    graph.add_node("turn", turn)
+    graph.add_edge(START, "compactor")
+    graph.add_edge("compactor", "turn")
+    graph.add_edge("turn", END)
+
+    return graph.compile(checkpointer= MemorySaver())
+
+
+def run(compaction: bool, turns: int, tool_chars: int, every: int):
+
+    app= build_app(compaction, tool_chars)
+    serde= app.checkpointer.serde
+    config= {"configurable": {"thread_id": "bench"}}
+
+    rows= []
+
+    for turn in range(1, turns + 1):
+        app.invoke({"messages": [HumanMessage(content= f"question number {turn}")]}, config= config)
+
+        if turn % every == 0:
+            messages= app.get_state(config).values["messages"]
+
+            started_at= time.perf_counter()
+            _, payload= serde.dumps_typed(messages)
+            elapsed= time.perf_counter() - started_at
+
+            rows.append((turn, len(messages), len(payload), elapsed))
+
+    return rows
+
+
+
+if __name__ == "__main__":
+
+    parser= argparse.ArgumentParser(description= "Measure state size with and without compaction")
+    parser.add_argument("--turns", type= int, default= 200, help= "turns in the session")
+    parser.add_argument("--tool-chars", type= int, default= 4000, help= "size of every tool output")
+    parser.add_argument("--every", type= int, default= 50, help= "sample every N turns")
+    args= parser.parse_args()
+
+    for compaction in (False, True):
+        print(f"\ncompaction {'on' if compaction else 'off'}:")
+        print(f"  {'turn':>6} {'messages':>9} {'state KB':>10} {'serialize ms':>13}")
+
+        for turn, n_messages, size, elapsed in run(compaction, args.turns, args.tool_chars, args.every):
+            print(f"  {turn:>6} {n_messages:>9} {size / 1024:>10.1f} {elapsed * 1000:>13.2f}")
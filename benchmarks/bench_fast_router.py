@@ -0,0 +1,97 @@
+# FAST ROUTER BENCHMARK: decisions and cost of the zero-llm pre router
+#
+# run from the repo root:
+#   python -m benchmarks.bench_fast_router
+#   python -m benchmarks.bench_fast_router --repeat 20000 --threshold 0.7
+#
+# Every labelled turn below goes through FastRouter.route. A route label means the fast path
+# should answer it, None means it must be left to the supervisor llm (ambiguous turns, and
+# look-alikes of a rule such as dates or phone numbers next to the arithmetic one). The table
+# reports the fast path rate, the wrong decisions (listed below it) and the cost of a call.
+
+# IMPORT PACKAGES
+import argparse
+import statistics
+import time
+
+from backend.fast_router import FastRouter, FAST_ROUTER_THRESHOLD
+
+
+# (turn, expected route or None -> the supervisor llm decides)
+CASES= [
+    # greetings
+    ("hi", "greeting"),
+    ("Hello!", "greeting"),
+    ("thank you so much :)", "greeting"),
+    ("good morning", "greeting"),
+
+    # bare arithmetic
+    ("37593 * 67", "maths_reasoner"),
+    ("(2+3)**4 / 7", "maths_reasoner"),
+    ("10 - 3", "maths_reasoner"),
+    ("10-3*2", "maths_reasoner"),
+    ("-5 + 2 = ?", "maths_reasoner"),
+
+    # pasted code
+    ("```python\nprint('hi')\n```", "coder"),
+
+    # look-alikes of the arithmetic rule -> never the maths fast path
+    ("2024-10-18", None),
+    ("1-800-555-1234", None),
+    ("+1-800-555-1234", None),
+    ("(2024-10-18)", None),
+    ("555-123-4567", None),
+    ("12/04/2024", None),
+
+    # open ended -> the llm decides
+    ("hi, can you explain how transformers work and write code for one?", None),
+    ("what do you think about this?", None),
+]
+
+
+def run(router: FastRouter, repeat: int) -> dict:
+
+    wrong= []
+    fast= 0
+
+    for text, expected in CASES:
+        decision= router.route(text)
+        route= decision.route if decision is not None else None
+
+        fast+= route is not None
+
+        if route != expected:
+            wrong.append((text, expected, route, decision.source if decision is not None else "-"))
+
+    # cost of a call, over every case
+    timings= []
+
+    for _ in range(repeat):
+        for text, _ in CASES:
+            started_at= time.perf_counter()
+            router.route(text)
+            timings.append(time.perf_counter() - started_at)
+
+    return {
+        "fast_path": fast / len(CASES),
+        "wrong": wrong,
+        "p50_us": statistics.median(timings) * 1e6,
+        "max_us": max(timings) * 1e6,
+    }
+
+
+
+if __name__ == "__main__":
+
+    parser= argparse.ArgumentParser(description= "Decisions and cost of the fast path router on labelled turns")
+    parser.add_argument("--repeat", type= int, default= 2000, help= "timed passes over the cases")
+    parser.add_argument("--threshold", type= float, default= FAST_ROUTER_THRESHOLD, help= "minimum local confidence")
+    args= parser.parse_args()
+
+    result= run(FastRouter(threshold= args.threshold, enabled= True), args.repeat)
+
+    print(f"{'cases':>6} | {'fast path':>9} | {'wrong':>5} | {'p50 us':>7} {'max us':>8}")
+    print(f"{len(CASES):>6} | {result['fast_path']:>8.0%} | {len(result['wrong']):>5} | {result['p50_us']:>7.1f} {result['max_us']:>8.1f}")
+
+    for text, expected, route, source in result["wrong"]:
+        print(f"  wrong: {text!r} -> {route} ({source}), expected {expected}")
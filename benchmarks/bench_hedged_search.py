@@ -0,0 +1,108 @@
+# HEDGED SEARCH BENCHMARK: primary provider only vs hedged against a second provider
+#
+# run from the repo root:
+#   python -m benchmarks.bench_hedged_search
+#   python -m benchmarks.bench_hedged_search --queries 2000 --stall-rate 0.1 --scale 0.05
+#
+# Two simulated providers sleep a random, lognormal latency: the primary is fast but stalls
+# on `stall-rate` of the queries (the long tail seen on real search apis), the secondary is
+# slower on average but has no stalls. Latencies are multiplied by `scale` so the run is
+# quick, the table reports them back in unscaled seconds. "extra calls" is the share of
+# queries that also paid for a secondary call.
+
+# IMPORT PACKAGES
+import argparse
+import asyncio
+import random
+import statistics
+
+from backend.hedging import HedgedSearch, SearchProvider
+
+
+def percentile(values, q: float) -> float:
+
+    values= sorted(values)
+
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def provider(name: str, median: float, sigma: float, stall_rate: float, stall: float, scale: float, rng: random.Random) -> SearchProvider:
+
+    async def arun(query: str) -> str:
+
+        latency= rng.lognormvariate(0, sigma) * median
+
+        if rng.random() < stall_rate:
+            latency+= stall
+
+        await asyncio.sleep(latency * scale)
+
+        return f"{name}: results for {query}"
+
+    return SearchProvider(name, None, arun)
+
+
+async def run(hedged: bool, queries: int, concurrency: int, args) -> dict:
+
+    rng= random.Random(args.seed)
+
+    primary= provider("primary", args.primary_median, 0.4, args.stall_rate, args.stall, args.scale, rng)
+    secondary= provider("secondary", args.secondary_median, 0.3, 0.0, 0.0, args.scale, rng)
+
+    # delay bounds are scaled like the latencies
+    search= HedgedSearch(primary, secondary, min_delay= 0.3 * args.scale, max_delay= 5 * args.scale, default_delay= 1.5 * args.scale)
+
+    semaphore= asyncio.Semaphore(concurrency)
+    latencies= []
+
+    async def one(index: int):
+
+        async with semaphore:
+            loop= asyncio.get_running_loop()
+            started_at= loop.time()
+
+            if hedged:
+                await search.arun(f"query {index}")
+
+            else:
+                await primary.arun(f"query {index}")
+
+            latencies.append((loop.time() - started_at) / args.scale)
+
+    await asyncio.gather(*(one(index) for index in range(queries)))
+
+    return {
+        "p50": statistics.median(latencies),
+        "p90": percentile(latencies, 0.9),
+        "p99": percentile(latencies, 0.99),
+        "extra": search.hedged / queries if hedged else 0.0,
+        "delay": search.hedge_delay() / args.scale if hedged else None,
+    }
+
+
+
+if __name__ == "__main__":
+
+    parser= argparse.ArgumentParser(description= "Tail latency of the hedged web search against the primary provider alone")
+    parser.add_argument("--queries", type= int, default= 1000, help= "queries per mode")
+    parser.add_argument("--concurrency", type= int, default= 32, help= "queries in flight at once")
+    parser.add_argument("--primary-median", type= float, default= 0.5, help= "primary median latency (seconds)")
+    parser.add_argument("--secondary-median", type= float, default= 0.9, help= "secondary median latency (seconds)")
+    parser.add_argument("--stall-rate", type= float, default= 0.08, help= "share of primary queries that stall")
+    parser.add_argument("--stall", type= float, default= 4.0, help= "extra latency of a stalled query (seconds)")
+    parser.add_argument("--scale", type= float, default= 0.05, help= "time scale of the simulation")
+    parser.add_argument("--seed", type= int, default= 7)
+    args= parser.parse_args()
+
+    print(f"{'mode':>14} | {'p50 s':>7} {'p90 s':>7} {'p99 s':>7} | {'extra calls':>11} {'hedge delay s':>13}")
+
+    for hedged in (False, True):
+
+        result= asyncio.run(run(hedged, args.queries, args.concurrency, args))
+        delay= f"{result['delay']:.2f}" if result["delay"] is not None else "-"
+
+        print(
+            f"{'hedged' if hedged else 'primary only':>14} | "
+            f"{result['p50']:>7.2f} {result['p90']:>7.2f} {result['p99']:>7.2f} | "
+            f"{result['extra']:>10.1%} {delay:>13}"
+        )
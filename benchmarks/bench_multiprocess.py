@@ -0,0 +1,216 @@
+# MULTI PROCESS LOAD TEST: several api workers serving the same conversations
+#
+# run from the repo root:
+#   python -m benchmarks.bench_multiprocess
+#   python -m benchmarks.bench_multiprocess --workers 4 --users 64 --turns 4 --burst
+#
+# `workers` api processes (uvicorn, fake llm of benchmarks/fakes.py) are started per
+# checkpoint backend, like `uvicorn --workers N` or N containers behind a load balancer. Every
+# turn of a conversation is sent to a different worker than the one before. "history" is the
+# share of follow-up turns whose prompt still held the earlier turns (the fake llm echoes it):
+# with the per process memory backend a follow-up usually lands on a worker that never saw
+# the conversation.
+#
+# --burst sends all the turns of a conversation at once (to different workers): the thread
+# leases run them one after the other, "turns kept" reads the shared file afterwards and
+# counts the user turns that made it into the final state (no turn may be lost).
+
+# IMPORT PACKAGES
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import socket
+import statistics
+import tempfile
+import time
+import uuid
+
+import httpx
+
+
+HISTORY= re.compile(r"\[history: (\d+)\]")
+
+
+def percentile(values, q: float) -> float:
+
+    values= sorted(values)
+
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def free_port() -> int:
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+
+        return sock.getsockname()[1]
+
+
+
+# WORKER PROCESS
+def serve(port: int, backend: str, path: str, latency: float):
+
+    # before any import of the app -> the checkpointer is picked at import time
+    os.environ.update({
+        "CHECKPOINT_BACKEND": backend,
+        "CHECKPOINT_SHARED_PATH": path,
+        "DATABASE_BACKEND": "local",
+        "LOCAL_DATABASE_PATH": ":memory:",
+        "WARMUP_ON_STARTUP": "false",
+    })
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+    import uvicorn
+    from benchmarks.fakes import install_fake_llm
+
+    install_fake_llm(latency= latency)
+
+    from backend.fastapi_backend import app
+
+    uvicorn.run(app, host= "127.0.0.1", port= port, log_level= "warning")
+
+
+def start_workers(count: int, backend: str, path: str, latency: float):
+
+    context= multiprocessing.get_context("spawn")
+    ports= [free_port() for _ in range(count)]
+
+    processes= [context.Process(target= serve, args= (port, backend, path, latency), daemon= True) for port in ports]
+
+    for process in processes:
+        process.start()
+
+    # wait for every worker to answer
+    deadline= time.monotonic() + 120
+
+    for port in ports:
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/health", timeout= 1).raise_for_status()
+                break
+
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"worker on port {port} did not start")
+
+                time.sleep(0.2)
+
+    return ports, processes
+
+
+
+# LOAD
+async def turn(client: httpx.AsyncClient, port: int, message: str, thread_id: str) -> dict:
+
+    started_at= time.perf_counter()
+    text= ""
+
+    async with client.stream("GET", f"http://127.0.0.1:{port}/chat_stream/{message}", params= {"thread_id": thread_id}) as response:
+
+        async for line in response.aiter_lines():
+
+            if line.startswith("data:") and '"type": "content"' in line:
+                text+= json.loads(line[5:])["content"]
+
+    history= HISTORY.search(text)
+
+    return {"latency": time.perf_counter() - started_at, "history": int(history.group(1)) if history else None}
+
+
+async def run(ports: list, args) -> dict:
+
+    threads= [str(uuid.uuid4()) for _ in range(args.users)]
+
+    async def user(index: int, client: httpx.AsyncClient) -> list:
+
+        def send(number: int):
+            # never the worker of the previous turn
+            port= ports[(index + number) % len(ports)]
+
+            return turn(client, port, f"route=coder echo=history turn {number} of user {index}", threads[index])
+
+        if args.burst:
+            return list(await asyncio.gather(*(send(number) for number in range(args.turns))))
+
+        return [await send(number) for number in range(args.turns)]
+
+    started_at= time.perf_counter()
+
+    async with httpx.AsyncClient(timeout= None, limits= httpx.Limits(max_connections= None)) as client:
+        results= await asyncio.gather(*(user(index, client) for index in range(args.users)))
+
+    elapsed= time.perf_counter() - started_at
+
+    latencies= [result["latency"] for turns in results for result in turns]
+
+    # follow ups -> every turn but the first one of a conversation (in order without --burst)
+    follow_ups= [result for turns in results for result in turns[1:]]
+
+    return {
+        "threads": threads,
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 0.99),
+        "history": sum(1 for result in follow_ups if result["history"]) / len(follow_ups) if follow_ups else 1.0,
+    }
+
+
+# user turns found in the final state of every thread of the shared file
+def turns_kept(path: str, threads: list) -> float:
+
+    from langchain_core.messages import HumanMessage
+    from backend.checkpointer import SharedSqliteSaver
+
+    saver= SharedSqliteSaver(path)
+    kept= 0
+
+    for thread_id in threads:
+        checkpoint= saver.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+        messages= checkpoint.checkpoint["channel_values"].get("messages", []) if checkpoint else []
+
+        kept+= sum(1 for message in messages if isinstance(message, HumanMessage))
+
+    return kept
+
+
+
+if __name__ == "__main__":
+
+    parser= argparse.ArgumentParser(description= "Several api worker processes serving the same conversations, per checkpoint backend")
+    parser.add_argument("--workers", type= int, default= 4, help= "api worker processes")
+    parser.add_argument("--users", type= int, default= 32, help= "conversations at once")
+    parser.add_argument("--turns", type= int, default= 4, help= "turns per conversation")
+    parser.add_argument("--latency", type= float, default= 0.1, help= "fake llm latency per call (seconds)")
+    parser.add_argument("--backends", nargs= "+", default= ["memory", "sqlite"], choices= ["memory", "sqlite"])
+    parser.add_argument("--burst", action= "store_true", help= "send the turns of a conversation all at once")
+    args= parser.parse_args()
+
+    print(f"{args.workers} workers, {args.users} conversations x {args.turns} turns{' (burst)' if args.burst else ''}\n")
+    print(f"{'backend':>8} | {'req/s':>7} {'p50 ms':>8} {'p99 ms':>8} | {'history':>8} | {'turns kept':>10}")
+
+    for backend in args.backends:
+
+        with tempfile.TemporaryDirectory() as directory:
+            path= os.path.join(directory, "checkpoints.sqlite3")
+
+            ports, processes= start_workers(args.workers, backend, path, args.latency)
+
+            try:
+                result= asyncio.run(run(ports, args))
+
+            finally:
+                for process in processes:
+                    process.terminate()
+                    process.join()
+
+            kept= f"{turns_kept(path, result['threads']) / (args.users * args.turns):.1%}" if backend == "sqlite" else "-"
+
+            print(
+                f"{backend:>8} | "
+                f"{result['throughput']:>7.1f} {result['p50'] * 1000:>8.0f} {result['p99'] * 1000:>8.0f} | "
+                f"{result['history']:>7.1%} | {kept:>10}"
+            )
@@ -0,0 +1,86 @@
+# RESEARCH FAN OUT BENCHMARK: researcher tool loop vs the fan out subgraph
+#
+# run from the repo root:
+#   python -m benchmarks.bench_research_fanout
+#   python -m benchmarks.bench_research_fanout --llm-latency 1.5 --loop-tools 1
+#
+# Both research modes of the real graph run on the fake llm and fake search tools of
+# benchmarks/fakes.py (no network). In "tools" mode the researcher llm asks for
+# `loop-tools` sources in its one tool round and then answers from the raw outputs, in
+# "fanout" mode every source is queried at once and one synthesis call answers from the
+# evidence bundle. Reported per research answer: wall time, llm calls, sources consulted
+# and prompt characters sent to the llm (all calls of the turn, supervisor included).
+
+# IMPORT PACKAGES
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+from langchain_core.messages import HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from backend.ai_agent import build_graph
+from backend.research import RESEARCH_SOURCES
+from benchmarks.fakes import install_fake_llm, install_fake_tools
+
+
+# per source latency (seconds) -> roughly what the real apis take
+SOURCE_LATENCIES= {
+    "web_search_tool": 1.2,
+    "duck_duck_search_tool": 0.9,
+    "wikipedia_search_tool": 0.7,
+    "pubmed_search_tool": 1.5,
+}
+
+
+async def run(mode: str, fake, runs: int):
+
+    app= build_graph(asynchronous= True, research_mode= mode).compile(checkpointer= MemorySaver())
+
+    timings, calls, prompt_chars, sources= [], [], [], []
+
+    for index in range(runs):
+
+        config= {"configurable": {"thread_id": f"{mode}-{index}"}}
+        fake.calls, fake.prompt_chars= 0, 0
+
+        started_at= time.perf_counter()
+        result= await app.ainvoke({"messages": [HumanMessage(content= f"what do studies say about the effect size, question {index}?")], "used_tools": False}, config= config)
+        timings.append(time.perf_counter() - started_at)
+
+        calls.append(fake.calls)
+        prompt_chars.append(fake.prompt_chars)
+        sources.append(len(RESEARCH_SOURCES) if mode == "fanout" else sum(isinstance(msg, ToolMessage) for msg in result["messages"]))
+
+    return {
+        "wall": statistics.median(timings),
+        "calls": statistics.mean(calls),
+        "sources": statistics.mean(sources),
+        "prompt_chars": statistics.mean(prompt_chars),
+    }
+
+
+
+if __name__ == "__main__":
+
+    parser= argparse.ArgumentParser(description= "Wall time and llm round trips per research answer, tool loop vs fan out")
+    parser.add_argument("--runs", type= int, default= 5, help= "research questions per mode")
+    parser.add_argument("--llm-latency", type= float, default= 1.0, help= "fake llm latency per call (seconds)")
+    parser.add_argument("--loop-tools", type= int, default= 2, help= "sources the tool loop researcher asks for in its round")
+    args= parser.parse_args()
+
+    fake= install_fake_llm(latency= args.llm_latency, route= "researcher", research_tools= list(SOURCE_LATENCIES)[:args.loop_tools], reply= "Summary of the evidence. " * 20)
+    install_fake_tools(SOURCE_LATENCIES)
+
+    print(f"{'mode':>8} | {'wall s':>7} {'llm calls':>9} {'sources':>7} {'prompt chars':>12}")
+
+    for mode in ("tools", "fanout"):
+
+        result= asyncio.run(run(mode, fake, args.runs))
+
+        print(f"{mode:>8} | {result['wall']:>7.2f} {result['calls']:>9.1f} {result['sources']:>7.1f} {result['prompt_chars']:>12.0f}")
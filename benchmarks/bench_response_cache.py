@@ -0,0 +1,96 @@
+# RESPONSE CACHE BENCHMARK: lookup cost and hit rate of the supervisor / enhancer cache
+#
+# run from the repo root:
+#   python -m benchmarks.bench_response_cache
+#   python -m benchmarks.bench_response_cache --requests 20000 --distinct 300
+#
+# A synthetic stream of first turns: `distinct` base questions drawn with a skewed
+# (zipf like) popularity, each one sent as is or with casing / punctuation / spacing changes
+# and, for some, a one letter typo. The stream is replayed through an exact only cache and
+# an exact + similarity cache; the table reports the hit rates and the cost of a lookup,
+# to compare with the llm call a hit replaces.
+
+# IMPORT PACKAGES
+import argparse
+import random
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+
+from backend.response_cache import ResponseCache, RESPONSE_CACHE_SIMILARITY
+
+
+TOPICS= ["photosynthesis", "black holes", "the french revolution", "neural networks", "inflation", "plate tectonics", "the immune system", "quantum entanglement", "supply chains", "climate change"]
+FORMS= ["explain {} in simple terms", "what are the main ideas behind {}", "give me an overview of {}", "why does {} matter", "summarize the history of {}"]
+
+
+def variant(question: str, rng: random.Random, typo_rate: float) -> str:
+
+    text= question
+
+    if rng.random() < 0.3:
+        text= text.capitalize()
+
+    if rng.random() < 0.3:
+        text+= rng.choice(["?", ".", " ?", "!"])
+
+    if rng.random() < 0.2:
+        text= text.replace(" ", "  ", 1)
+
+    # one letter dropped -> only the similarity tier can match it
+    if rng.random() < typo_rate:
+        index= rng.randrange(len(text))
+        text= text[:index] + text[index + 1:]
+
+    return text
+
+
+def replay(cache: ResponseCache, stream):
+
+    timings= []
+
+    for text in stream:
+        messages= [HumanMessage(content= text)]
+
+        started_at= time.perf_counter()
+        found, _= cache.get(messages)
+        timings.append(time.perf_counter() - started_at)
+
+        if not found:
+            cache.put(messages, {"route": "researcher"})
+
+    return timings
+
+
+
+if __name__ == "__main__":
+
+    parser= argparse.ArgumentParser(description= "Hit rate and lookup cost of the response cache tiers")
+    parser.add_argument("--requests", type= int, default= 10000, help= "first turns replayed")
+    parser.add_argument("--distinct", type= int, default= 50, help= "distinct base questions (at most 50)")
+    parser.add_argument("--typo-rate", type= float, default= 0.1, help= "share of requests with a typo")
+    parser.add_argument("--similarity", type= float, default= RESPONSE_CACHE_SIMILARITY, help= "similarity tier threshold")
+    parser.add_argument("--seed", type= int, default= 3)
+    args= parser.parse_args()
+
+    rng= random.Random(args.seed)
+
+    questions= [form.format(topic) for topic in TOPICS for form in FORMS][:args.distinct]
+    weights= [1 / (rank + 1) for rank in range(len(questions))]
+
+    stream= [variant(rng.choices(questions, weights)[0], rng, args.typo_rate) for _ in range(args.requests)]
+
+    print(f"{'cache':>18} | {'hit rate':>8} {'exact':>7} {'similar':>7} | {'lookup p50 us':>13} {'lookup p99 us':>13}")
+
+    for semantic in (False, True):
+
+        cache= ResponseCache("bench", semantic= semantic, similarity= args.similarity, enabled= True)
+        timings= sorted(replay(cache, stream))
+        stats= cache.stats()
+
+        print(
+            f"{'exact + similar' if semantic else 'exact':>18} | "
+            f"{stats['hit_rate']:>8.1%} {stats['exact_hits']:>7} {stats['semantic_hits']:>7} | "
+            f"{statistics.median(timings) * 1e6:>13.1f} {timings[int(len(timings) * 0.99)] * 1e6:>13.1f}"
+        )
@@ -0,0 +1,122 @@
+# SSE COALESCING BENCHMARK: frames and cpu per stream, per token vs coalesced frames
+#
+# run from the repo root:
+#   python -m benchmarks.bench_sse_coalescing
+#   python -m benchmarks.bench_sse_coalescing --streams 200 --tokens 400 --token-interval-ms 2
+#
+# `--streams` concurrent fake llm streams emit `--tokens` tokens each, one every
+# `--token-interval-ms` (a fast hosted model streams a token every 1-5 ms). Each stream is
+# framed exactly like /chat_stream does and every frame is one send on a local socket (what
+# the ASGI server does per yielded chunk), so the numbers are the server side framing +
+# write cost only, without the graph or the network.
+
+# IMPORT PACKAGES
+import argparse
+import asyncio
+import random
+import socket
+import threading
+import time
+
+from backend.sse import coalesce, content_frame, END_FRAME
+
+
+TOKENS= ["The", " answer", " is", " that", " numpy", "'s", " arrays", " are", "\n", " fast", ",", " because", " of", " vectorization", "."]
+
+
+async def fake_llm(n_tokens: int, interval: float):
+
+    for i in range(n_tokens):
+        await asyncio.sleep(interval * random.uniform(0.5, 1.5))
+        yield TOKENS[i % len(TOKENS)]
+
+
+class SocketSink:
+
+    def __init__(self):
+
+        self.writer, self.reader= socket.socketpair()
+        self.bytes= 0
+
+        threading.Thread(target= self._drain, daemon= True).start()
+
+
+    def _drain(self):
+        while self.reader.recv(1 << 16):
+            pass
+
+
+    def append(self, payload: bytes):
+        self.writer.sendall(payload)
+        self.bytes+= len(payload)
+
+
+    def close(self):
+        self.writer.close()
+
+
+
+async def stream(mode: str, n_tokens: int, interval: float, coalesce_ms: float, max_chars: int, sink: SocketSink):
+
+    tokens= fake_llm(n_tokens, interval)
+
+    if mode == "per token":
+        source= coalesce(tokens, max_delay_ms= 0)
+
+    else:
+        source= coalesce(tokens, max_delay_ms= coalesce_ms, max_chars= max_chars)
+
+    frames= 0
+
+    async for content in source:
+        # one write per frame -> one send (and syscall) on a real socket
+        sink.append(content_frame(content).encode())
+        frames+= 1
+
+    sink.append(END_FRAME.encode())
+
+    return frames + 1
+
+
+async def run(mode: str, args):
+
+    sink= SocketSink()
+
+    cpu_started_at= time.process_time()
+    wall_started_at= time.perf_counter()
+
+    frames= await asyncio.gather(*[
+        stream(mode, args.tokens, args.token_interval_ms / 1000, args.coalesce_ms, args.max_chars, sink)
+        for _ in range(args.streams)
+    ])
+
+    wall= time.perf_counter() - wall_started_at
+    cpu= time.process_time() - cpu_started_at
+
+    total_frames= sum(frames)
+    sink.close()
+
+    print(
+        f"{mode:<12} frames/stream {total_frames / args.streams:7.1f}  "
+        f"frames/sec {total_frames / wall:9.0f}  "
+        f"bytes/stream {sink.bytes / args.streams:8.0f}  "
+        f"cpu/stream {cpu / args.streams * 1000:7.2f} ms  "
+        f"wall {wall:5.2f}s"
+    )
+
+
+
+if __name__ == "__main__":
+
+    parser= argparse.ArgumentParser(description= "Compare per token and coalesced SSE framing")
+    parser.add_argument("--streams", type= int, default= 100, help= "concurrent streams")
+    parser.add_argument("--tokens", type= int, default= 300, help= "tokens per stream")
+    parser.add_argument("--token-interval-ms", type= float, default= 2.0, help= "mean delay between tokens")
+    parser.add_argument("--coalesce-ms", type= float, default= 30.0, help= "coalescing time budget")
+    parser.add_argument("--max-chars", type= int, default= 512, help= "coalescing size threshold")
+    args= parser.parse_args()
+
+    print(f"{args.streams} streams x {args.tokens} tokens, a token every ~{args.token_interval_ms} ms\n")
+
+    for mode in ("per token", "coalesced"):
+        asyncio.run(run(mode, args))
@@ -0,0 +1,112 @@
+# STREAMLIT RENDER BENCHMARK: client side render cost against response length
+#
+# run from the repo root:
+#   python -m benchmarks.bench_streamlit_render
+#   python -m benchmarks.bench_streamlit_render --lengths 4000 64000 --tokens-per-sec 300
+#
+# Replays a fake answer (prose, code fences, \frac expressions) chunk by chunk through the old
+# loop (re-sanitize + redraw everything on every chunk) and through IncrementalRenderer. The
+# placeholder only encodes the markdown it is given (what streamlit serializes per redraw)
+# and the clock advances by one chunk interval per chunk, so no real time is slept.
+
+# IMPORT PACKAGES
+import argparse
+import time
+
+from frontend.incremental_renderer import IncrementalRenderer, RENDER_FPS, sanitize
+
+
+SAMPLE= (
+    "Here is the solution, the ratio is (\\frac{a}{b}) for every step.\\n\\n"
+    "```python\\nimport numpy as np\\n\\ndef solve(x):\\n    return np.sqrt(x) * 2\\n```\\n\\n"
+    "That's it, let me know if you'd like the derivation (step by step).\\n"
+)
+
+
+class FakePlaceholder:
+
+    def __init__(self):
+        self.bytes= 0
+
+
+    def markdown(self, text, unsafe_allow_html= False):
+        self.bytes+= len(text.encode())
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now= 0.0
+
+
+    def __call__(self):
+        return self.now
+
+
+
+def chunks_of(length: int, chunk_chars: int):
+
+    text= (SAMPLE * (length // len(SAMPLE) + 1))[:length]
+
+    return [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+
+
+# the loop streamlit_frontend.py ran before
+def render_full(chunks, placeholder):
+
+    full_response= ""
+
+    for chunk in chunks:
+        full_response+= chunk
+        placeholder.markdown(sanitize(full_response), unsafe_allow_html= False)
+
+    return sanitize(full_response)
+
+
+def render_incremental(chunks, placeholder, fps: float, chunk_interval: float):
+
+    clock= FakeClock()
+    renderer= IncrementalRenderer(placeholder, fps= fps, clock= clock)
+
+    for chunk in chunks:
+        clock.now+= chunk_interval
+        renderer.feed(chunk)
+
+    return renderer.finish(), renderer.redraws
+
+
+
+if __name__ == "__main__":
+
+    parser= argparse.ArgumentParser(description= "Render time of a streamed answer against its length")
+    parser.add_argument("--lengths", type= int, nargs= "+", default= [2000, 8000, 32000, 64000], help= "answer lengths (chars)")
+    parser.add_argument("--chunk-chars", type= int, default= 4, help= "characters per streamed chunk (~ one token)")
+    parser.add_argument("--tokens-per-sec", type= float, default= 200.0, help= "chunk arrival rate")
+    parser.add_argument("--fps", type= float, default= RENDER_FPS, help= "redraw cap of the incremental renderer")
+    args= parser.parse_args()
+
+    chunk_interval= 1 / args.tokens_per_sec
+
+    print(f"{'chars':>8} {'chunks':>7} | {'full ms':>9} {'redraws':>8} {'MB drawn':>9} | {'incr ms':>9} {'redraws':>8} {'MB drawn':>9}")
+
+    for length in args.lengths:
+
+        chunks= chunks_of(length, args.chunk_chars)
+
+        full_placeholder= FakePlaceholder()
+        started_at= time.perf_counter()
+        full_text= render_full(chunks, full_placeholder)
+        full_elapsed= time.perf_counter() - started_at
+
+        incremental_placeholder= FakePlaceholder()
+        started_at= time.perf_counter()
+        incremental_text, incremental_redraws= render_incremental(chunks, incremental_placeholder, args.fps, chunk_interval)
+        incremental_elapsed= time.perf_counter() - started_at
+
+        assert incremental_text == full_text
+
+        print(
+            f"{length:>8} {len(chunks):>7} | "
+            f"{full_elapsed * 1000:>9.1f} {len(chunks):>8} {full_placeholder.bytes / 1e6:>9.1f} | "
+            f"{incremental_elapsed * 1000:>9.1f} {incremental_redraws:>8} {incremental_placeholder.bytes / 1e6:>9.1f}"
+        )
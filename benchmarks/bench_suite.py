@@ -0,0 +1,301 @@
+# OFFLINE BENCHMARK SUITE: the whole app under N concurrent synthetic users, no network
+#
+# run from the repo root:
+#   python -m benchmarks.bench_suite
+#   python -m benchmarks.bench_suite --users 64 --turns 3 --latency 0.3 --tokens-per-sec 80
+#   python -m benchmarks.bench_suite --targets graph --routes researcher tools
+#
+# The groq client (plain and tool bound) is swapped for the fake llm of benchmarks/fakes.py,
+# every tool of the arsenal for a fake one sleeping `tool-latency` seconds, and supabase for
+# its in process sqlite stand-in (in memory). Each route is driven by `users` synthetic users
+# at once, each one holding a conversation of `turns` requests (the markers of the fakes pick
+# the route, e.g. "route=enhancer>coder"), against two targets:
+#
+#   graph -> graph_builder() driven with astream_events, the per node latency comes from here
+#   api   -> /chat_stream of the fastapi app served by uvicorn on a local port, read like the
+#            streamlit frontend does, which also writes both turns to the database
+#
+# ttft is the time to the first visible character (route tags stripped like the frontend
+# does), "rss growth" is the resident memory gained by the process over the route's batch.
+
+# IMPORT PACKAGES
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import nullcontext
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+# in memory sqlite stand-in, no warmup of the real tool clients
+os.environ["DATABASE_BACKEND"]= "local"
+os.environ["LOCAL_DATABASE_PATH"]= ":memory:"
+os.environ["WARMUP_ON_STARTUP"]= "false"
+
+import httpx
+import psutil
+import uvicorn
+from langchain_core.messages import AIMessageChunk, HumanMessage
+
+import utils
+from backend.ai_agent import graph_builder
+from backend.fastapi_backend import app
+from backend.supabase_database import insert_chat, get_session_summaries
+from benchmarks.fakes import install_fake_llm, install_fake_tools
+from frontend.incremental_renderer import clean_text, route_tags
+
+
+# synthetic requests per route -> unique per target, user and turn, so no cache answers them
+ROUTES= {
+    "greeting": "route=greeting hey, nice to meet you ({user}.{turn})",
+    "maths_reasoner": "route=maths_reasoner solve x^2 - {user}x + {turn} = 0",
+    "coder": "route=coder write a function returning the {user}th prime (turn {turn})",
+    "researcher": "route=researcher what do studies say about effect {user}-{turn}?",
+    "enhancer": "route=enhancer>coder make {user} faster, turn {turn}",
+    "tools": "route=maths_reasoner tools=calculator+batch_calculator add up the first {user} squares (turn {turn})",
+}
+
+PROCESS= psutil.Process()
+
+
+def percentile(values, q: float) -> float:
+
+    values= sorted(values)
+
+    return values[min(len(values) - 1, int(len(values) * q))] if values else float("nan")
+
+
+# text the frontend shows: route tags removed, a partial one at the end held back
+def visible(text: str) -> str:
+
+    text= clean_text(text)
+
+    for tag in route_tags:
+        for size in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:size]):
+                text= text[:-size]
+                break
+
+    return text.strip()
+
+
+def rss_mb() -> float:
+
+    gc.collect()
+
+    return PROCESS.memory_info().rss / 2 ** 20
+
+
+
+# GRAPH TARGET
+async def graph_turn(agent_app, message: str, thread_id: str, node_latencies: dict) -> dict:
+
+    config= {"configurable": {"thread_id": thread_id}}
+    started_at= time.perf_counter()
+    ttft= None
+
+    # run id -> (node, started at)
+    running= {}
+
+    events= agent_app.astream_events({"messages": [HumanMessage(content= message)], "used_tools": False}, version= "v2", config= config)
+
+    async for event in events:
+
+        node= event.get("metadata", {}).get("langgraph_node")
+
+        # a node's own run is the chain named after it
+        if event["name"] == node and event["event"] == "on_chain_start":
+            running[event["run_id"]]= (node, time.perf_counter())
+
+        elif event["name"] == node and event["event"] == "on_chain_end" and event["run_id"] in running:
+            node, node_started_at= running.pop(event["run_id"])
+            node_latencies[node].append(time.perf_counter() - node_started_at)
+
+        # the supervisor's tokens are its route tag, stripped by the frontend
+        elif ttft is None and event["event"] == "on_chat_model_stream" and node != utils.SUPERVISOR:
+            chunk= event["data"]["chunk"]
+
+            if isinstance(chunk, AIMessageChunk) and clean_text(chunk.content).strip():
+                ttft= time.perf_counter() - started_at
+
+    return {"e2e": time.perf_counter() - started_at, "ttft": ttft}
+
+
+
+# API TARGET
+class Server:
+    """
+    The fastapi app served by uvicorn on a free local port, on its own thread and event loop.
+    """
+
+    def __init__(self):
+
+        self.server= uvicorn.Server(uvicorn.Config(app, host= "127.0.0.1", port= 0, log_level= "warning"))
+        self.thread= threading.Thread(target= self.server.run, name= "bench-server", daemon= True)
+
+
+    def __enter__(self) -> str:
+
+        self.thread.start()
+
+        while not self.server.started:
+            time.sleep(0.01)
+
+        port= self.server.servers[0].sockets[0].getsockname()[1]
+
+        return f"http://127.0.0.1:{port}"
+
+
+    def __exit__(self, *exc):
+
+        self.server.should_exit= True
+        self.thread.join()
+
+
+
+async def api_turn(client: httpx.AsyncClient, user_id: str, message: str, thread_id: str, db_latencies: list) -> dict:
+
+    # the frontend writes the user turn before streaming the answer
+    db_started_at= time.perf_counter()
+    await asyncio.to_thread(insert_chat, user_id, thread_id, "user", message)
+    db_latencies.append(time.perf_counter() - db_started_at)
+
+    started_at= time.perf_counter()
+    ttft= None
+    text= ""
+
+    async with client.stream("GET", f"/chat_stream/{message}", params= {"thread_id": thread_id}) as response:
+
+        async for line in response.aiter_lines():
+
+            if not line.startswith("data:") or '"type": "content"' not in line:
+                continue
+
+            text+= json.loads(line[5:])["content"]
+
+            if ttft is None and visible(text):
+                ttft= time.perf_counter() - started_at
+
+    e2e= time.perf_counter() - started_at
+
+    db_started_at= time.perf_counter()
+    await asyncio.to_thread(insert_chat, user_id, thread_id, "assistant", clean_text(text))
+    db_latencies.append(time.perf_counter() - db_started_at)
+
+    return {"e2e": e2e, "ttft": ttft}
+
+
+
+# ONE ROUTE, ONE TARGET
+async def run_route(target: str, route: str, args, base_url: str, node_latencies: dict) -> dict:
+
+    template= ROUTES[route]
+    agent_app= graph_builder() if target == "graph" else None
+    db_latencies= []
+
+    async def user(index: int, client: httpx.AsyncClient) -> list:
+
+        user_id= f"bench-{target}-{route}-{index}"
+        thread_id= str(uuid.uuid4())
+        turns= []
+
+        # the sidebar is loaded once per session
+        if client is not None:
+            db_started_at= time.perf_counter()
+            await asyncio.to_thread(get_session_summaries, user_id)
+            db_latencies.append(time.perf_counter() - db_started_at)
+
+        for turn in range(args.turns):
+            message= f"{template.format(user= index, turn= turn)} [{target}]"
+
+            if client is None:
+                turns.append(await graph_turn(agent_app, message, thread_id, node_latencies))
+
+            else:
+                turns.append(await api_turn(client, user_id, message, thread_id, db_latencies))
+
+        return turns
+
+    rss_before= rss_mb()
+    started_at= time.perf_counter()
+
+    if target == "graph":
+        results= await asyncio.gather(*(user(index, None) for index in range(args.users)))
+
+    else:
+        async with httpx.AsyncClient(base_url= base_url, timeout= None, limits= httpx.Limits(max_connections= None)) as client:
+            results= await asyncio.gather(*(user(index, client) for index in range(args.users)))
+
+    elapsed= time.perf_counter() - started_at
+    turns= [turn for result in results for turn in result]
+
+    e2e= [turn["e2e"] for turn in turns]
+    ttft= [turn["ttft"] for turn in turns if turn["ttft"] is not None]
+
+    return {
+        "requests": len(turns),
+        "throughput": len(turns) / elapsed,
+        "e2e_p50": statistics.median(e2e),
+        "e2e_p99": percentile(e2e, 0.99),
+        "ttft_p50": statistics.median(ttft) if ttft else float("nan"),
+        "ttft_p99": percentile(ttft, 0.99),
+        "db_p50": statistics.median(db_latencies) if db_latencies else None,
+        "rss_growth": rss_mb() - rss_before,
+    }
+
+
+
+if __name__ == "__main__":
+
+    parser= argparse.ArgumentParser(description= "Latency, time to first token and memory growth of the whole app per route, offline")
+    parser.add_argument("--users", type= int, default= 16, help= "synthetic users at once per route")
+    parser.add_argument("--turns", type= int, default= 2, help= "requests per user (one conversation)")
+    parser.add_argument("--routes", nargs= "+", default= list(ROUTES), choices= list(ROUTES))
+    parser.add_argument("--targets", nargs= "+", default= ["graph", "api"], choices= ["graph", "api"])
+    parser.add_argument("--latency", type= float, default= 0.2, help= "fake llm latency before the first token (seconds)")
+    parser.add_argument("--tokens-per-sec", type= float, default= 200, help= "fake llm token rate, 0 -> all at once")
+    parser.add_argument("--reply-chars", type= int, default= 400, help= "length of the fake llm answers")
+    parser.add_argument("--tool-latency", type= float, default= 0.3, help= "fake tool latency (seconds)")
+    args= parser.parse_args()
+
+    reply= ("The answer follows from the definitions, step by step. " * (args.reply_chars // 40 + 1))[:args.reply_chars]
+
+    install_fake_llm(latency= args.latency, token_delay= 1 / args.tokens_per_sec if args.tokens_per_sec > 0 else 0.0, reply= reply)
+    install_fake_tools({tool.name: args.tool_latency for tool in utils.tools_arsenal})
+
+    # node -> latencies (graph target only)
+    node_latencies= defaultdict(list)
+
+    print(f"{args.users} users x {args.turns} turns per route, llm {args.latency * 1000:.0f} ms + {args.tokens_per_sec:.0f} tok/s, tools {args.tool_latency * 1000:.0f} ms\n")
+    print(f"{'target':>6} {'route':>14} | {'req':>5} {'req/s':>7} | {'e2e p50 ms':>10} {'p99 ms':>8} | {'ttft p50 ms':>11} {'p99 ms':>8} | {'db p50 ms':>9} | {'rss growth MB':>13}")
+
+    for target in args.targets:
+
+        with (Server() if target == "api" else nullcontext()) as base_url:
+
+            for route in args.routes:
+
+                result= asyncio.run(run_route(target, route, args, base_url, node_latencies))
+                db= f"{result['db_p50'] * 1000:.1f}" if result["db_p50"] is not None else "-"
+
+                print(
+                    f"{target:>6} {route:>14} | "
+                    f"{result['requests']:>5} {result['throughput']:>7.1f} | "
+                    f"{result['e2e_p50'] * 1000:>10.0f} {result['e2e_p99'] * 1000:>8.0f} | "
+                    f"{result['ttft_p50'] * 1000:>11.0f} {result['ttft_p99'] * 1000:>8.0f} | "
+                    f"{db:>9} | {result['rss_growth']:>13.1f}"
+                )
+
+    if node_latencies:
+
+        print(f"\n{'node':>20} | {'calls':>6} {'p50 ms':>8} {'p99 ms':>8}")
+
+        for node, latencies in sorted(node_latencies.items(), key= lambda item: -statistics.median(item[1])):
+            print(f"{node:>20} | {len(latencies):>6} {statistics.median(latencies) * 1000:>8.0f} {percentile(latencies, 0.99) * 1000:>8.0f}")
@@ -0,0 +1,213 @@
+# OFFLINE FAKES for the benchmarks: an llm with a configurable latency and no network
+#
+# install it in place of the groq client with `install_fake_llm(...)`, every chain of the
+# registry (plain and tool bound) is then rebuilt on top of it.
+
+# IMPORT PACKAGES
+import asyncio
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+SUPERVISOR_MARKER= "You are a supervisor agent"
+
+# the tool loop researcher's prompt (not the fan out synthesis one)
+RESEARCHER_MARKER= "act as a high-precision information retriever"
+
+# markers a synthetic request can carry:
+#   "route=enhancer>coder"  -> the supervisor picks enhancer first, then coder once an ai msg is in the window
+#   "tools=web_search_tool+calculator" -> the specialist asks for those tools in its first round
+#   "echo=history" -> the answer ends with "[history: n]", n earlier user turns in the prompt
+ROUTE_MARKER= re.compile(r"route=([\w>]+)")
+TOOLS_MARKER= re.compile(r"tools=([\w+]+)")
+HISTORY_MARKER= "echo=history"
+
+# canned search results of the fake tools
+RESEARCH_FACTS= (
+    "The effect was first measured in a 2021 cohort study of 4,000 adults.",
+    "A 2022 meta analysis found the effect size to be moderate across eleven trials.",
+    "Researchers at several universities replicated the moderate effect in 2023.",
+    "Critics argue the early studies overstated the effect because of small samples.",
+    "Ongoing trials are expected to report long term outcomes in 2026.",
+    "The mechanism behind the effect is still debated in the literature.",
+)
+
+
+class FakeLatencyChatModel(BaseChatModel):
+    """
+    Chat model that waits `latency` seconds before its first token and `token_delay` seconds
+    between tokens (time.sleep on the sync path, asyncio.sleep on the async one).
+
+    Supervisor prompts get `{"route": "<route>"}` (or the one a ROUTE_MARKER in the request
+    names), every other prompt gets `reply`. With `research_tools` set, the tool loop
+    researcher first asks for those tools (one round), a TOOLS_MARKER does the same for any
+    specialist.
+    """
+
+    route: str= "maths_reasoner"
+    research_tools: List[str]= []
+    reply: str= "The answer is 42, computed step by step."
+    latency: float= 0.2
+    token_delay: float= 0.0
+    calls: int= 0
+    prompt_chars: int= 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency"
+
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+    def _answer(self, messages: List[BaseMessage]) -> AIMessage:
+
+        prompt= " ".join(str(message.content) for message in messages)
+
+        self.calls+= 1
+        self.prompt_chars+= len(prompt)
+
+        if SUPERVISOR_MARKER in prompt:
+            route= self.route
+            marker= ROUTE_MARKER.search(prompt)
+
+            # the formatted prompt holds the reprs of the state msgs -> count the ai answers so far
+            if marker:
+                routes= marker.group(1).split(">")
+                route= routes[min(prompt.count("AIMessage("), len(routes) - 1)]
+
+            return AIMessage(content= f'{{"route": "{route}"}}')
+
+        # no ToolMessage in the window yet -> first round
+        if "ToolMessage(" not in prompt:
+            marker= TOOLS_MARKER.search(prompt)
+            tools= marker.group(1).split("+") if marker else self.research_tools if RESEARCHER_MARKER in prompt else []
+
+            # one query per call -> the tool cache can not answer the next request's round
+            if tools:
+                return AIMessage(content= "", tool_calls= [
+                    {"name": name, "args": {"query": f"research {self.calls}"}, "id": f"call-{index}"}
+                    for index, name in enumerate(tools)
+                ])
+
+        if HISTORY_MARKER in prompt:
+            return AIMessage(content= f"{self.reply} [history: {prompt.count('HumanMessage(') - 1}]")
+
+        return AIMessage(content= self.reply)
+
+
+    def _tokens(self, text: str) -> List[str]:
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]]= None, run_manager= None, **kwargs: Any) -> ChatResult:
+
+        time.sleep(self.latency + self.token_delay * len(self._tokens(self.reply)))
+
+        return ChatResult(generations= [ChatGeneration(message= self._answer(messages))])
+
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]]= None, run_manager= None, **kwargs: Any) -> ChatResult:
+
+        await asyncio.sleep(self.latency + self.token_delay * len(self._tokens(self.reply)))
+
+        return ChatResult(generations= [ChatGeneration(message= self._answer(messages))])
+
+
+    def _chunks(self, message: AIMessage) -> List[AIMessageChunk]:
+
+        if message.tool_calls:
+            return [AIMessageChunk(content= "", tool_call_chunks= [
+                {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": index}
+                for index, tc in enumerate(message.tool_calls)
+            ])]
+
+        return [AIMessageChunk(content= token) for token in self._tokens(message.content)]
+
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]]= None, run_manager= None, **kwargs: Any):
+
+        time.sleep(self.latency)
+
+        for message_chunk in self._chunks(self._answer(messages)):
+            time.sleep(self.token_delay)
+
+            chunk= ChatGenerationChunk(message= message_chunk)
+
+            if run_manager:
+                run_manager.on_llm_new_token(message_chunk.content, chunk= chunk)
+
+            yield chunk
+
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]]= None, run_manager= None, **kwargs: Any):
+
+        await asyncio.sleep(self.latency)
+
+        for message_chunk in self._chunks(self._answer(messages)):
+            await asyncio.sleep(self.token_delay)
+
+            chunk= ChatGenerationChunk(message= message_chunk)
+
+            if run_manager:
+                await run_manager.on_llm_new_token(message_chunk.content, chunk= chunk)
+
+            yield chunk
+
+
+
+def install_fake_llm(**kwargs) -> FakeLatencyChatModel:
+    """
+    Swap the lazy llm clients of utils for one FakeLatencyChatModel and rebuild the chains.
+    """
+
+    import utils
+
+    fake= FakeLatencyChatModel(**kwargs)
+
+    utils.llm.set(fake)
+    utils.binded_llm.set(fake)
+    utils.chain_registry.reset()
+
+    return fake
+
+
+
+def _fake_tool(name: str, latency: float, text: str):
+
+    from langchain_core.tools import StructuredTool
+
+    def run(query: str) -> str:
+        time.sleep(latency)
+        return text
+
+    async def arun(query: str) -> str:
+        await asyncio.sleep(latency)
+        return text
+
+    return StructuredTool.from_function(func= run, coroutine= arun, name= name, description= f"fake {name}")
+
+
+def install_fake_tools(latencies: Dict[str, float], result: str= "") -> Dict[str, float]:
+    """
+    Swap the named tools of utils for ones that sleep `latencies[name]` seconds and return
+    canned facts, a different slice per tool (sync and async). The originals are not restored.
+    """
+
+    import utils
+
+    for index, (name, latency) in enumerate(latencies.items()):
+
+        # a different slice of the facts per source -> the fan out has something to merge
+        text= result or " ".join(RESEARCH_FACTS[(index + offset) % len(RESEARCH_FACTS)] for offset in range(3))
+
+        utils.tools_arsenal_lookup[name]= _fake_tool(name, latency, text)
+
+    return latencies
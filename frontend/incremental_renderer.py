@@ -0,0 +1,175 @@
+# IMPORT PACKAGES
+import os
+import re
+import json
+import time
+from typing import Callable, Optional
+
+
+
+# RENDER CONSTANTS
+
+# max redraws per second of a streaming answer (the final text is always drawn)
+RENDER_FPS= float(os.getenv("RENDER_FPS", "12"))
+
+# held back tails longer than this are released anyway (an "(" that is never closed)
+RENDER_MAX_HOLD_CHARS= int(os.getenv("RENDER_MAX_HOLD_CHARS", "2000"))
+
+
+
+# UTILITIES
+
+# List of route tags to clean
+route_tags = [json.dumps({"route": "greeting"}),
+
+              json.dumps({"route": "enhancer"}),
+
+              json.dumps({"route": "coder"}),
+
+              json.dumps({"route": "maths_reasoner"}),
+
+              json.dumps({"route": "researcher"})
+]
+
+LATEX_FRACTION_PATTERN= re.compile(r'\(([^)]*?\\frac[^)]*?)\)')
+
+# remove all the route tags from the ai response
+def clean_text(text):
+    for tag in route_tags:
+        text = text.replace(tag, "")
+
+    return text
+
+# format the text for LaTeX rendering in markdown
+def format_latex_markdown(text: str) -> str:
+    # Replace [some latex] → $some latex$
+    text = LATEX_FRACTION_PATTERN.sub(r'$\1$', text)
+    return text.replace("\\n", "\n")
+
+
+def sanitize(text: str) -> str:
+    return format_latex_markdown(clean_text(text))
+
+
+
+# INCREMENTAL SANITIZER
+class IncrementalSanitizer:
+    """
+    `sanitize` applied to a growing text, touching only the new tail.
+
+    The raw tail that a later chunk could still change is held back: a partial route tag, an
+    "(" with no ")" after it yet (it may become a \\frac match) and a trailing backslash (it may
+    become a "\\n"). Everything before it is sanitized once and never looked at again. Text that
+    only forms a tag or a "\\n" once a tag is removed is left to the final full pass.
+    """
+
+    def __init__(self, max_hold_chars: int= RENDER_MAX_HOLD_CHARS):
+
+        self.max_hold_chars= max_hold_chars
+
+        self._parts= []
+        self._pending= ""
+
+
+    def _safe_cut(self, text: str) -> int:
+
+        cut= len(text)
+
+        # partial route tag at the end
+        for tag in route_tags:
+            for size in range(min(len(tag) - 1, len(text)), 0, -1):
+                if text.endswith(tag[:size]):
+                    cut= min(cut, len(text) - size)
+                    break
+
+        # unclosed "(" -> the regex would start its match at the first one after the last ")"
+        open_at= text.find("(", text.rfind(")") + 1)
+
+        if open_at != -1:
+            cut= min(cut, open_at)
+
+        # "\" + "n" split across chunks
+        if text.endswith("\\"):
+            cut= min(cut, len(text) - 1)
+
+        return cut
+
+
+    def feed(self, chunk: str):
+
+        text= self._pending + chunk
+
+        cut= self._safe_cut(text)
+
+        if len(text) - cut > self.max_hold_chars:
+            cut= len(text)
+
+        if cut:
+            self._parts.append(sanitize(text[:cut]))
+
+        self._pending= text[cut:]
+
+
+    @property
+    def text(self) -> str:
+        """
+        Committed text plus the sanitized held back tail (a preview, it may still change).
+        """
+
+        if len(self._parts) > 1:
+            self._parts= ["".join(self._parts)]
+
+        return (self._parts[0] if self._parts else "") + sanitize(self._pending)
+
+
+
+# INCREMENTAL RENDERER
+class IncrementalRenderer:
+    """
+    Streams an ai answer into a streamlit placeholder.
+
+    Chunks are sanitized incrementally and the placeholder is redrawn at most `fps` times per
+    second instead of once per chunk. `finish` sanitizes the full raw text once (the exact
+    result the non incremental path produced), draws it and returns it.
+    """
+
+    def __init__(self, placeholder, fps: float= RENDER_FPS, clock: Callable[[], float]= time.monotonic):
+
+        self.placeholder= placeholder
+        self.min_interval= 1 / fps if fps > 0 else 0.0
+        self.clock= clock
+
+        self.raw_parts= []
+        self.sanitizer= IncrementalSanitizer()
+
+        self.redraws= 0
+        self._last_draw: Optional[float]= None
+
+
+    def _draw(self, text: str):
+
+        self.placeholder.markdown(text, unsafe_allow_html=False)
+
+        self.redraws+= 1
+        self._last_draw= self.clock()
+
+
+    def feed(self, chunk: str):
+
+        if not chunk:
+            return
+
+        self.raw_parts.append(chunk)
+        self.sanitizer.feed(chunk)
+
+        if self._last_draw is None or self.clock() - self._last_draw >= self.min_interval:
+            self._draw(self.sanitizer.text)
+
+
+    def finish(self) -> str:
+
+        final_text= sanitize("".join(self.raw_parts))
+
+        self._draw(final_text)
+
+        return final_text
@@ -1,42 +1,19 @@
 import streamlit as st
 import requests
 import json
-import re
 
 # import sys, os
 # sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from backend.supabase_database import insert_chat, get_chat_history, get_session_summaries, sign_up_authentication, sign_in_authentication
+from frontend.incremental_renderer import IncrementalRenderer
+from backend.read_cache import read_cache
+from backend.supabase_database import insert_chat, get_chat_history_page, get_session_summaries, sign_up_authentication, sign_in_authentication, invalidate_reads, SESSION_PAGE_SIZE
 
 import uuid
+import logging
 
 
-# UTILITIES
-
-# List of route tags to clean
-route_tags = [json.dumps({"route": "greeting"}), 
-              
-              json.dumps({"route": "enhancer"}),
-              
-              json.dumps({"route": "coder"}),
-              
-              json.dumps({"route": "maths_reasoner"}),
-              
-              json.dumps({"route": "researcher"})            
-]
-
-# remove all the route tags from the ai response
-def clean_text(text):
-    for tag in route_tags:
-        text = text.replace(tag, "")
-        
-    return text 
-
-# format the text for LaTeX rendering in markdown
-def format_latex_markdown(text: str) -> str:
-    # Replace [some latex] → $some latex$
-    text = re.sub(r'\(([^)]*?\\frac[^)]*?)\)', r'$\1$', text)
-    return text.replace("\\n", "\n")
+logger= logging.getLogger(__name__)
 
 
 # INITIALISE THE ST SESSIONS
@@ -46,9 +23,16 @@ if "session_id" not in st.session_state:
 if "chat_history" not in st.session_state:
     st.session_state["chat_history"] = []
     
+# id before which older messages of the open chat can still be loaded (None -> all loaded)
+if "history_cursor" not in st.session_state:
+    st.session_state["history_cursor"]= None
+    
 if "all_session_summaries" not in st.session_state:
     st.session_state["all_session_summaries"]= []
     
+if "sessions_shown" not in st.session_state:
+    st.session_state["sessions_shown"]= SESSION_PAGE_SIZE
+    
 if "user_id" not in st.session_state:
     st.session_state["user_id"]= None
     
@@ -56,6 +40,13 @@ if "is_signing_in" not in st.session_state:
     
     st.session_state["is_signing_in"]= True
     
+# DB READS OF THE PREVIOUS RERUN -> how many remote queries the read cache saved
+if "rerun_reads" in st.session_state:
+    previous_reads= st.session_state["rerun_reads"]
+    logger.info("db reads last rerun: %d served from cache (remote queries saved), %d remote", previous_reads["cached"], previous_reads["remote"])
+    
+st.session_state["rerun_reads"]= read_cache.track()
+    
 # ATUHENTICATION FUNCTIONS
 def change_auth_mode():
     st.session_state["is_signing_in"]= not st.session_state["is_signing_in"] 
@@ -108,19 +99,42 @@ def select_pre_existing_session(session_id):
     
     st.session_state["session_id"]= session_id
     
-    st.session_state["chat_history"]= get_chat_history(user_id= st.session_state["user_id"], session_id= session_id)
+    # only the newest page, older ones are loaded on demand
+    st.session_state["chat_history"], st.session_state["history_cursor"]= get_chat_history_page(user_id= st.session_state["user_id"], session_id= session_id)
     # st.session_state["is_new_session"]= False
     
     
+# LOAD THE PAGE OF MESSAGES BEFORE THE OLDEST ONE SHOWN
+def load_older_messages():
+    
+    older_messages, st.session_state["history_cursor"]= get_chat_history_page(
+        user_id= st.session_state["user_id"],
+        session_id= st.session_state["session_id"],
+        before_id= st.session_state["history_cursor"]
+    )
+    
+    st.session_state["chat_history"]= older_messages + st.session_state["chat_history"]
+    
+    
 # CREATE NEW SESSION
 def create_new_chat():
     st.session_state["chat_history"]= []
+    st.session_state["history_cursor"]= None
+    
+    # a new session -> the cached session list is stale
+    invalidate_reads(user_id= st.session_state["user_id"])
     st.session_state["session_id"]= str(uuid.uuid4())
-    st.session_state["all_session_summaries"]= get_session_summaries(user_id= st.session_state["user_id"])
+    
+    
+# SHOW ONE MORE PAGE OF SESSIONS IN THE SIDEBAR
+def show_more_sessions():
+    st.session_state["sessions_shown"]+= SESSION_PAGE_SIZE
     
     
 # LOGOUT USER
 def logout_user():
+    invalidate_reads(user_id= st.session_state["user_id"])
+    
     st.session_state["user_id"]= None
 
 
@@ -187,7 +201,8 @@ if st.session_state["user_id"]:
         # show all chats
         st.html("<h3>All chats</h3>")
         
-        st.session_state["all_session_summaries"]= get_session_summaries(user_id= st.session_state["user_id"])
+        # newest first, only the pages shown so far
+        st.session_state["all_session_summaries"]= get_session_summaries(user_id= st.session_state["user_id"], limit= st.session_state["sessions_shown"])
         
         
         if len(st.session_state["all_session_summaries"]) == 0:
@@ -198,10 +213,19 @@ if st.session_state["user_id"]:
             for session in st.session_state["all_session_summaries"]:
                 st.button(label= session["first_query"][:20], key= session["id"], on_click= select_pre_existing_session, args= [session["session_id"]])
                 
+            # a full page -> there may be older sessions
+            if len(st.session_state["all_session_summaries"]) == st.session_state["sessions_shown"]:
+                st.button(label= "Show more", key= "show_more_sessions", on_click= show_more_sessions)
+                
                 
     
 # SHOW THE CHAT HISTORY
 if st.session_state["user_id"]:
+    
+    # older messages exist in the db -> only loaded when asked for
+    if st.session_state["history_cursor"] is not None:
+        st.button(label= "Load older messages", key= "load_older_messages", on_click= load_older_messages)
+    
     for msg in st.session_state["chat_history"]:
         with st.chat_message(msg["role"]):
             if msg["role"] == "ai":
@@ -243,30 +267,28 @@ if st.session_state["user_id"]:
             # Placeholder to allow dynamic updates
             msg_placeholder = ai_msg_ui.empty()
         
-            full_response = ""
+            # sanitizes only the new tail of every chunk and redraws at a capped frame rate
+            renderer= IncrementalRenderer(msg_placeholder)
             
             thread_id= st.session_state["session_id"]
             
             for chunk in stream_chat_response(prompt):
-                full_response += chunk
-                clean_response = clean_text(full_response)
-
-                # Properly render markdown (headings, bullets, code, LaTeX math)
-                msg_placeholder.markdown(format_latex_markdown(clean_response), unsafe_allow_html=False)
+                renderer.feed(chunk)
+            
+            # Properly render markdown (headings, bullets, code, LaTeX math) -> one full pass over the final text
+            ai_response= renderer.finish()
             
             # update the session state with the AI response
-            st.session_state["chat_history"].append({"role": "ai", "content": format_latex_markdown(clean_text(full_response))})
+            st.session_state["chat_history"].append({"role": "ai", "content": ai_response})
             
             # append to the supabse db
             insert_chat(
                 session_id= st.session_state["session_id"],
                 user_id= st.session_state["user_id"],
                 role= "ai",
-                content= format_latex_markdown(clean_text(full_response))
+                content= ai_response
             )
             
             # rerun -> update the sidebar
-            st.session_state["all_session_summaries"]= get_session_summaries(user_id= st.session_state["user_id"])
-            
             st.rerun()
             
@@ -1,30 +1,36 @@
 # IMPORT PACKAGES
 from pydantic import BaseModel, Field
-from typing import Annotated, List
-from langchain_core.messages import BaseMessage
-from langchain_tavily import TavilySearch
+from typing import Annotated, Dict, List, Optional
+from langchain_core.messages import BaseMessage, HumanMessage
 from dotenv import load_dotenv
 from langchain_core.tools import tool
-from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
-import numexpr
-import math
-from langchain_experimental.utilities import PythonREPL
 from typing import Literal
 from langgraph.types import Command
-from langchain_community.tools import WikipediaQueryRun
 
-from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_community.utilities import WikipediaAPIWrapper
-from langchain_community.tools import DuckDuckGoSearchRun
 
 
-from typing import Literal
 from langgraph.graph import END
+from langgraph.graph.message import add_messages
 from langchain_core.output_parsers import PydanticOutputParser
 import re
 import json
+import atexit
+import asyncio
+import threading
+
+from backend.tool_executor import tool_executor
+from backend.tool_cache import cached_tool
+from backend.single_flight import supervisor_flight, asupervisor_flight, messages_key
+from backend.compaction import compact_messages, context_messages, COMPACTION_ENABLED
+from backend.fast_router import fast_router
+from backend.hedging import HedgedSearch, SearchProvider, HEDGED_SEARCH
+from backend.research import build_evidence, research_tool_calls
+from backend.response_cache import supervisor_cache, enhancer_cache
+from backend.chain_registry import ChainRegistry
+from backend.lazy_registry import lazy_registry
+from backend.metrics import registry as metrics_registry, llm_metrics
 
 load_dotenv()
 
@@ -32,23 +38,37 @@ load_dotenv()
 
 # AGENT STATE
 class AgentState(BaseModel):
-    messages: Annotated[List[BaseMessage], Field(default= [], description= "The messages in the state")]
+    # add_messages -> callers and nodes only send the new messages, the reducer appends them
+    messages: Annotated[List[BaseMessage], Field(default= [], description= "The messages in the state"), add_messages]
     
     tools_sender: Annotated[Literal["coder", "maths_reasoner", "researcher", None], Field(default= None, description= "Which node has used this tool latest")]
     
     used_tools: Annotated[bool, Field(default= None, description= "Whether the tools have been used in this state or not in the very last step")]
 
 
+# RESEARCH SUBGRAPH STATE -> the agent state plus the evidence handed from the fan out to the synthesis
+class ResearchState(AgentState):
+    evidence: Annotated[str, Field(default= "", description= "Deduped and ranked snippets of every research source")]
+
+
     
 # TOOLS 
 
+# every tool client below is imported and built on first use (or by the startup warmup)
+
 # TOOL1: TAVILY WEB SEARCH
-tavily_search = TavilySearch(
-    max_results=5,
-    topic="general"
-)
+def _build_tavily_search():
+    from langchain_tavily import TavilySearch
+    
+    return TavilySearch(
+        max_results=5,
+        topic="general"
+    )
+
+tavily_search= lazy_registry.register("tavily_search", _build_tavily_search)
 
 @tool
+@cached_tool("web_search_tool")
 def web_search_tool(query: str) -> str:
     """
     Perform a web search for the given query and return relevant information.
@@ -58,12 +78,60 @@ def web_search_tool(query: str) -> str:
     questions about recent events, uncommon topics, or external data.
     """
     
-    return tavily_search.invoke(query)
+    if HEDGED_SEARCH:
+        return hedged_web_search.run(query)
+    
+    return _tavily_results(query, tavily_search.get().invoke(query))
+
+# async counterpart (used by the async nodes) -> tavily's own async http client
+@cached_tool("web_search_tool")
+async def _aweb_search_tool(query: str) -> str:
+    
+    if HEDGED_SEARCH:
+        return await hedged_web_search.arun(query)
+    
+    return _tavily_results(query, await tavily_search.get().ainvoke(query))
+
+web_search_tool.coroutine= _aweb_search_tool
+
+
+# one output shape for every web search provider (the hedge may return either, the cache keeps
+# whichever won) -> a json string {"query", "results": [{title, url, content, score}]}
+def _search_results(query: str, results: List[Dict]) -> str:
 
+    return json.dumps({
+        "query": query,
+        "results": [
+            {
+                "title": str(result.get("title") or ""),
+                "url": str(result.get("url") or result.get("link") or ""),
+                "content": str(result.get("content") or result.get("snippet") or ""),
+                "score": float(result.get("score") or 0.0),
+            }
+            for result in results
+        ],
+    })
+
+def _tavily_results(query: str, output) -> str:
+
+    if isinstance(output, dict):
+        return _search_results(query, output.get("results") or [])
+
+    # error / plain text answers -> one result holding the text
+    return _search_results(query, [{"content": output}])
 
-# TOOL 2: PYTHON REPL
 
-python_repl = PythonREPL()
+# TOOL 2: PYTHON SANDBOX -> pool of pre-started worker processes, isolated from the api process
+
+def _build_python_sandbox():
+    from backend.code_sandbox import SandboxPool
+    
+    pool= SandboxPool()
+    atexit.register(pool.close)
+    
+    return pool
+
+python_sandbox= lazy_registry.register("python_sandbox", _build_python_sandbox)
 
 @tool
 def python_code_executor_tool(query: str) -> str:
@@ -75,13 +143,35 @@ def python_code_executor_tool(query: str) -> str:
     as input and returns either the result or any error messages encountered.
     """
         
-    return python_repl.run(query)
+    return python_sandbox.get().run(query)
+
+# async counterpart -> the pool blocks on the worker's pipe, so it is waited on in a thread
+async def _apython_code_executor_tool(query: str) -> str:
+    
+    cancel_event= threading.Event()
+    
+    try:
+        return await asyncio.to_thread(python_sandbox.get().run, query, cancel_event= cancel_event)
+    
+    except asyncio.CancelledError:
+        # the run was cancelled (e.g. the client disconnected) -> the worker is killed and replaced
+        cancel_event.set()
+        raise
+
+python_code_executor_tool.coroutine= _apython_code_executor_tool
 
 
 # TOOL 3: WIKIPEDIA
-wikipedia = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+def _build_wikipedia():
+    from langchain_community.tools import WikipediaQueryRun
+    from langchain_community.utilities import WikipediaAPIWrapper
+    
+    return WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+
+wikipedia= lazy_registry.register("wikipedia", _build_wikipedia)
 
 @tool
+@cached_tool("wikipedia_search_tool")
 def wikipedia_search_tool(query: str) -> str:
     """
     Searches Wikipedia for the given query and returns a summary of the most relevant information.
@@ -90,15 +180,28 @@ def wikipedia_search_tool(query: str) -> str:
     from a reliable encyclopedic source.
     """
         
-    return wikipedia.run(query)
+    return wikipedia.get().run(query)
+
+# async counterpart -> the wikipedia client has no async api, langchain runs it in a thread
+@cached_tool("wikipedia_search_tool")
+async def _awikipedia_search_tool(query: str) -> str:
+    return await wikipedia.get().arun(query)
+
+wikipedia_search_tool.coroutine= _awikipedia_search_tool
 
 
 
 # TOOL 4: DUCK DUCK GO SEARCH
 
-duck_search = DuckDuckGoSearchRun()
+def _build_duck_search():
+    from langchain_community.tools import DuckDuckGoSearchRun
+    
+    return DuckDuckGoSearchRun()
+
+duck_search= lazy_registry.register("duck_search", _build_duck_search)
 
 @tool
+@cached_tool("duck_duck_search_tool")
 def duck_duck_search_tool(query: str) -> str:
     """
     Performs a web search using DuckDuckGo and returns relevant results.
@@ -108,17 +211,42 @@ def duck_duck_search_tool(query: str) -> str:
     """
     
     
-    return duck_search.invoke(query)
+    return duck_search.get().invoke(query)
+
+# async counterpart -> the duckduckgo client has no async api, langchain runs it in a thread
+@cached_tool("duck_duck_search_tool")
+async def _aduck_duck_search_tool(query: str) -> str:
+    return await duck_search.get().ainvoke(query)
+
+duck_duck_search_tool.coroutine= _aduck_duck_search_tool
+
+
+# HEDGED WEB SEARCH (HEDGED_SEARCH=true) -> tavily first, duckduckgo raced in once tavily is slower than its p90
+async def _atavily_results(query: str) -> str:
+    return _tavily_results(query, await tavily_search.get().ainvoke(query))
+
+# duckduckgo's structured results (title, link, snippet) instead of the joined text of duck_duck_search_tool
+def _duck_results(query: str) -> str:
+    return _search_results(query, duck_search.get().api_wrapper.results(query, max_results= 5))
+
+hedged_web_search= HedgedSearch(
+    primary= SearchProvider("tavily", lambda query: _tavily_results(query, tavily_search.get().invoke(query)), _atavily_results),
+    secondary= SearchProvider("duckduckgo", lambda query: _duck_results(query), lambda query: asyncio.to_thread(_duck_results, query))
+)
 
 
 
 # TOOL 5: PUB MED
 
-from langchain_community.tools.pubmed.tool import PubmedQueryRun
+def _build_pubmed():
+    from langchain_community.tools.pubmed.tool import PubmedQueryRun
+    
+    return PubmedQueryRun()
 
-pubmed = PubmedQueryRun()
+pubmed= lazy_registry.register("pubmed", _build_pubmed)
 
 @tool
+@cached_tool("pubmed_search_tool")
 def pubmed_search_tool(query: str) -> str:
     """
     Searches PubMed for scholarly articles related to the given query and returns a summary of the results.
@@ -127,7 +255,14 @@ def pubmed_search_tool(query: str) -> str:
     reviews, and scientific publications from trusted academic sources.
     """
     
-    return pubmed.invoke(query)
+    return pubmed.get().invoke(query)
+
+# async counterpart -> the pubmed client has no async api, langchain runs it in a thread
+@cached_tool("pubmed_search_tool")
+async def _apubmed_search_tool(query: str) -> str:
+    return await pubmed.get().ainvoke(query)
+
+pubmed_search_tool.coroutine= _apubmed_search_tool
 
 
 # TOOL 6: CALCULATOR
@@ -160,18 +295,69 @@ def calculator(expression: str) -> str:
         If the expression is invalid or unsafe, an appropriate error message is returned.
     """
 
-    local_dict = {"pi": math.pi, "e": math.e}
+    from backend.expression_cache import expression_cache
+
+    # compiled once per normalized expression, shared by every thread (pi and e are built in)
     return str(
-        numexpr.evaluate(
-            expression.strip(),
-            global_dict={},  # restrict access to globals
-            local_dict=local_dict,  # add common mathematical functions
-        )
+        expression_cache.evaluate(expression)
     )
 
+# async counterpart -> microseconds of cpu, runs right on the event loop
+async def _acalculator(expression: str) -> str:
+    return calculator.func(expression)
+
+calculator.coroutine= _acalculator
+
+
+# TOOL 7: BATCH CALCULATOR
+
+@tool
+def batch_calculator(expressions: List[str], variables: Optional[Dict[str, List[float]]] = None) -> str:
+    """
+    Evaluate several mathematical expressions in a single call, vectorized with numexpr.
+
+    Use this instead of many `calculator` calls when a problem needs a series of related
+    computations, or the same formula over many values.
+
+    Parameters
+    ----------
+    expressions : List[str]
+        Single-line expressions in Pythonic syntax (same rules as `calculator`).
+        They may reference the names defined in `variables`, plus `pi` and `e`.
+
+    variables : Dict[str, List[float]], optional
+        Named values shared by all the expressions. A list makes the variable array valued
+        and the expressions are evaluated element-wise over it.
+
+        Examples:
+            expressions= ["37593 * 67", "sqrt(49) + 3*5"]
+            expressions= ["x**2 + 1", "sin(x) * r"], variables= {"x": [0, 0.5, 1], "r": [2]}
+
+    Returns
+    -------
+    str
+        A JSON object mapping every expression to its result (a number or a list of numbers).
+        An invalid expression maps to an error message, the others are still evaluated.
+    """
+
+    from backend.expression_cache import expression_cache, to_python
+
+    results= expression_cache.evaluate_batch(expressions, variables)
+
+    return json.dumps({
+        expression: to_python(result)
+        for expression, result in zip(expressions, results)
+    })
+
+# async counterpart -> vectorized numexpr, runs right on the event loop
+async def _abatch_calculator(expressions: List[str], variables: Optional[Dict[str, List[float]]] = None) -> str:
+    return batch_calculator.func(expressions, variables)
+
+batch_calculator.coroutine= _abatch_calculator
+
 
 # CREATE THE TOOLS ARSERNAL
-tools_arsenal= [web_search_tool, wikipedia_search_tool, duck_duck_search_tool, pubmed_search_tool, python_code_executor_tool, calculator]
+tools_arsenal= [web_search_tool, wikipedia_search_tool, duck_duck_search_tool, pubmed_search_tool, python_code_executor_tool, calculator, batch_calculator]
 
 tools_arsenal_lookup= {tool.name: tool for tool in tools_arsenal}
 
@@ -179,13 +365,30 @@ tools_arsenal_lookup= {tool.name: tool for tool in tools_arsenal}
 
 
 # LLM
-llm_model= ChatGroq(
-    model= "llama-3.3-70b-versatile"
-)
+def _build_llm_model():
+    from langchain_groq import ChatGroq
+    
+    return ChatGroq(
+        model= "llama-3.3-70b-versatile"
+    )
+
+llm= lazy_registry.register("llm_model", _build_llm_model)
 
 
 # bind llm with tools
-binded_llm_model= llm_model.bind_tools(tools= tools_arsenal)
+binded_llm= lazy_registry.register("binded_llm_model", lambda: llm.get().bind_tools(tools= tools_arsenal))
+
+
+# `utils.llm_model` / `utils.binded_llm_model` still work, they just resolve lazily
+def __getattr__(name):
+    
+    if name == "llm_model":
+        return llm.get()
+    
+    if name == "binded_llm_model":
+        return binded_llm.get()
+    
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 
@@ -211,18 +414,21 @@ RESEARCHER= "researcher"
 SHOULD_USE_TOOLS= "should_use_tools"
 TOOLS= "tools"
 
+COMPACTOR= "compactor"
 
-# NODES GENERATION
+# research subgraph nodes
+RESEARCH_FAN_OUT= "research_fan_out"
+RESEARCH_SYNTHESIS= "research_synthesis"
 
 
-# NODE 1: SUPERVISOR NODE
-def supervisor_node(state: AgentState) -> Command[Literal["enhancer", "greeting", "researcher", "coder", "maths_reasoner"]]:
-    
-    # parser
-    pyd_parser= PydanticOutputParser(pydantic_object= SupervisorOutput)
-    
-    # prompt template
-    prompt_temp= PromptTemplate(template= """
+
+# PROMPTS -> built once at import, shared by every invocation
+
+# supervisor parser
+supervisor_parser= PydanticOutputParser(pydantic_object= SupervisorOutput)
+
+# PROMPT 1: SUPERVISOR
+supervisor_prompt= PromptTemplate(template= """
 You are a supervisor agent responsible for routing tasks to the appropriate specialist agent
 based on the content and intent of the conversation.
 
@@ -246,38 +452,13 @@ You must return ONLY a valid JSON object, no extra commentary. The format is:
                                 """,
     input_variables= ["messages"],
     partial_variables= {
-        "format_instructions": pyd_parser.get_format_instructions()
+        "format_instructions": supervisor_parser.get_format_instructions()
     }                          
 )
-    
-    
-    # chain
-    chain= prompt_temp | llm_model | pyd_parser
-    
-    
-    # invoke the chain
-    chain_output= chain.invoke({
-        "messages": state.messages[-4:]
-    })
-    
-    
-    return Command(
-        goto= chain_output.route
-    )
-    
-    
-    
 
-# NODE 2: GREETING NODE
 
-def greeting_node(state: AgentState) -> Command[Literal["__end__"]]:
-    """
-    Greeting agent node that welcomes the user, establishes a friendly and professional tone,
-    and sets up the interaction for downstream agents.
-    """
-    
-    # prompt template
-    greeting_prompt = PromptTemplate(
+# PROMPT 2: GREETING
+greeting_prompt = PromptTemplate(
     template="""
 You are a **Conversational Establisher Agent**, responsible for initiating the interaction with the user,
 making them feel welcomed and understood, while gently steering the conversation towards identifying their core objective.
@@ -300,39 +481,10 @@ Messages: {messages}
 """,
     input_variables=["messages"]
 )
-    
-    
-    # chain
-    chain= greeting_prompt | llm_model
-    
-    # invoke chain
-    chain_output_content= chain.invoke({
-        "messages": state.messages[-4:]
-    })
 
-    
-    # update the state
-    state.messages+= [chain_output_content]
-    
-    return Command(
-        goto= END,
-        
-        update= state
-    )
-    
-    
-    
-# NODE 3: ENHANCER NODE
 
-def enhancer_node(state: AgentState) -> Command[Literal["supervisor"]]:
-    """
-        Enhancer agent node that improves and clarifies user queries.
-        Takes the original user input and transforms it into a more precise,
-        actionable request before passing it to the supervisor.
-    """
-    
-    # prompt template
-    query_refiner_prompt = PromptTemplate(
+# PROMPT 3: ENHANCER
+query_refiner_prompt = PromptTemplate(
     template="""
 You are a **Query Refinement Specialist**, an expert in transforming vague, incomplete, or ambiguous user requests into clear, complete, and executable task instructions.
 
@@ -354,24 +506,274 @@ Messages: {messages}
 """,
     input_variables=["messages"]
 )
+
+
+# PROMPT 4: CODER
+coder_prompt = PromptTemplate(
+    template="""
+You are an expert Python developer and quantitative analyst.
+
+Your task:
+  • Write clean, efficient Python **code** that fully solves the problem described below.
+  • Add concise inline comments to explain the logic and any mathematical operations.
+  • If the task involves mathematics, use appropriate libraries (e.g., sympy, numpy) and
+    print the final numeric or symbolic result.
+  • If the task involves data or visualisation, use pandas/matplotlib and display or save
+    the figure.
+  • Output **only** a single Python code block—nothing else.
+
+
+---
+
+Messages: {messages}
+
+# -------  Begin your Python code below  -------
+""",
+    input_variables=["messages"],
+)
+
+
+# PROMPT 5: MATHS REASONER
+maths_reasoner_prompt = PromptTemplate(
+    template="""
+You are a highly intelligent mathematical problem solver and a master of logical reasoning.
+
+You are expected to solve **either** a mathematical question, a logical reasoning task, or a combination of both. Follow the steps below based on the nature of the problem:
+
+---
+
+📌 **For Mathematical Problems:**
+- Carefully read and understand the problem.
+- Show step-by-step working, including all relevant formulas and justifications.
+- Use symbolic manipulation where needed (e.g., algebra, calculus, equations).
+- If code is required (e.g., for evaluation or plotting), generate minimal, functional Python code.
+- End your solution with the final result clearly stated as:
+
+---
+
+🧠 **For Reasoning or Analytical Problems:**
+- Break the problem down logically and sequentially.
+- State any assumptions or interpretations clearly.
+- Use deductive or inductive reasoning to arrive at a conclusion.
+- Explain your thought process in a structured way (e.g., bullet points or paragraphs).
+- Finish your response by stating the final conclusion as:
+
+
+---
+
+Messages: {messages}
+""",
+    input_variables=["messages"],
+)
+
+
+# PROMPT 6: RESEARCHER
+researcher_prompt= PromptTemplate(template= 
+"""You are an **Information Specialist** with deep expertise in performing thorough, factual, and objective research across a wide range of topics.
+
+Your primary responsibility is to act as a high-precision information retriever. Given a query, your job is not to speculate, analyze, or solve — but to gather, organize, and present the most relevant and up-to-date information available.
+
+Your responsibilities include:
+1. **Understanding the Information Need**  
+   Carefully examine the user’s query to determine what kind of information is being requested — factual data, definitions, background context, recent developments, statistics, or comparisons.
+
+2. **Retrieving Trusted Information**  
+   Search for accurate and credible information from authoritative, up-to-date sources (e.g., academic articles, trusted websites, official databases). If no reliable information is available, clearly state that instead of speculating.
+
+3. **Presenting Results Clearly**  
+   Organize the gathered information in a clear, structured, and readable format. Use bullet points, headings, or short paragraphs to improve readability.
+
+4. **Maintaining Objectivity and Relevance**  
+   Stick to factual reporting. Do not analyze, interpret, or solve the problem — your role is strictly to **gather and present** information without introducing personal conclusions or assumptions.
+
+Constraints:
+- ❌ Do **not** provide opinions, speculative statements, or suggested actions.
+- ❌ Do **not** attempt to solve the problem or write code — focus solely on information retrieval.
+- ✅ Be concise but complete in your findings.
+- ✅ If relevant information cannot be found, say so clearly.
+
+---
+
+Messages: {messages}
+
+""",
+
+input_variables= ["messages"])
+
+
+# PROMPT 7: RESEARCH SYNTHESIS (fan out subgraph)
+research_synthesis_prompt= PromptTemplate(template= 
+"""You are an **Information Specialist**. Every research source was already searched for the user's request, the deduplicated and ranked results are listed below as numbered evidence.
+
+Your job is to answer the request from this evidence only:
+1. Organize the relevant information in a clear, structured, and readable format (bullet points, headings, or short paragraphs).
+2. Cite the evidence you use with its number, e.g. [2].
+3. Stick to factual reporting, do not speculate or add information that is not in the evidence.
+4. If the evidence does not cover the request, say so clearly.
+
+---
+
+Evidence:
+{evidence}
+
+---
+
+Messages: {messages}
+
+""",
+
+input_variables= ["messages", "evidence"])
+
+
+# CHAIN REGISTRY -> every prompt | model | parser runnable, plain and tool bound (llm calls timed for /metrics)
+chain_registry= ChainRegistry(model_loader= lambda: (llm.get(), binded_llm.get()), callbacks= [llm_metrics] if metrics_registry.enabled else None)
+
+chain_registry.register(SUPERVISOR, supervisor_prompt, parser= supervisor_parser)
+chain_registry.register(GREETING, greeting_prompt)
+chain_registry.register(ENHANCER, query_refiner_prompt)
+chain_registry.register(CODER, coder_prompt)
+chain_registry.register(MATHS_REASONER, maths_reasoner_prompt)
+chain_registry.register(RESEARCHER, researcher_prompt)
+chain_registry.register(RESEARCH_SYNTHESIS, research_synthesis_prompt)
+
+
+# WARMUP -> build every client and chain ahead of the first request (called after startup)
+def warmup():
+    lazy_registry.warmup()
+    chain_registry.ensure_built()
+
+
+
+# NODES GENERATION
+
+
+# NODE 0: COMPACTOR NODE
+def compactor_node(state: AgentState) -> Command[Literal["supervisor"]]:
+    """
+    Runs before the supervisor on every turn: folds old turns into a running summary and
+    elides stale tool outputs, so the state (and every checkpoint of it) stays bounded.
+    """
+    
+    update= compact_messages(state.messages) if COMPACTION_ENABLED else []
     
+    if not update:
+        return Command(
+            goto= SUPERVISOR
+        )
+    
+    return Command(
+        goto= SUPERVISOR,
+        update= {"messages": update}
+    )
+
+
+# msgs every chain reads -> the last 4, after the running summary of the compacted turns
+def _context(state: AgentState) -> List[BaseMessage]:
+    return context_messages(state.messages)
+
+
+# fast router decision for the last human msg (None -> ask the llm)
+def _fast_route(state: AgentState) -> Optional[Command]:
+    
+    last_msg= state.messages[-1]
+    
+    if isinstance(last_msg, HumanMessage):
+        
+        decision= fast_router.route(str(last_msg.content))
+        
+        if decision is not None:
+            return Command(
+                goto= decision.route
+            )
+    
+    return None
+
+
+# NODE 1: SUPERVISOR NODE
+def supervisor_node(state: AgentState) -> Command[Literal["enhancer", "greeting", "researcher", "coder", "maths_reasoner"]]:
+    
+    # fast path -> trivial human turns are routed locally without an llm call
+    fast_route= _fast_route(state)
+    
+    if fast_route is not None:
+        return fast_route
     
     # chain
-    chain= query_refiner_prompt | llm_model
+    chain= chain_registry.get(SUPERVISOR)
+    
+    
+    # invoke the chain -> a repeated request is answered from the cache, identical routing
+    # requests in flight share one llm call
+    chain_output= supervisor_cache.get_or_call(
+        _context(state),
+        lambda: supervisor_flight.do(
+            messages_key(_context(state)),
+            lambda: chain.invoke({
+                "messages": _context(state)
+            })
+        )
+    )
+    
+    
+    return Command(
+        goto= chain_output.route
+    )
+    
+    
+    
+
+# NODE 2: GREETING NODE
+
+def greeting_node(state: AgentState) -> Command[Literal["__end__"]]:
+    """
+    Greeting agent node that welcomes the user, establishes a friendly and professional tone,
+    and sets up the interaction for downstream agents.
+    """
+    
+    # chain
+    chain= chain_registry.get(GREETING)
     
     # invoke chain
     chain_output_content= chain.invoke({
-        "messages": state.messages[-4:]
+        "messages": _context(state)
     })
 
     
-    # update the state
-    state.messages+= [chain_output_content]
+    # update the state -> only the new msg, the reducer appends it
+    return Command(
+        goto= END,
+        
+        update= {"messages": [chain_output_content]}
+    )
+    
+    
     
+# NODE 3: ENHANCER NODE
+
+def enhancer_node(state: AgentState) -> Command[Literal["supervisor"]]:
+    """
+        Enhancer agent node that improves and clarifies user queries.
+        Takes the original user input and transforms it into a more precise,
+        actionable request before passing it to the supervisor.
+    """
+    
+    # chain
+    chain= chain_registry.get(ENHANCER)
+    
+    # invoke chain -> a repeated request is answered from the cache
+    chain_output_content= enhancer_cache.get_or_call(
+        _context(state),
+        lambda: chain.invoke({
+            "messages": _context(state)
+        })
+    )
+
+    
+    # update the state -> only the new msg (with a fresh id, a cached one would replace its earlier copy), the reducer appends it
     return Command(
         goto= SUPERVISOR,
         
-        update= state
+        update= {"messages": [chain_output_content.model_copy(update= {"id": None})]}
     )
     
     
@@ -394,12 +796,9 @@ def should_use_tools_node(state: AgentState) -> Command[Literal["tools", "__end_
     else:
         
         # update state
-        state.used_tools= False
-        state.tools_sender= None
-        
         return Command(
             goto= END,
-            update= state
+            update= {"used_tools": False, "tools_sender": None}
         )
     
     
@@ -407,140 +806,54 @@ def should_use_tools_node(state: AgentState) -> Command[Literal["tools", "__end_
 
 def use_tools_node(state: AgentState) -> Command[Literal["coder", "maths_reasoner", "researcher"]]:
     
-    all_tool_msgs= []
-    
     # get the last ai msg
     last_msg= state.messages[-1]
-    
-    for tc in last_msg.tool_calls:
-        
-        tool_msg= tools_arsenal_lookup[tc["name"]].invoke(tc)
-        
-        all_tool_msgs.append(tool_msg)
-        
+
+    # run all the tool calls concurrently -> msgs come back in the original call order
+    all_tool_msgs= tool_executor.run(last_msg.tool_calls, tools_arsenal_lookup)
+
     # update the state
-    state.messages+= all_tool_msgs
-    state.used_tools= True
-    
     return Command(
             goto= state.tools_sender,
-            update= state
+            update= {"messages": all_tool_msgs, "used_tools": True}
         )
 
     
 # NODE 6: CODER NODE
 def coder_node(state: AgentState) -> Command[Literal["should_use_tools"]]:
 
-
-  # Prompt template for the LLM
-    prompt_template = PromptTemplate(
-        template="""
-You are an expert Python developer and quantitative analyst.
-
-Your task:
-  • Write clean, efficient Python **code** that fully solves the problem described below.
-  • Add concise inline comments to explain the logic and any mathematical operations.
-  • If the task involves mathematics, use appropriate libraries (e.g., sympy, numpy) and
-    print the final numeric or symbolic result.
-  • If the task involves data or visualisation, use pandas/matplotlib and display or save
-    the figure.
-  • Output **only** a single Python code block—nothing else.
-
-
----
-
-Messages: {messages}
-
-# -------  Begin your Python code below  -------
-""",
-        input_variables=["messages"],
-    )
-    
-    if state.used_tools:
-        # use tools wala llm
-        chain= prompt_template | llm_model
-        
-    else:
-        
-        chain= prompt_template | binded_llm_model
-        
+    # chain -> the tool bound llm only while no tools were used in the last step
+    chain= chain_registry.get(CODER, tool_bound= not state.used_tools)
     
     # invoke chain
     ai_msg= chain.invoke({
-        "messages": state.messages[-4:]
+        "messages": _context(state)
     })
 
     
     # update the state
-    state.messages+= [ai_msg]
-    state.tools_sender= "coder"
-    
     return Command(
           goto= SHOULD_USE_TOOLS,
-          update= state
+          update= {"messages": [ai_msg], "tools_sender": "coder"}
       )
     
     
 # NODE 7: MATHS REASONER NODE
 def maths_reasoner_node(state: AgentState) -> Command[Literal["should_use_tools"]]:
 
-    # Prompt template for the LLM
-
-    prompt_template = PromptTemplate(
-        template="""
-You are a highly intelligent mathematical problem solver and a master of logical reasoning.
-
-You are expected to solve **either** a mathematical question, a logical reasoning task, or a combination of both. Follow the steps below based on the nature of the problem:
-
----
-
-📌 **For Mathematical Problems:**
-- Carefully read and understand the problem.
-- Show step-by-step working, including all relevant formulas and justifications.
-- Use symbolic manipulation where needed (e.g., algebra, calculus, equations).
-- If code is required (e.g., for evaluation or plotting), generate minimal, functional Python code.
-- End your solution with the final result clearly stated as:
-
----
-
-🧠 **For Reasoning or Analytical Problems:**
-- Break the problem down logically and sequentially.
-- State any assumptions or interpretations clearly.
-- Use deductive or inductive reasoning to arrive at a conclusion.
-- Explain your thought process in a structured way (e.g., bullet points or paragraphs).
-- Finish your response by stating the final conclusion as:
-
-
----
-
-Messages: {messages}
-""",
-        input_variables=["messages"],
-    )
-
-    
-    
-    if state.used_tools:
-        # use tools wala llm
-        chain= prompt_template | llm_model
-        
-    else:
-        
-        chain= prompt_template | binded_llm_model
+    # chain -> the tool bound llm only while no tools were used in the last step
+    chain= chain_registry.get(MATHS_REASONER, tool_bound= not state.used_tools)
     
     # invoke chain
     ai_msg= chain.invoke({
-        "messages": state.messages[-4:]
+        "messages": _context(state)
     })
 
     
     # update the state
-    state.messages+= [ai_msg]
-    state.tools_sender= "maths_reasoner"
-    
     return Command(
         goto= SHOULD_USE_TOOLS,
-        update= state
+        update= {"messages": [ai_msg], "tools_sender": "maths_reasoner"}
     )
 
     
@@ -552,65 +865,229 @@ def researcher_node(state: AgentState) -> Command[Literal["should_use_tools"]]:
         Takes the current task state, performs relevant research,
         and returns findings for validation.
     """
-   
     
-   # prompt template
-    prompt_template= PromptTemplate(template= 
-"""You are an **Information Specialist** with deep expertise in performing thorough, factual, and objective research across a wide range of topics.
-
-Your primary responsibility is to act as a high-precision information retriever. Given a query, your job is not to speculate, analyze, or solve — but to gather, organize, and present the most relevant and up-to-date information available.
+    # chain -> the tool bound llm only while no tools were used in the last step
+    chain= chain_registry.get(RESEARCHER, tool_bound= not state.used_tools)
+    
+    # invoke chain
+    ai_msg= chain.invoke({
+        "messages": _context(state)
+    })
 
-Your responsibilities include:
-1. **Understanding the Information Need**  
-   Carefully examine the user’s query to determine what kind of information is being requested — factual data, definitions, background context, recent developments, statistics, or comparisons.
+    
+    # update the state
+    return Command(
+        goto= SHOULD_USE_TOOLS,
+        update= {"messages": [ai_msg], "tools_sender": "researcher"}
+    )
 
-2. **Retrieving Trusted Information**  
-   Search for accurate and credible information from authoritative, up-to-date sources (e.g., academic articles, trusted websites, official databases). If no reliable information is available, clearly state that instead of speculating.
 
-3. **Presenting Results Clearly**  
-   Organize the gathered information in a clear, structured, and readable format. Use bullet points, headings, or short paragraphs to improve readability.
 
-4. **Maintaining Objectivity and Relevance**  
-   Stick to factual reporting. Do not analyze, interpret, or solve the problem — your role is strictly to **gather and present** information without introducing personal conclusions or assumptions.
+# RESEARCH SUBGRAPH (RESEARCH_MODE=fanout) -> replaces the researcher's tool loop
 
-Constraints:
-- ❌ Do **not** provide opinions, speculative statements, or suggested actions.
-- ❌ Do **not** attempt to solve the problem or write code — focus solely on information retrieval.
-- ✅ Be concise but complete in your findings.
-- ✅ If relevant information cannot be found, say so clearly.
+# the request the research is about -> the last msg (the user's, or the enhancer's rewrite of it)
+def _research_query(state: ResearchState) -> str:
+    return str(state.messages[-1].content)
 
----
 
-Messages: {messages}
+# tool msgs -> {source: output}, failed or timed out sources are left out
+def _research_outputs(tool_msgs) -> Dict[str, str]:
+    return {msg.name: msg.content for msg in tool_msgs if msg.status != "error"}
 
-""",
 
-input_variables= ["messages"])
+# NODE R1: RESEARCH FAN OUT NODE
+def research_fan_out_node(state: ResearchState) -> Command[Literal["research_synthesis"]]:
+    """
+    Queries every research source at once and merges their results into one ranked,
+    deduplicated evidence bundle.
+    """
     
+    query= _research_query(state)
     
-       # get the last role before the update
+    # all the sources concurrently, each one with its own timeout
+    tool_msgs= tool_executor.run(research_tool_calls(query), tools_arsenal_lookup)
     
+    return Command(
+        goto= RESEARCH_SYNTHESIS,
+        update= {"evidence": build_evidence(query, _research_outputs(tool_msgs))}
+    )
+
+
+# NODE R2: RESEARCH SYNTHESIS NODE -> the single llm call of the research
+def research_synthesis_node(state: ResearchState) -> Command[Literal["__end__"]]:
     
-    if state.used_tools:
-        # use tools wala llm
-        chain= prompt_template | llm_model
-        
-    else:
-        
-        chain= prompt_template | binded_llm_model
+    # chain
+    chain= chain_registry.get(RESEARCH_SYNTHESIS)
     
     # invoke chain
     ai_msg= chain.invoke({
-        "messages": state.messages[-4:]
+        "messages": _context(state),
+        "evidence": state.evidence
     })
+    
+    return Command(
+        goto= END,
+        update= {"messages": [ai_msg], "tools_sender": None, "used_tools": False}
+    )
+
+
 
+# ASYNC NODES -> same behaviour as the nodes above, but they await the llm (`ainvoke`) and the
+# tools on the event loop instead of holding a worker thread for the whole call
+
+# NODE 0: COMPACTOR NODE (no i/o -> runs inline)
+async def acompactor_node(state: AgentState) -> Command[Literal["supervisor"]]:
+    return compactor_node(state)
+
+
+# NODE 1: SUPERVISOR NODE
+async def asupervisor_node(state: AgentState) -> Command[Literal["enhancer", "greeting", "researcher", "coder", "maths_reasoner"]]:
+    
+    # fast path -> trivial human turns are routed locally without an llm call
+    fast_route= _fast_route(state)
+    
+    if fast_route is not None:
+        return fast_route
+    
+    # chain
+    chain= chain_registry.get(SUPERVISOR)
+    
+    
+    # invoke the chain -> a repeated request is answered from the cache, identical routing
+    # requests in flight share one llm call
+    chain_output= await supervisor_cache.aget_or_call(
+        _context(state),
+        lambda: asupervisor_flight.do(
+            messages_key(_context(state)),
+            lambda: chain.ainvoke({
+                "messages": _context(state)
+            })
+        )
+    )
+    
+    
+    return Command(
+        goto= chain_output.route
+    )
+
+
+# NODE 2: GREETING NODE
+async def agreeting_node(state: AgentState) -> Command[Literal["__end__"]]:
+    
+    # chain
+    chain= chain_registry.get(GREETING)
+    
+    # invoke chain
+    chain_output_content= await chain.ainvoke({
+        "messages": _context(state)
+    })
+    
+    # update the state -> only the new msg, the reducer appends it
+    return Command(
+        goto= END,
+        update= {"messages": [chain_output_content]}
+    )
+
+
+# NODE 3: ENHANCER NODE
+async def aenhancer_node(state: AgentState) -> Command[Literal["supervisor"]]:
+    
+    # chain
+    chain= chain_registry.get(ENHANCER)
+    
+    # invoke chain -> a repeated request is answered from the cache
+    chain_output_content= await enhancer_cache.aget_or_call(
+        _context(state),
+        lambda: chain.ainvoke({
+            "messages": _context(state)
+        })
+    )
+    
+    # update the state -> only the new msg (with a fresh id, a cached one would replace its earlier copy), the reducer appends it
+    return Command(
+        goto= SUPERVISOR,
+        update= {"messages": [chain_output_content.model_copy(update= {"id": None})]}
+    )
+
+
+# NODE 4: SHOULD USE TOOLS NODE (no i/o -> runs inline)
+async def ashould_use_tools_node(state: AgentState) -> Command[Literal["tools", "__end__"]]:
+    return should_use_tools_node(state)
+
+
+# NODE 5: USE TOOLS NODE
+async def ause_tools_node(state: AgentState) -> Command[Literal["coder", "maths_reasoner", "researcher"]]:
+    
+    # get the last ai msg
+    last_msg= state.messages[-1]
+    
+    # run all the tool calls concurrently as tasks -> msgs come back in the original call order
+    all_tool_msgs= await tool_executor.arun(last_msg.tool_calls, tools_arsenal_lookup)
     
     # update the state
-    state.messages+= [ai_msg]
-    state.tools_sender= "researcher"
+    return Command(
+        goto= state.tools_sender,
+        update= {"messages": all_tool_msgs, "used_tools": True}
+    )
+
+
+# NODES 6 - 8: CODER, MATHS REASONER, RESEARCHER
+async def _aspecialist(name: str, state: AgentState) -> Command[Literal["should_use_tools"]]:
+    
+    # chain -> the tool bound llm only while no tools were used in the last step
+    chain= chain_registry.get(name, tool_bound= not state.used_tools)
     
+    # invoke chain
+    ai_msg= await chain.ainvoke({
+        "messages": _context(state)
+    })
+    
+    # update the state
     return Command(
         goto= SHOULD_USE_TOOLS,
-        update= state
+        update= {"messages": [ai_msg], "tools_sender": name}
     )
 
+
+async def acoder_node(state: AgentState) -> Command[Literal["should_use_tools"]]:
+    return await _aspecialist(CODER, state)
+
+
+async def amaths_reasoner_node(state: AgentState) -> Command[Literal["should_use_tools"]]:
+    return await _aspecialist(MATHS_REASONER, state)
+
+
+async def aresearcher_node(state: AgentState) -> Command[Literal["should_use_tools"]]:
+    return await _aspecialist(RESEARCHER, state)
+
+
+# NODE R1: RESEARCH FAN OUT NODE
+async def aresearch_fan_out_node(state: ResearchState) -> Command[Literal["research_synthesis"]]:
+    
+    query= _research_query(state)
+    
+    # all the sources concurrently as tasks, each one with its own timeout
+    tool_msgs= await tool_executor.arun(research_tool_calls(query), tools_arsenal_lookup)
+    
+    return Command(
+        goto= RESEARCH_SYNTHESIS,
+        update= {"evidence": build_evidence(query, _research_outputs(tool_msgs))}
+    )
+
+
+# NODE R2: RESEARCH SYNTHESIS NODE
+async def aresearch_synthesis_node(state: ResearchState) -> Command[Literal["__end__"]]:
+    
+    # chain
+    chain= chain_registry.get(RESEARCH_SYNTHESIS)
+    
+    # invoke chain
+    ai_msg= await chain.ainvoke({
+        "messages": _context(state),
+        "evidence": state.evidence
+    })
+    
+    return Command(
+        goto= END,
+        update= {"messages": [ai_msg], "tools_sender": None, "used_tools": False}
+    )